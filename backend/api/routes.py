@@ -3,7 +3,9 @@ APIルート定義
 """
 
 from flask import Blueprint, jsonify, request
-from backend.models.data_loader import DataLoader
+from backend.models.data_loader import DataLoader, InvalidCursorError, StaleCursorError
+from backend.models.filter_expression import FilterExpressionError
+from scripts.analysis.bootstrap import DEFAULT_CONFIDENCE, DEFAULT_RESAMPLES
 
 api = Blueprint('api', __name__)
 data_loader = DataLoader()
@@ -18,18 +20,59 @@ def get_data():
         start_year: 開始年（オプション）
         end_year: 終了年（オプション）
         indicators: カンマ区切りの指標リスト（オプション）
+        where: フィルタ式（オプション、例: "hours_per_year > 2000 AND gdp_growth_rate < 2"）
+        limit: 1ページの件数（オプション、1以上の整数。指定時はページネーション）
+        cursor: 前ページのnext_cursor（オプション）
     """
     start_year = request.args.get('start_year', type=int)
     end_year = request.args.get('end_year', type=int)
     indicators_str = request.args.get('indicators', '')
+    where = request.args.get('where')
+    limit_str = request.args.get('limit')
+    cursor = request.args.get('cursor')
     
     indicators = [ind.strip() for ind in indicators_str.split(',')] if indicators_str else None
     
-    data = data_loader.get_data(
-        start_year=start_year,
-        end_year=end_year,
-        indicators=indicators
-    )
+    limit = None
+    if limit_str is not None:
+        try:
+            limit = int(limit_str)
+        except ValueError:
+            limit = None
+        if limit is None or limit < 1:
+            return jsonify({'error': f'Invalid limit: {limit_str!r}. Use a positive integer'}), 400
+    
+    if limit is not None or cursor:
+        try:
+            page = data_loader.get_data_page(
+                limit=limit if limit is not None else 100,
+                cursor=cursor,
+                start_year=start_year,
+                end_year=end_year,
+                indicators=indicators,
+                where=where
+            )
+        except StaleCursorError as e:
+            return jsonify({'error': str(e)}), 410
+        except InvalidCursorError as e:
+            return jsonify({'error': str(e)}), 400
+        except FilterExpressionError as e:
+            return jsonify({'error': f'Invalid filter expression: {e}'}), 400
+        
+        if page is None:
+            return jsonify({'error': 'Data not available'}), 404
+        
+        return jsonify(page)
+    
+    try:
+        data = data_loader.get_data(
+            start_year=start_year,
+            end_year=end_year,
+            indicators=indicators,
+            where=where
+        )
+    except FilterExpressionError as e:
+        return jsonify({'error': f'Invalid filter expression: {e}'}), 400
     
     if data is None:
         return jsonify({'error': 'Data not available'}), 404
@@ -61,6 +104,42 @@ def get_year_range():
     return jsonify(year_range)
 
 
+@api.route('/labor-hours', methods=['GET'])
+def get_labor_hours():
+    """
+    指定した頻度の労働時間を取得
+    
+    Query parameters:
+        frequency: A（年次、デフォルト）/ Q（四半期・年換算）/ TTM（直近12か月）/ M（月次）
+        start_year: 開始年（オプション）
+        end_year: 終了年（オプション）
+        country: 国コード（オプション）
+    """
+    frequency = request.args.get('frequency', 'A').upper()
+    start_year = request.args.get('start_year', type=int)
+    end_year = request.args.get('end_year', type=int)
+    country = request.args.get('country')
+    
+    try:
+        data = data_loader.get_labor_hours(
+            frequency=frequency,
+            start_year=start_year,
+            end_year=end_year,
+            country=country
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if data is None:
+        return jsonify({'error': f'Labor hours not available at frequency {frequency}'}), 404
+    
+    return jsonify({
+        'frequency': frequency,
+        'data': data,
+        'count': len(data)
+    })
+
+
 @api.route('/correlation', methods=['GET'])
 def get_correlation():
     """
@@ -79,6 +158,186 @@ def get_correlation():
     return jsonify(correlation)
 
 
+@api.route('/correlation/spearman', methods=['GET'])
+def get_spearman_correlation():
+    """
+    指定した年範囲のスピアマン順位相関を取得
+    
+    Query parameters:
+        indicator: 特定の指標（オプション）
+        start_year: 開始年（オプション）
+        end_year: 終了年（オプション）
+    """
+    indicator = request.args.get('indicator')
+    start_year = request.args.get('start_year', type=int)
+    end_year = request.args.get('end_year', type=int)
+    
+    spearman = data_loader.get_spearman_correlation(
+        indicator=indicator,
+        start_year=start_year,
+        end_year=end_year
+    )
+    
+    if spearman is None:
+        return jsonify({'error': 'Spearman correlation not available'}), 404
+    
+    return jsonify(spearman)
+
+
+@api.route('/correlation/lagged', methods=['GET'])
+def get_lagged_correlation():
+    """
+    ラグ付き相互相関の結果を取得
+    
+    Query parameters:
+        indicator: 特定の指標（オプション）
+        min_lag: 最小ラグ（年、オプション）
+        max_lag: 最大ラグ（年、オプション）
+    """
+    indicator = request.args.get('indicator')
+    min_lag = request.args.get('min_lag', type=int)
+    max_lag = request.args.get('max_lag', type=int)
+    
+    lagged = data_loader.get_lagged_correlation(
+        indicator=indicator,
+        min_lag=min_lag,
+        max_lag=max_lag
+    )
+    
+    if lagged is None:
+        return jsonify({'error': 'Lagged correlation analysis not available'}), 404
+    
+    return jsonify(lagged)
+
+
+@api.route('/correlation/partial', methods=['GET'])
+def get_partial_correlation():
+    """
+    年や他の指標を制御した偏相関を取得
+
+    Query parameters:
+        controls: カンマ区切りの制御変数（デフォルト: year、例: year,gdp_per_capita_usd）
+        indicator: 特定の指標（オプション）
+        method: 'pearson'（デフォルト）または 'spearman'
+        start_year: 開始年（オプション）
+        end_year: 終了年（オプション）
+    """
+    controls_str = request.args.get('controls', 'year')
+    controls = [c.strip() for c in controls_str.split(',') if c.strip()]
+    indicator = request.args.get('indicator')
+    method = request.args.get('method', 'pearson')
+    start_year = request.args.get('start_year', type=int)
+    end_year = request.args.get('end_year', type=int)
+
+    try:
+        partial = data_loader.get_partial_correlation(
+            controls,
+            indicator=indicator,
+            method=method,
+            start_year=start_year,
+            end_year=end_year
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if partial is None:
+        return jsonify({'error': 'Partial correlation not available'}), 404
+
+    return jsonify(partial)
+
+
+@api.route('/correlation/bootstrap', methods=['GET'])
+def get_bootstrap_intervals():
+    """
+    指定した年範囲の相関係数のブートストラップ信頼区間を取得
+
+    Query parameters:
+        indicator: 特定の指標（オプション）
+        start_year: 開始年（オプション）
+        end_year: 終了年（オプション）
+        n_resamples: リサンプル数（オプション、デフォルト: 2000）
+        confidence: 信頼水準（オプション、デフォルト: 0.95）
+    """
+    indicator = request.args.get('indicator')
+    start_year = request.args.get('start_year', type=int)
+    end_year = request.args.get('end_year', type=int)
+    n_resamples = request.args.get('n_resamples', DEFAULT_RESAMPLES, type=int)
+    confidence = request.args.get('confidence', DEFAULT_CONFIDENCE, type=float)
+
+    try:
+        intervals = data_loader.get_bootstrap_intervals(
+            indicator=indicator,
+            start_year=start_year,
+            end_year=end_year,
+            n_resamples=n_resamples,
+            confidence=confidence
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if intervals is None:
+        return jsonify({'error': 'Bootstrap intervals not available'}), 404
+
+    return jsonify(intervals)
+
+
+@api.route('/correlation/matrix', methods=['GET'])
+def get_correlation_matrix():
+    """
+    全指標の組み合わせの相関行列を取得
+
+    Query parameters:
+        method: 'pearson'（デフォルト）または 'spearman'
+        indicators: カンマ区切りの指標リスト（オプション）
+    """
+    method = request.args.get('method', 'pearson')
+    indicators_str = request.args.get('indicators')
+    indicators = [ind.strip() for ind in indicators_str.split(',')] if indicators_str else None
+
+    try:
+        matrix = data_loader.get_correlation_matrix(method=method, indicators=indicators)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if matrix is None:
+        return jsonify({'error': 'Correlation matrix not available'}), 404
+
+    return jsonify(matrix)
+
+
+@api.route('/panel', methods=['GET'])
+def get_panel_index():
+    """国別分析の索引（国ごとの年の範囲・指標）を取得"""
+    index = data_loader.get_panel_index()
+
+    if index is None:
+        return jsonify({'error': 'Panel analysis not available'}), 404
+
+    return jsonify(index)
+
+
+@api.route('/panel/<country>', methods=['GET'])
+def get_panel_analysis(country):
+    """
+    1か国（または pooled）の分析結果を取得
+
+    Query parameters:
+        sections: カンマ区切りの項目（オプション、例: correlation,time_series）
+    """
+    sections_str = request.args.get('sections')
+    sections = [s.strip() for s in sections_str.split(',')] if sections_str else None
+
+    try:
+        analysis = data_loader.get_panel_analysis(country, sections=sections)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if analysis is None:
+        return jsonify({'error': f'Panel analysis not available for {country}'}), 404
+
+    return jsonify(analysis)
+
+
 @api.route('/timeseries', methods=['GET'])
 def get_timeseries_analysis():
     """時系列分析結果を取得"""
@@ -27,10 +27,18 @@ def index():
     return {
         'message': 'Labor Hours and Economic Growth API',
         'endpoints': {
-            '/api/data': 'Get data with optional filters (start_year, end_year, indicators)',
+            '/api/data': 'Get data with optional filters (start_year, end_year, indicators, where, limit, cursor)',
             '/api/indicators': 'Get list of available indicators',
             '/api/year-range': 'Get year range of available data',
+            '/api/labor-hours': 'Get labor hours at a frequency (frequency=A|Q|TTM|M, start_year, end_year, country)',
             '/api/correlation': 'Get correlation analysis results',
+            '/api/correlation/spearman': 'Get Spearman correlation for a year range (indicator, start_year, end_year)',
+            '/api/correlation/lagged': 'Get lead/lag cross-correlations (indicator, min_lag, max_lag)',
+            '/api/correlation/partial': 'Get partial correlations controlling for year/indicators (controls, indicator, method)',
+            '/api/correlation/bootstrap': 'Get bootstrap confidence intervals for a year range (indicator, start_year, end_year, n_resamples, confidence)',
+            '/api/correlation/matrix': 'Get all-pairs correlation matrix (method=pearson|spearman, indicators)',
+            '/api/panel': 'Get index of per-country panel analyses',
+            '/api/panel/<country>': 'Get per-country (or pooled) analysis results (sections)',
             '/api/timeseries': 'Get time series analysis results',
             '/api/metadata': 'Get data source metadata'
         }
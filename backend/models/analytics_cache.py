@@ -0,0 +1,193 @@
+"""
+分析結果キャッシュ
+高コストな分析結果をSQLiteファイルに保存し、プロセス間・再起動後も再利用する
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DEFAULT_CACHE_PATH = PROJECT_ROOT / "data" / "cache" / "analytics_cache.sqlite3"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# 最終アクセス時刻をまとめて書き込む間隔（件数・秒）
+ACCESS_FLUSH_COUNT = 64
+ACCESS_FLUSH_SECONDS = 30.0
+
+
+def normalize_params(params):
+    """パラメータを順序に依存しない正規化済み文字列に変換"""
+    cleaned = {k: v for k, v in (params or {}).items() if v is not None}
+    return json.dumps(cleaned, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class AnalyticsCache:
+    """
+    データセットのバージョン（スナップショットハッシュ）をキーに含む永続キャッシュ
+
+    SQLiteのWALモードを使うため、複数プロセスからの同時読み書きに対応する。
+    合計サイズが上限を超えた場合は最終アクセスが古いものから削除する（LRU）。
+
+    接続はプロセスごとに1つだけ開いて使い回す。読み取りを書き込みにしないよう、
+    ヒット時の最終アクセス時刻はメモリに溜めておき、一定件数・一定時間ごと
+    （または保存時）にまとめて更新する。
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, timeout=30.0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending_access = {}
+        self._last_flush = time.monotonic()
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY,'
+            ' namespace TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' last_access REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON entries (last_access)')
+
+    def _connection(self):
+        """このプロセスの接続（fork後の子プロセスでは開き直す）"""
+        if self._conn is None or self._pid != os.getpid():
+            # スレッド間ではロックで直列化して共有する
+            self._conn = sqlite3.connect(
+                str(self.path), timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._pid = os.getpid()
+            self._pending_access = {}
+        return self._conn
+
+    @staticmethod
+    def make_key(snapshot, namespace, params=None):
+        """スナップショット、名前空間、正規化パラメータからキーを作成"""
+        raw = f"{snapshot}\x00{namespace}\x00{normalize_params(params)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, snapshot, namespace, params=None):
+        """
+        キャッシュから値を取得
+
+        Returns:
+            キャッシュされた値（存在しない場合はNone）
+        """
+        key = self.make_key(snapshot, namespace, params)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._pending_access[key] = time.time()
+            if (len(self._pending_access) >= ACCESS_FLUSH_COUNT
+                    or time.monotonic() - self._last_flush >= ACCESS_FLUSH_SECONDS):
+                try:
+                    self._flush_access(conn)
+                except sqlite3.OperationalError:
+                    # 書き込みが混み合っている場合は次の機会に回す
+                    pass
+        return json.loads(row[0])
+
+    def _flush_access(self, conn):
+        """溜めておいた最終アクセス時刻をまとめて書き込む"""
+        if self._pending_access:
+            conn.executemany(
+                'UPDATE entries SET last_access = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access = {}
+        self._last_flush = time.monotonic()
+
+    def set(self, snapshot, namespace, params, value):
+        """値を保存し、必要に応じて古いエントリを削除"""
+        key = self.make_key(snapshot, namespace, params)
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # 退避の順序が正しくなるよう、溜めておいたアクセス時刻も反映する
+                self._flush_access(conn)
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, namespace, value, size, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, namespace, payload, size, time.time())
+                )
+                self._evict(conn)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _evict(self, conn):
+        """合計サイズが上限以下になるまでLRU順に削除"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_access'):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+
+    def get_or_compute(self, snapshot, namespace, params, compute):
+        """
+        キャッシュにあれば返し、なければ計算して保存
+
+        Args:
+            snapshot: データセットのスナップショットハッシュ
+            namespace: 分析の種類（例: 'bootstrap'）
+            params: 分析パラメータ（dict）
+            compute: 値を計算する引数なし関数（JSONシリアライズ可能な値を返す）
+        """
+        value = self.get(snapshot, namespace, params)
+        if value is not None:
+            return value
+
+        value = compute()
+        if value is not None:
+            self.set(snapshot, namespace, params, value)
+        return value
+
+    def clear(self, namespace=None):
+        """キャッシュを削除（名前空間指定可）"""
+        with self._lock:
+            conn = self._connection()
+            self._pending_access = {}
+            if namespace is None:
+                conn.execute('DELETE FROM entries')
+            else:
+                conn.execute('DELETE FROM entries WHERE namespace = ?', (namespace,))
+
+    def close(self):
+        """溜めておいたアクセス時刻を書き込み、接続を閉じる"""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                try:
+                    self._flush_access(self._conn)
+                except sqlite3.OperationalError:
+                    pass
+                self._conn.close()
+            self._conn = None
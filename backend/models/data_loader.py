@@ -6,30 +6,165 @@
 import pandas as pd
 import numpy as np
 import json
+import base64
+import hashlib
+import sqlite3
 from pathlib import Path
 
+from backend.models.rank_cache import RankCache
+from backend.models.analytics_cache import AnalyticsCache, normalize_params
+from backend.models.filter_expression import compile_filter
+from scripts.data_processing.schema import read_table
+from scripts.data_processing.reconciliation import DOMESTIC_COUNTRY
+from scripts.analysis.correlation_matrix import CORRELATION_METHODS
+from scripts.analysis.partial_correlation import partial_correlation_frame
+from scripts.analysis.bootstrap import DEFAULT_CONFIDENCE, DEFAULT_RESAMPLES, bootstrap_correlation_intervals
+from scripts.analysis.constants import DEFAULT_SEED
+
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+PANEL_ANALYSIS_DIR = DATA_PROCESSED_DIR / "panel_analysis"
+
+# スナップショットハッシュの対象となる処理済みファイル
+SNAPSHOT_FILES = [
+    'combined_dataset.csv',
+    'correlation_analysis.json',
+    'correlation_matrix.json',
+    'time_series_analysis.json'
+]
+
+# ページネーションの上限件数
+MAX_PAGE_LIMIT = 1000
+
+# オンデマンドのブートストラップで許可するリサンプル数の上限
+MAX_BOOTSTRAP_RESAMPLES = 10000
+
+# 労働時間の頻度と処理済みテーブル（'A' は統合データセットの年次値を使う）
+LABOR_HOURS_FREQUENCIES = {
+    'A': None,
+    'Q': 'labor_hours_quarterly_processed',
+    'TTM': 'labor_hours_ttm_processed',
+    'M': 'labor_hours_sub_annual_processed',
+}
+
+
+class InvalidCursorError(ValueError):
+    """カーソルが不正な場合のエラー"""
+
+
+class StaleCursorError(InvalidCursorError):
+    """データ再読み込みによりカーソルが無効になった場合のエラー"""
 
 
 class DataLoader:
     """データを読み込むクラス"""
     
-    def __init__(self):
+    def __init__(self, cache=None):
+        self._reset_state()
+        self.cache = cache if cache is not None else self._open_cache()
+        self._load_all_data()
+    
+    def _reset_state(self):
+        """読み込んだデータと、そこから派生した索引・キャッシュを全て破棄"""
         self.combined_data = None
         self.correlation_results = None
+        self.correlation_matrices = None
         self.timeseries_results = None
+        self.domestic_data = None
+        self.rank_cache = None
+        self.column_arrays = {}
+        self.labor_hours_tables = {}
+        self.panel_index = None
+        self.panel_shards = {}
+        self.sort_keys = ['year']
+        self.segment_bounds = np.array([0])
+        self.snapshot_hash = None
         self.metadata = {}
+    
+    @staticmethod
+    def _open_cache():
+        """分析結果キャッシュを開く（書き込めない環境では無効化）"""
+        try:
+            return AnalyticsCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Analytics cache disabled: {e}")
+            return None
+    
+    @staticmethod
+    def _compute_snapshot_hash():
+        """処理済みファイルの内容からスナップショットハッシュを計算"""
+        digest = hashlib.sha256()
+        for name in SNAPSHOT_FILES:
+            path = DATA_PROCESSED_DIR / name
+            digest.update(name.encode('utf-8'))
+            if path.exists():
+                digest.update(path.read_bytes())
+        return digest.hexdigest()
+    
+    def _cached(self, namespace, params, compute):
+        """
+        スナップショットとパラメータをキーに分析結果をキャッシュ
+        
+        キャッシュの読み書きに失敗しても計算は一度だけ行い、計算結果をそのまま返す。
+        """
+        if self.cache is None:
+            return compute()
+        try:
+            value = self.cache.get(self.snapshot_hash, namespace, params)
+        except sqlite3.Error as e:
+            print(f"Analytics cache error ({namespace}): {e}")
+            value = None
+        if value is not None:
+            return value
+        
+        value = compute()
+        if value is not None:
+            try:
+                self.cache.set(self.snapshot_hash, namespace, params, value)
+            except sqlite3.Error as e:
+                print(f"Analytics cache error ({namespace}): {e}")
+        return value
+    
+    def reload(self):
+        """処理済みデータを再読み込み（データが変わると既存のカーソルは無効になる）"""
+        self._reset_state()
         self._load_all_data()
     
     def _load_all_data(self):
         """全てのデータを読み込み"""
+        self.snapshot_hash = self._compute_snapshot_hash()
+        
         # 統合データセット
-        combined_path = DATA_PROCESSED_DIR / "combined_dataset.csv"
-        if combined_path.exists():
-            self.combined_data = pd.read_csv(combined_path)
+        combined_data = read_table('combined_dataset')
+        if combined_data is not None:
+            self.combined_data = combined_data
             # 年を数値に変換（JSONシリアライズ用）
             self.combined_data['year'] = self.combined_data['year'].astype(int)
+            # 国・年でソートした行順をページネーションの索引として使う
+            self.sort_keys = [col for col in ('country', 'year') if col in self.combined_data.columns]
+            self.combined_data = self.combined_data.sort_values(
+                self.sort_keys, kind='stable'
+            ).reset_index(drop=True)
+            # 国ごとの行範囲の境界（各区間の中では年順に並んでいる）
+            self.segment_bounds = self._segment_bounds(self.combined_data)
+            # 順位構造はスナップショットごとに一度だけ構築（相関分析と同じく日本の系列）
+            domestic = self.combined_data
+            if 'country' in domestic.columns:
+                domestic = domestic[domestic['country'] == DOMESTIC_COUNTRY].drop(columns='country')
+            self.domestic_data = domestic
+            self.rank_cache = RankCache(domestic)
+            # フィルタ式の評価用に数値列をNumPy配列として保持
+            self.column_arrays = {
+                col: self.combined_data[col].to_numpy(dtype=float)
+                for col in self.combined_data.columns
+                if pd.api.types.is_numeric_dtype(self.combined_data[col])
+            }
+        
+        # 月次・四半期の労働時間（毎月勤労統計などがある場合のみ）
+        for frequency, table in LABOR_HOURS_FREQUENCIES.items():
+            df = read_table(table) if table else None
+            if df is not None:
+                self.labor_hours_tables[frequency] = df
         
         # 相関分析結果
         correlation_path = DATA_PROCESSED_DIR / "correlation_analysis.json"
@@ -37,12 +172,24 @@ class DataLoader:
             with open(correlation_path, 'r', encoding='utf-8') as f:
                 self.correlation_results = json.load(f)
         
+        # 全指標の相関行列
+        matrix_path = DATA_PROCESSED_DIR / "correlation_matrix.json"
+        if matrix_path.exists():
+            with open(matrix_path, 'r', encoding='utf-8') as f:
+                self.correlation_matrices = json.load(f)
+        
         # 時系列分析結果
         timeseries_path = DATA_PROCESSED_DIR / "time_series_analysis.json"
         if timeseries_path.exists():
             with open(timeseries_path, 'r', encoding='utf-8') as f:
                 self.timeseries_results = json.load(f)
         
+        # 国別分析の索引（各国の結果は要求された時に読み込む）
+        panel_index_path = PANEL_ANALYSIS_DIR / "index.json"
+        if panel_index_path.exists():
+            with open(panel_index_path, 'r', encoding='utf-8') as f:
+                self.panel_index = json.load(f)
+        
         # メタデータ
         metadata_files = [
             'labor_hours_metadata.json',
@@ -57,6 +204,15 @@ class DataLoader:
                     key = meta_file.replace('_metadata.json', '')
                     self.metadata[key] = json.load(f)
     
+    @staticmethod
+    def _segment_bounds(df):
+        """国ごとの連続した行範囲の境界（先頭0と末尾の行数を含む）"""
+        if 'country' not in df.columns or len(df) == 0:
+            return np.array([0, len(df)])
+        codes = df['country'].astype(str).to_numpy()
+        changes = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        return np.concatenate(([0], changes, [len(df)]))
+    
     def _sanitize_data(self, data):
         """
         データからNaNとInfinityを再帰的に削除
@@ -71,7 +227,7 @@ class DataLoader:
             return data
         return data
 
-    def get_data(self, start_year=None, end_year=None, indicators=None):
+    def get_data(self, start_year=None, end_year=None, indicators=None, where=None):
         """
         データを取得（フィルタリング可能）
         
@@ -79,14 +235,22 @@ class DataLoader:
             start_year: 開始年
             end_year: 終了年
             indicators: 取得する指標のリスト
+            where: フィルタ式（例: "hours_per_year > 2000 AND gdp_growth_rate < 2"）
         
         Returns:
             dict: フィルタリングされたデータ
+        
+        Raises:
+            FilterExpressionError: フィルタ式が不正な場合
         """
         if self.combined_data is None:
             return None
         
-        df = self.combined_data.copy()
+        if where:
+            mask = compile_filter(where)(self.column_arrays, len(self.combined_data))
+            df = self.combined_data[mask].copy()
+        else:
+            df = self.combined_data.copy()
         
         # 年でフィルタリング
         if start_year:
@@ -94,10 +258,14 @@ class DataLoader:
         if end_year:
             df = df[df['year'] <= end_year]
         
+        return self._to_records(df, indicators)
+    
+    def _to_records(self, df, indicators=None):
+        """指標で列を絞り込み、JSONシリアライズ可能なレコードに変換"""
         # 指標でフィルタリング
         if indicators:
             # hours_per_yearは常に必要なので、必ず含める
-            required_columns = ['year', 'hours_per_year']
+            required_columns = self.sort_keys + ['hours_per_year']
             columns = required_columns + [ind for ind in indicators if ind in df.columns and ind not in required_columns]
             df = df[columns]
         
@@ -109,6 +277,167 @@ class DataLoader:
         
         return df.to_dict('records')
     
+    def _encode_cursor(self, position, query):
+        """ページ位置を不透明なカーソル文字列に変換"""
+        row = self.combined_data.iloc[position]
+        payload = {
+            'v': self.snapshot_hash[:16],
+            'q': query,
+            'p': int(position),
+            'k': [row[key].item() if hasattr(row[key], 'item') else row[key] for key in self.sort_keys]
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    def _decode_cursor(self, cursor, query):
+        """カーソルを検証してページの開始位置を返す"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            position = int(payload['p'])
+            key = payload['k']
+            version = payload['v']
+            cursor_query = payload['q']
+        except (ValueError, KeyError, TypeError):
+            raise InvalidCursorError('Malformed cursor')
+        
+        if version != self.snapshot_hash[:16]:
+            raise StaleCursorError('Cursor expired because the data has been reloaded')
+        if cursor_query != query:
+            raise InvalidCursorError('Cursor does not match the query parameters')
+        if not 0 <= position < len(self.combined_data):
+            raise InvalidCursorError('Cursor position out of range')
+        
+        row = self.combined_data.iloc[position]
+        if [row[k].item() if hasattr(row[k], 'item') else row[k] for k in self.sort_keys] != key:
+            raise StaleCursorError('Cursor expired because the data has been reloaded')
+        return position
+    
+    def get_data_page(self, limit, cursor=None, start_year=None, end_year=None,
+                      indicators=None, where=None):
+        """
+        カーソルベースのページネーションでデータを取得
+        
+        ソート済みの行順を走査し、1ページ分の行が集まった時点で打ち切る。
+        国ごとの区間は年順に並んでいるため、年の範囲の開始・終了位置は区間ごとに
+        二分探索で求める。そのため1ページのコストはデータ全体ではなくページサイズに
+        比例する（範囲外の国は区間単位で読み飛ばす）。
+        
+        Args:
+            limit: 1ページの最大件数（MAX_PAGE_LIMITを超える場合は切り詰める）
+            cursor: 前ページのnext_cursor（省略時は先頭から）
+            start_year, end_year, indicators, where: get_dataと同じ
+        
+        Returns:
+            dict: data, count, next_cursor
+        
+        Raises:
+            ValueError: limitが1未満の場合
+            InvalidCursorError: カーソルが不正・期限切れの場合
+            FilterExpressionError: フィルタ式が不正な場合
+        """
+        if self.combined_data is None:
+            return None
+        
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError('limit must be a positive integer')
+        limit = min(limit, MAX_PAGE_LIMIT)
+        query = hashlib.sha256(normalize_params({
+            'start_year': start_year,
+            'end_year': end_year,
+            'indicators': indicators,
+            'where': where
+        }).encode('utf-8')).hexdigest()[:16]
+        
+        years = self.column_arrays['year']
+        bounds = self.segment_bounds
+        n_segments = len(bounds) - 1
+        compiled = compile_filter(where) if where else None
+        
+        position = self._decode_cursor(cursor, query) if cursor else 0
+        segment = int(np.searchsorted(bounds, position, side='right')) - 1
+        
+        selected = []
+        block_size = max(2 * limit, 64)
+        while segment < n_segments and len(selected) < limit:
+            segment_start, segment_end = int(bounds[segment]), int(bounds[segment + 1])
+            segment_years = years[segment_start:segment_end]
+            low, high = segment_start, segment_end
+            if start_year:
+                low += int(np.searchsorted(segment_years, start_year, side='left'))
+            if end_year:
+                high = segment_start + int(np.searchsorted(segment_years, end_year, side='right'))
+            position = max(position, low)
+            
+            while position < high and len(selected) < limit:
+                stop = min(position + block_size, high)
+                if compiled is not None:
+                    block = {col: values[position:stop] for col, values in self.column_arrays.items()}
+                    hits = position + np.flatnonzero(compiled(block, stop - position))
+                else:
+                    hits = np.arange(position, stop)
+                
+                needed = limit - len(selected)
+                if len(hits) > needed:
+                    hits = hits[:needed]
+                    stop = int(hits[-1]) + 1
+                selected.extend(hits.tolist())
+                position = stop
+            
+            if position >= high:
+                # この国の範囲を読み終えたら次の国の区間へ
+                segment += 1
+                position = int(bounds[segment]) if segment < n_segments else len(years)
+        
+        records = self._to_records(self.combined_data.iloc[selected], indicators)
+        next_cursor = self._encode_cursor(position, query) if segment < n_segments else None
+        
+        return {
+            'data': records,
+            'count': len(records),
+            'next_cursor': next_cursor
+        }
+    
+    def get_labor_hours(self, frequency='A', start_year=None, end_year=None, country=None):
+        """
+        指定した頻度の労働時間を取得
+        
+        Args:
+            frequency: 'A'（年次）、'Q'（四半期・年換算）、'TTM'（直近12か月）、'M'（月次の観測値）
+            start_year: 開始年
+            end_year: 終了年
+            country: 国コード（国の列がある場合のみ）
+        
+        Returns:
+            list: 労働時間のレコード（データがない場合はNone）
+        
+        Raises:
+            ValueError: 頻度が不正な場合
+        """
+        if frequency not in LABOR_HOURS_FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {frequency}")
+        
+        if frequency == 'A':
+            if self.combined_data is None:
+                return None
+            df = self.combined_data[self.sort_keys + ['hours_per_year']].dropna(subset=['hours_per_year'])
+        else:
+            df = self.labor_hours_tables.get(frequency)
+            if df is None or (frequency == 'M' and 'month' not in df.columns):
+                return None
+        
+        mask = np.ones(len(df), dtype=bool)
+        if start_year:
+            mask &= (df['year'] >= start_year).to_numpy()
+        if end_year:
+            mask &= (df['year'] <= end_year).to_numpy()
+        if country and 'country' in df.columns:
+            mask &= (df['country'] == country).to_numpy()
+        
+        df = df[mask].astype({'year': int})
+        return self._to_records(df)
+    
     def get_correlation(self, indicator=None):
         """相関分析結果を取得"""
         if self.correlation_results is None:
@@ -119,10 +448,259 @@ class DataLoader:
         
         return self._sanitize_data(self.correlation_results)
     
+    def get_spearman_correlation(self, indicator=None, start_year=None, end_year=None):
+        """
+        任意の年範囲のスピアマン順位相関を取得
+        
+        Args:
+            indicator: 特定の指標（省略時は全指標）
+            start_year: 開始年
+            end_year: 終了年
+        
+        Returns:
+            dict: 相関係数、p値、サンプル数
+        """
+        if self.rank_cache is None:
+            return None
+        
+        # 順位キャッシュからの計算は十分に速いため分析結果キャッシュは使わない
+        if indicator:
+            return self._sanitize_data(
+                self.rank_cache.spearman(indicator, start_year, end_year)
+            )
+        return self._sanitize_data({
+            column: self.rank_cache.spearman(column, start_year, end_year)
+            for column in self.rank_cache.columns
+            if column != self.rank_cache.base_column
+        })
+    
+    def get_partial_correlation(self, controls, indicator=None, method='pearson',
+                                start_year=None, end_year=None):
+        """
+        年や他の指標を制御した、労働時間と各指標の偏相関を取得
+        
+        Args:
+            controls: 制御変数のリスト（'year' または指標名）
+            indicator: 特定の指標（省略時は全指標）
+            method: 'pearson' または 'spearman'
+            start_year: 開始年
+            end_year: 終了年
+        
+        Returns:
+            dict: 偏相関係数、p値、サンプル数、自由度
+        
+        Raises:
+            ValueError: 制御変数・相関の種類が不正な場合
+        """
+        if self.domestic_data is None:
+            return None
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Invalid method: {method}. Use one of {', '.join(CORRELATION_METHODS)}")
+        
+        base_column = self.rank_cache.base_column
+        available = ['year'] + self.get_available_indicators()
+        unknown = [col for col in controls if col not in available or col == base_column]
+        if unknown:
+            raise ValueError(
+                f"Invalid controls: {', '.join(unknown)}. Use year or indicators other than {base_column}"
+            )
+        
+        df = self.domestic_data
+        if start_year:
+            df = df[df['year'] >= start_year]
+        if end_year:
+            df = df[df['year'] <= end_year]
+        results = partial_correlation_frame(df, base_column, controls, method=method)
+        if indicator:
+            return self._sanitize_data(results.get(indicator))
+        return self._sanitize_data({'controls': list(controls), 'method': method, 'results': results})
+    
+    def get_bootstrap_intervals(self, indicator=None, start_year=None, end_year=None,
+                                n_resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE):
+        """
+        任意の年範囲で、労働時間と各指標の相関のブートストラップ信頼区間を取得
+        
+        リサンプルの計算は重いため、結果は分析結果キャッシュに保存して再利用する。
+        
+        Args:
+            indicator: 特定の指標（省略時は全指標）
+            start_year: 開始年
+            end_year: 終了年
+            n_resamples: リサンプル数
+            confidence: 信頼水準
+        
+        Returns:
+            dict: 指標ごとのピアソン・スピアマン相関の区間（iid・block）
+        
+        Raises:
+            ValueError: 指標・リサンプル数・信頼水準が不正な場合
+        """
+        if self.domestic_data is None:
+            return None
+        if not 1 <= n_resamples <= MAX_BOOTSTRAP_RESAMPLES:
+            raise ValueError(f"n_resamples must be between 1 and {MAX_BOOTSTRAP_RESAMPLES}")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        
+        base_column = self.rank_cache.base_column
+        indicators = [col for col in self.get_available_indicators() if col != base_column]
+        if indicator:
+            if indicator not in indicators:
+                raise ValueError(f"Unknown indicator: {indicator}")
+            indicators = [indicator]
+        
+        def compute():
+            df = self.domestic_data
+            if start_year:
+                df = df[df['year'] >= start_year]
+            if end_year:
+                df = df[df['year'] <= end_year]
+            pairs = {}
+            for column in indicators:
+                observed = df[['year', base_column, column]].dropna().sort_values('year')
+                pairs[column] = (observed[base_column].to_numpy(), observed[column].to_numpy())
+            intervals = bootstrap_correlation_intervals(
+                pairs, n_resamples=n_resamples, confidence=confidence, seed=DEFAULT_SEED
+            )
+            return self._sanitize_data({
+                column: {
+                    'confidence': confidence,
+                    'n_resamples': n_resamples,
+                    'seed': DEFAULT_SEED,
+                    'n_samples': int(len(pairs[column][0])),
+                    **interval
+                }
+                for column, interval in intervals.items()
+            })
+        
+        params = {
+            'indicators': ','.join(indicators), 'start_year': start_year, 'end_year': end_year,
+            'n_resamples': n_resamples, 'confidence': confidence
+        }
+        results = self._cached('bootstrap', params, compute)
+        if indicator:
+            return results.get(indicator) if results else None
+        return results
+    
+    def get_lagged_correlation(self, indicator=None, min_lag=None, max_lag=None):
+        """
+        ラグ付き相互相関の結果を取得（ラグ範囲で絞り込み可能）
+        
+        Args:
+            indicator: 特定の指標（省略時は全指標）
+            min_lag: 最小ラグ（年）
+            max_lag: 最大ラグ（年）
+        
+        Returns:
+            dict: 指標ごとのラグ別相関係数
+        """
+        if self.correlation_results is None:
+            return None
+        
+        def _select(lagged):
+            lags = lagged['lags']
+            keep = [
+                i for i, lag in enumerate(lags)
+                if (min_lag is None or lag >= min_lag) and (max_lag is None or lag <= max_lag)
+            ]
+            selected = {
+                key: [values[i] for i in keep]
+                for key, values in lagged.items()
+                if isinstance(values, list)
+            }
+            selected['best_lag'] = lagged.get('best_lag')
+            return selected
+        
+        results = {
+            name: _select(result['lagged_correlation'])
+            for name, result in self.correlation_results.items()
+            if isinstance(result, dict) and result.get('lagged_correlation')
+        }
+        
+        if indicator:
+            return self._sanitize_data(results.get(indicator))
+        
+        return self._sanitize_data(results)
+    
+    def get_correlation_matrix(self, method='pearson', indicators=None):
+        """
+        全指標の相関行列を取得
+        
+        Args:
+            method: 'pearson' または 'spearman'
+            indicators: 取得する指標のリスト（省略時は全指標）
+        
+        Raises:
+            ValueError: 相関の種類が不正な場合
+        """
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Invalid method: {method}. Use one of {', '.join(CORRELATION_METHODS)}")
+        if not self.correlation_matrices or method not in self.correlation_matrices:
+            return None
+        
+        matrix = self.correlation_matrices[method]
+        if indicators:
+            keep = [i for i, col in enumerate(matrix['columns']) if col in indicators]
+            matrix = {
+                'columns': [matrix['columns'][i] for i in keep],
+                **{
+                    key: [[matrix[key][i][j] for j in keep] for i in keep]
+                    for key in ('correlation', 'p_values', 'n_samples')
+                }
+            }
+        return self._sanitize_data(matrix)
+    
     def get_timeseries_analysis(self):
         """時系列分析結果を取得"""
         return self._sanitize_data(self.timeseries_results)
     
+    def get_panel_index(self):
+        """国別分析の索引を取得"""
+        return self._sanitize_data(self.panel_index)
+    
+    def get_panel_analysis(self, country, sections=None):
+        """
+        1か国（または 'pooled'）の分析結果を取得
+        
+        Args:
+            country: 国コード、またはプールした結果の場合は 'pooled'
+            sections: 取得する項目のリスト（例: ['correlation', 'time_series']、省略時は全て）
+        
+        Returns:
+            dict: 分析結果（索引にない国の場合はNone）
+        
+        Raises:
+            ValueError: 存在しない項目が指定された場合
+        """
+        if not self.panel_index:
+            return None
+        
+        if country == 'pooled':
+            entry = self.panel_index.get('pooled')
+        else:
+            entry = self.panel_index.get('countries', {}).get(country.upper())
+        if not entry:
+            return None
+        
+        filename = entry['file']
+        if filename not in self.panel_shards:
+            shard_path = PANEL_ANALYSIS_DIR / filename
+            if not shard_path.exists():
+                return None
+            with open(shard_path, 'r', encoding='utf-8') as f:
+                self.panel_shards[filename] = json.load(f)
+        shard = self.panel_shards[filename]
+        
+        if sections:
+            unknown = [section for section in sections if section not in shard]
+            if unknown:
+                raise ValueError(
+                    f"Unknown sections: {', '.join(unknown)}. Use one of {', '.join(shard)}"
+                )
+            shard = {section: shard[section] for section in sections}
+        
+        return self._sanitize_data(shard)
+    
     def get_metadata(self):
         """メタデータを取得"""
         return self._sanitize_data(self.metadata)
@@ -132,8 +710,11 @@ class DataLoader:
         if self.combined_data is None:
             return []
         
-        # 'year'以外の列を指標として返す
-        indicators = [col for col in self.combined_data.columns if col != 'year']
+        # 国・年以外の数値列を指標として返す
+        indicators = [
+            col for col in self.combined_data.columns
+            if col not in self.sort_keys and pd.api.types.is_numeric_dtype(self.combined_data[col])
+        ]
         return indicators
     
     def get_year_range(self):
@@ -0,0 +1,296 @@
+"""
+フィルタ式
+/api/data の where= パラメータで使う安全な式文法を、NumPyのマスク演算に変換する
+
+文法:
+    expr       := and_expr (OR and_expr)*
+    and_expr   := not_expr (AND not_expr)*
+    not_expr   := NOT not_expr | primary
+    primary    := '(' expr ')'
+                | column IS [NOT] NULL
+                | operand [NOT] IN '(' number (',' number)* ')'
+                | operand [NOT] BETWEEN operand AND operand
+                | operand op operand
+    operand    := column | number
+    op         := = | == | != | <> | < | <= | > | >=
+
+例: hours_per_year > 2000 AND gdp_growth_rate < 2
+
+NULL（NaN）はSQLと同様の三値論理で扱う。NULLとの比較は「不明」となり、
+NOT を付けても真にはならない。最終的なマスクは真の行のみ。
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+
+KEYWORDS = {'AND', 'OR', 'NOT', 'IS', 'NULL', 'IN', 'BETWEEN'}
+
+_TOKEN_PATTERN = re.compile(r'''
+    \s*(?:
+        (?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+      | (?P<op><=|>=|==|!=|<>|=|<|>)
+      | (?P<paren>[()])
+      | (?P<comma>,)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    )
+''', re.VERBOSE)
+
+_COMPARATORS = {
+    '=': np.equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    '<>': np.not_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+}
+
+
+class FilterExpressionError(ValueError):
+    """フィルタ式の構文エラー・未知の列"""
+
+
+def _tokenize(expression):
+    """式をトークン列に分解"""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if match is None or match.end() == position:
+            raise FilterExpressionError(f"Unexpected character at position {position}: {expression[position:]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'name' and text.upper() in KEYWORDS:
+            tokens.append(('keyword', text.upper()))
+        elif kind == 'number':
+            tokens.append(('number', float(text)))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+class _Parser:
+    """
+    再帰下降パーサ（評価関数を組み立てる）
+
+    各評価関数は (真のマスク, 値が確定しているマスク) の組を返す。
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+        self.columns = set()
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _take(self, kind=None, value=None):
+        token = self._peek()
+        if token[0] is None or (kind and token[0] != kind) or (value and token[1] != value):
+            expected = value or kind or 'token'
+            found = token[1] if token[0] else 'end of expression'
+            raise FilterExpressionError(f"Expected {expected}, found {found!r}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise FilterExpressionError("Empty filter expression")
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise FilterExpressionError(f"Unexpected token {self._peek()[1]!r}")
+        return lambda cols, n=node: n(cols)[0]
+
+    def _or(self):
+        node = self._and()
+        while self._peek() == ('keyword', 'OR'):
+            self._take()
+            left, right = node, self._and()
+
+            def node(cols, l=left, r=right):
+                (a, ka), (b, kb) = l(cols), r(cols)
+                # どちらかが真なら真、両方が確定していれば確定
+                return a | b, (ka & kb) | a | b
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek() == ('keyword', 'AND'):
+            self._take()
+            left, right = node, self._not()
+
+            def node(cols, l=left, r=right):
+                (a, ka), (b, kb) = l(cols), r(cols)
+                # どちらかが偽と確定していれば偽と確定
+                return a & b, (ka & kb) | (ka & ~a) | (kb & ~b)
+        return node
+
+    def _not(self):
+        if self._peek() == ('keyword', 'NOT'):
+            self._take()
+            inner = self._not()
+
+            def node(cols, i=inner):
+                value, known = i(cols)
+                return ~value & known, known
+            return node
+        return self._primary()
+
+    def _primary(self):
+        kind, value = self._peek()
+        if kind == 'paren' and value == '(':
+            self._take()
+            node = self._or()
+            self._take('paren', ')')
+            return node
+
+        left = self._operand()
+        if self._peek() == ('keyword', 'IS'):
+            self._take()
+            negate = self._peek() == ('keyword', 'NOT')
+            if negate:
+                self._take()
+            self._take('keyword', 'NULL')
+            if left[0] != 'column':
+                raise FilterExpressionError("IS NULL requires a column")
+            name = left[1]
+            if negate:
+                return lambda cols, n=name: (~np.isnan(cols[n]), np.True_)
+            return lambda cols, n=name: (np.isnan(cols[n]), np.True_)
+
+        negate = self._peek() == ('keyword', 'NOT')
+        if negate:
+            self._take()
+            if self._peek() not in (('keyword', 'IN'), ('keyword', 'BETWEEN')):
+                raise FilterExpressionError("NOT must be followed by IN or BETWEEN here")
+        if self._peek() == ('keyword', 'IN'):
+            node = self._in(left)
+        elif self._peek() == ('keyword', 'BETWEEN'):
+            node = self._between(left)
+        else:
+            node = self._comparison(left)
+
+        if not negate:
+            return node
+
+        def negated(cols, n=node):
+            value, known = n(cols)
+            return ~value & known, known
+        return negated
+
+    def _comparison(self, left):
+        op = self._take('op')[1]
+        right = self._operand()
+        if left[0] == 'number' and right[0] == 'number':
+            raise FilterExpressionError("Comparison must reference at least one column")
+
+        compare = _COMPARATORS[op]
+        get_left, get_right = self._getter(left), self._getter(right)
+
+        # SQLと同様に、NULLとの比較は不明（真にも偽にもならない）
+        def node(cols):
+            a, b = get_left(cols), get_right(cols)
+            known = ~np.isnan(a) & ~np.isnan(b)
+            return compare(a, b) & known, known
+        return node
+
+    def _in(self, left):
+        self._take('keyword', 'IN')
+        self._take('paren', '(')
+        values = [self._take('number')[1]]
+        while self._peek()[0] == 'comma':
+            self._take()
+            values.append(self._take('number')[1])
+        self._take('paren', ')')
+        if left[0] != 'column':
+            raise FilterExpressionError("IN requires a column")
+
+        get_left = self._getter(left)
+        candidates = np.array(values, dtype=float)
+
+        def node(cols):
+            a = get_left(cols)
+            return np.isin(a, candidates), ~np.isnan(a)
+        return node
+
+    def _between(self, left):
+        self._take('keyword', 'BETWEEN')
+        low = self._operand()
+        self._take('keyword', 'AND')
+        high = self._operand()
+        if left[0] == 'number' and low[0] == 'number' and high[0] == 'number':
+            raise FilterExpressionError("BETWEEN must reference at least one column")
+
+        get_value, get_low, get_high = self._getter(left), self._getter(low), self._getter(high)
+
+        def node(cols):
+            a, lo, hi = get_value(cols), get_low(cols), get_high(cols)
+            known = ~np.isnan(a) & ~np.isnan(lo) & ~np.isnan(hi)
+            return (a >= lo) & (a <= hi) & known, known
+        return node
+
+    def _operand(self):
+        kind, value = self._peek()
+        if kind == 'name':
+            self._take()
+            self.columns.add(value)
+            return ('column', value)
+        if kind == 'number':
+            self._take()
+            return ('number', value)
+        found = value if kind else 'end of expression'
+        raise FilterExpressionError(f"Expected column or number, found {found!r}")
+
+    @staticmethod
+    def _getter(operand):
+        kind, value = operand
+        if kind == 'column':
+            return lambda cols: cols[value]
+        constant = np.float64(value)
+        return lambda cols: constant
+
+
+class CompiledFilter:
+    """コンパイル済みのフィルタ式"""
+
+    def __init__(self, expression, evaluate, columns):
+        self.expression = expression
+        self.columns = frozenset(columns)
+        self._evaluate = evaluate
+
+    def __call__(self, column_arrays, length=None):
+        """
+        列配列の辞書に対してマスクを計算
+
+        Args:
+            column_arrays: {列名: float配列}
+            length: 行数（定数のみで比較する場合のブロードキャスト用）
+
+        Returns:
+            np.ndarray: 真偽値マスク
+        """
+        missing = sorted(self.columns - set(column_arrays))
+        if missing:
+            raise FilterExpressionError(f"Unknown column(s): {', '.join(missing)}")
+        if length is None:
+            length = len(next(iter(column_arrays.values()))) if column_arrays else 0
+        mask = self._evaluate(column_arrays)
+        return np.broadcast_to(np.asarray(mask, dtype=bool), (length,))
+
+
+@lru_cache(maxsize=256)
+def compile_filter(expression):
+    """
+    フィルタ式をコンパイル（式文字列ごとにキャッシュ）
+
+    Raises:
+        FilterExpressionError: 構文エラーの場合
+    """
+    parser = _Parser(_tokenize(expression))
+    evaluate = parser.parse()
+    return CompiledFilter(expression, evaluate, parser.columns)
@@ -0,0 +1,110 @@
+"""
+順位キャッシュ
+指標ごとのソート順と同順位グループを事前計算し、任意の年範囲の
+スピアマン順位相関を再ソートなしで計算する
+"""
+
+import numpy as np
+from scipy import stats
+
+
+class RankCache:
+    """スナップショットごとに一度だけ構築する順位構造"""
+
+    def __init__(self, df, base_column='hours_per_year'):
+        self.base_column = base_column
+        self.years = df['year'].to_numpy(dtype=int)
+        self.columns = [
+            col for col in df.columns
+            if col != 'year' and np.issubdtype(df[col].dtype, np.number)
+        ]
+        self._values = {}
+        self._order = {}
+        self._groups = {}
+
+        for col in self.columns:
+            values = df[col].to_numpy(dtype=float)
+            # NaNは末尾に並ぶ（範囲マスクで常に除外される）
+            order = np.argsort(values, kind='stable')
+            sorted_values = values[order]
+            # 同じ値を持つ連続区間に同じグループIDを振る
+            groups = np.concatenate(([0], np.cumsum(sorted_values[1:] != sorted_values[:-1])))
+            self._values[col] = values
+            self._order[col] = order
+            self._groups[col] = groups
+
+    def _ranks(self, column, mask):
+        """
+        マスクで選択した行の平均順位を計算（ソートは行わない）
+
+        Returns:
+            np.ndarray: 選択行の順位（元の行順）
+        """
+        order = self._order[column]
+        selected = mask[order]
+        rows = order[selected]
+        groups = self._groups[column][selected]
+
+        if len(rows) == 0:
+            return np.empty(0)
+
+        # 同順位グループの開始位置と件数から平均順位を求める
+        starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+        counts = np.diff(np.append(starts, len(groups)))
+        average_rank = starts + (counts + 1) / 2.0
+
+        ranks = np.empty(len(mask))
+        ranks[rows] = np.repeat(average_rank, counts)
+        return ranks[mask]
+
+    def spearman(self, column, start_year=None, end_year=None):
+        """
+        労働時間と指標のスピアマン順位相関を年範囲で計算
+
+        Args:
+            column: 指標名
+            start_year: 開始年
+            end_year: 終了年
+
+        Returns:
+            dict: 相関係数、p値、サンプル数（計算できない場合はNone）
+        """
+        if column not in self._values or self.base_column not in self._values:
+            return None
+
+        mask = ~np.isnan(self._values[self.base_column]) & ~np.isnan(self._values[column])
+        if start_year is not None:
+            mask &= self.years >= start_year
+        if end_year is not None:
+            mask &= self.years <= end_year
+
+        n = int(mask.sum())
+        if n < 3:
+            return None
+
+        rank_x = self._ranks(self.base_column, mask)
+        rank_y = self._ranks(column, mask)
+
+        dx = rank_x - rank_x.mean()
+        dy = rank_y - rank_y.mean()
+        denom = np.sqrt((dx * dx).sum() * (dy * dy).sum())
+        if denom == 0:
+            return None
+
+        corr = float(np.clip((dx * dy).sum() / denom, -1.0, 1.0))
+
+        # scipy.stats.spearmanr と同じt分布近似によるp値
+        dof = n - 2
+        if abs(corr) >= 1.0:
+            p_value = 0.0
+        else:
+            t_stat = corr * np.sqrt(dof / ((1.0 - corr) * (1.0 + corr)))
+            p_value = float(2 * stats.t.sf(np.abs(t_stat), dof))
+
+        return {
+            'spearman_correlation': corr,
+            'spearman_p_value': p_value,
+            'n_samples': n,
+            'start_year': int(self.years[mask].min()),
+            'end_year': int(self.years[mask].max())
+        }
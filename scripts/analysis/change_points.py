@@ -0,0 +1,280 @@
+"""
+構造変化点の検出
+区分線形モデル（区間ごとの直線回帰）の残差平方和をコストとして、
+PELT（Pruned Exact Linear Time）で最適な変化点を求める。
+また、全ての候補年でChow検定を行い、sup-F（QLR）統計量を求める。
+
+区間のコストは累積和（年・値のモーメント）の差から定数時間で計算するため、
+全体としてほぼ線形時間で動作する。
+"""
+
+import numpy as np
+
+# 1区間の最小の年数（傾きを推定できる長さ）
+DEFAULT_MIN_SEGMENT = 5
+
+# Chow検定の走査で両端から除く割合
+DEFAULT_TRIMMING = 0.15
+# 切片と傾きの2つの制約
+CHOW_RESTRICTIONS = 2
+# sup-F統計量の臨界値（Andrews 1993、制約数2、トリミング15%。Wald統計量の値を制約数で割ったもの）
+CHOW_CRITICAL_VALUES = {
+    0.15: {'10%': 5.00, '5%': 5.86, '1%': 7.78},
+}
+
+
+class SegmentMoments:
+    """
+    区間ごとの直線回帰に必要なモーメントの累積和
+
+    年は全体の平均で中心化、値は全体の標準偏差で割ってから累積するため、
+    差をとっても桁落ちしにくい。
+    """
+
+    def __init__(self, years, values):
+        self.years = np.asarray(years, dtype=float)
+        values = np.asarray(values, dtype=float)
+        self.offset = self.years.mean()
+        self.scale = values.std() or 1.0
+        self.center = values.mean()
+
+        t = self.years - self.offset
+        y = (values - self.center) / self.scale
+        moments = np.stack([np.ones_like(t), t, t * t, y, t * y, y * y])
+        # (n + 1, 6)。prefix[i] は先頭 i 点のモーメントの和
+        self.prefix = np.vstack([np.zeros(6), np.cumsum(moments, axis=1).T])
+
+    def sums(self, start, end):
+        """区間 [start, end) のモーメントの和（start, end は配列でもよい）"""
+        return (self.prefix[end] - self.prefix[start]).T
+
+    def cost(self, start, end):
+        """区間 [start, end) を1本の直線で当てはめた残差平方和（標準化した値の単位）"""
+        n, st, stt, sy, sty, syy = self.sums(start, end)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sxx = stt - st * st / n
+            sxy = sty - st * sy / n
+            ssr = syy - sy * sy / n - np.where(sxx > 0, sxy * sxy / sxx, 0.0)
+        return np.maximum(ssr, 0.0)
+
+    def fit(self, start, end):
+        """区間 [start, end) の直線回帰（傾き・区間初年の値・R²）"""
+        n, st, stt, sy, sty, syy = self.sums(start, end)
+        sxx = stt - st * st / n
+        sxy = sty - st * sy / n
+        syy_c = syy - sy * sy / n
+        slope = sxy / sxx if sxx > 0 else 0.0
+        first_year = self.years[start] - self.offset
+        level = sy / n + slope * (first_year - st / n)
+        r_squared = 1 - self.cost(start, end) / syy_c if syy_c > 0 else 0.0
+        return {
+            'start_year': int(self.years[start]),
+            'end_year': int(self.years[end - 1]),
+            'n_samples': int(n),
+            'slope': float(slope * self.scale),
+            'intercept': float(level * self.scale + self.center),
+            'r_squared': float(r_squared),
+        }
+
+
+def estimate_noise_variance(values):
+    """
+    二階差分のMADからノイズの分散を推定（標準化した値の単位）
+
+    直線の区間では二階差分はノイズのみになり、変化点の影響は数点に限られる。
+    """
+    values = np.asarray(values, dtype=float)
+    scale = values.std() or 1.0
+    second = np.diff(values / scale, n=2)
+    if len(second) == 0:
+        return 1.0
+    sigma = np.median(np.abs(second - np.median(second))) / 0.6745 / np.sqrt(6)
+    # 補間された滑らかな系列で変化点が増えすぎないよう、標準偏差の1%を下限とする
+    return max(sigma ** 2, 1e-4)
+
+
+def pelt(moments, penalty, min_size=DEFAULT_MIN_SEGMENT):
+    """
+    PELTで区分線形コスト＋区間数×ペナルティを最小にする区切りを求める（厳密解）
+
+    最小区間長があるため、時点 end で劣ると分かった候補 s でも、end を最後の区切りに
+    できない end + min_size 未満の時点ではまだ最適になり得る。そのため候補は
+    劣ると分かった時点ではなく、end + min_size の時点で除く（Killick et al. 2012 の
+    枝刈りを最小区間長に合わせたもの）。
+
+    Returns:
+        list: 各区間の終了位置（最後は系列の長さ）
+    """
+    n = len(moments.years)
+    best = np.full(n + 1, np.inf)
+    best[0] = -penalty
+    last = np.zeros(n + 1, dtype=int)
+    candidates = np.array([], dtype=int)
+    # 各候補を除く時点（まだ劣ると分かっていない候補は無限大）
+    prune_at = np.array([], dtype=float)
+
+    for end in range(min_size, n + 1):
+        start = end - min_size
+        if start == 0 or start >= min_size:
+            candidates = np.append(candidates, start)
+            prune_at = np.append(prune_at, np.inf)
+        keep = np.isfinite(best[candidates]) & (prune_at > end)
+        candidates, prune_at = candidates[keep], prune_at[keep]
+        if len(candidates) == 0:
+            continue
+
+        totals = best[candidates] + moments.cost(candidates, end) + penalty
+        i = int(np.argmin(totals))
+        best[end] = totals[i]
+        last[end] = candidates[i]
+        # 残差平方和は区間を分けると増えないため（K=0）、ここで劣る候補は
+        # end を最後の区切りにできる end + min_size 以降は最適になり得ない
+        dominated = totals - penalty > best[end]
+        prune_at[dominated] = np.minimum(prune_at[dominated], end + min_size)
+
+    if not np.isfinite(best[n]):
+        return [n]
+
+    ends = []
+    end = n
+    while end > 0:
+        ends.append(end)
+        end = last[end]
+    return ends[::-1]
+
+
+def detect_change_points(years, values, penalty=None, min_size=DEFAULT_MIN_SEGMENT):
+    """
+    1本の系列の構造変化点を検出
+
+    Args:
+        years: 年（昇順）
+        values: 値（欠損は除いておく）
+        penalty: 区間を1つ増やすペナルティ（省略時はBIC相当: 3 × ノイズ分散 × log n）
+        min_size: 1区間の最小の年数
+
+    Returns:
+        dict: 変化点の年（新しい区間の初年）と区間ごとの直線の当てはめ
+            （サンプル数が足りない場合はNone）
+    """
+    years = np.asarray(years, dtype=float)
+    values = np.asarray(values, dtype=float)
+    n = len(years)
+    if n < max(min_size, 3):
+        return None
+
+    moments = SegmentMoments(years, values)
+    if penalty is None:
+        penalty = 3 * estimate_noise_variance(values) * np.log(n)
+
+    ends = pelt(moments, penalty, min_size=min_size)
+    starts = [0] + ends[:-1]
+    return {
+        'method': 'pelt',
+        'cost': 'piecewise_linear',
+        'penalty': float(penalty),
+        'min_segment_length': int(min_size),
+        'break_years': [int(years[start]) for start in starts[1:]],
+        'segments': [moments.fit(start, end) for start, end in zip(starts, ends)],
+    }
+
+
+def chow_scan(years, values, trimming=DEFAULT_TRIMMING):
+    """
+    全ての候補年について、直線トレンドの切片・傾きの構造変化をChow検定（sup-F/QLR）
+
+    各分割の回帰は累積和から求めるため、候補年ごとに再推定しない。
+
+    Args:
+        years: 年（昇順）
+        values: 値（欠損は除いておく）
+        trimming: 両端から除く割合（各区間に最低限必要なサンプルの割合）
+
+    Returns:
+        dict: 候補年ごとのF統計量、最大値（sup-F）とその年、臨界値
+            （候補年がない場合はNone）
+    """
+    years = np.asarray(years, dtype=float)
+    values = np.asarray(values, dtype=float)
+    n = len(years)
+    q = CHOW_RESTRICTIONS
+    first = max(int(np.ceil(trimming * n)), q + 1)
+    last = min(int(np.floor((1 - trimming) * n)), n - q - 1)
+    if last < first or n <= 2 * q:
+        return None
+
+    moments = SegmentMoments(years, values)
+    splits = np.arange(first, last + 1)
+    restricted = moments.cost(0, n)
+    unrestricted = moments.cost(0, splits) + moments.cost(splits, n)
+    # 各区間が完全な直線の場合もF統計量が無限大にならないようにする
+    unrestricted = np.maximum(unrestricted, 1e-12 * max(restricted, 1e-300))
+    f_stats = ((restricted - unrestricted) / q) / (unrestricted / (n - 2 * q))
+
+    best = int(np.argmax(f_stats))
+    sup_f = float(f_stats[best])
+    critical_values = CHOW_CRITICAL_VALUES.get(trimming)
+    significant_at = None
+    if critical_values:
+        passed = [level for level, value in critical_values.items() if sup_f > value]
+        significant_at = min(passed, key=lambda level: float(level.rstrip('%'))) if passed else None
+
+    return {
+        'statistic': 'sup_f',
+        'trimming': trimming,
+        'n_restrictions': q,
+        'years': [int(year) for year in years[splits]],
+        'f_statistics': [float(value) for value in f_stats],
+        'sup_f': sup_f,
+        'break_year': int(years[splits[best]]),
+        'critical_values': critical_values,
+        'significant_at': significant_at,
+    }
+
+
+def apply_to_series(df, columns, func, **options):
+    """
+    各指標の系列に関数を適用
+
+    Args:
+        df: year列（整数）と指標の列を持つ1系列分のDataFrame
+        func: (年, 値, **options) を受け取る関数
+
+    Returns:
+        dict: {指標: 結果}
+    """
+    results = {}
+    for column in columns:
+        if column not in df.columns:
+            continue
+        observed = df[['year', column]].dropna().sort_values('year')
+        results[column] = func(observed['year'].to_numpy(), observed[column].to_numpy(), **options)
+    return results
+
+
+def apply_to_panel(panel, columns, func, group='country', **options):
+    """
+    パネルの全ての系列（国×指標）に関数を適用
+
+    Returns:
+        dict: {国: {指標: 結果}}（group列がない場合は単一系列として {None: ...}）
+    """
+    if group not in panel.columns:
+        return {None: apply_to_series(panel, columns, func, **options)}
+
+    return {
+        str(key): apply_to_series(series, columns, func, **options)
+        for key, series in panel.groupby(group, observed=True, sort=True)
+    }
+
+
+def detect_panel_change_points(panel, columns, group='country', penalty=None,
+                               min_size=DEFAULT_MIN_SEGMENT):
+    """パネルの全ての系列（国×指標）の構造変化点を検出"""
+    return apply_to_panel(panel, columns, detect_change_points, group=group,
+                          penalty=penalty, min_size=min_size)
+
+
+def chow_scan_panel(panel, columns, group='country', trimming=DEFAULT_TRIMMING):
+    """パネルの全ての系列（国×指標）でChow検定の走査を行う"""
+    return apply_to_panel(panel, columns, chow_scan, group=group, trimming=trimming)
@@ -0,0 +1,7 @@
+"""
+分析全体で共有する定数
+CLI・API・テストで同じ値を使うよう、ここでのみ定義する。
+"""
+
+# ブートストラップ・並べ替え検定の乱数シード（同じデータからは同じ結果を得る）
+DEFAULT_SEED = 20240101
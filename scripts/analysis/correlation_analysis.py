@@ -7,59 +7,126 @@ import numpy as np
 from scipy import stats
 from pathlib import Path
 import json
+import sys
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.data_processing.schema import read_table
+from scripts.data_processing.reconciliation import DOMESTIC_COUNTRY
+from scripts.data_processing.instrumentation import record_rows
+from scripts.analysis.correlation_matrix import (
+    CORRELATION_METHODS, correlation_matrix, matrix_to_json, select_indicator_columns, standardize_masked
+)
+from scripts.analysis.bootstrap import DEFAULT_CONFIDENCE, DEFAULT_RESAMPLES, bootstrap_correlation_intervals
+from scripts.analysis.constants import DEFAULT_SEED
+from scripts.analysis.transforms import TRANSFORMS, transform_grid, year_grid
+from scripts.analysis.partial_correlation import partial_correlations
+from scripts.analysis.granger import DEFAULT_MAX_LAG, granger_causality_frame
+from scripts.analysis.permutation import (
+    DEFAULT_PERMUTATIONS, PERMUTATION_SCHEMES, permutation_test
+)
+
 DATA_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def load_combined_data():
-    """統合データセットを読み込み"""
-    data_path = DATA_PROCESSED_DIR / "combined_dataset.csv"
+def load_combined_data(columns=None, country=DOMESTIC_COUNTRY):
+    """統合データセットから1か国の系列を読み込み（columns=Noneで全列）"""
+    df = read_table('combined_dataset', columns=columns)
     
-    if not data_path.exists():
+    if df is None:
         print("Combined dataset not found. Please run data processing first.")
         return None
     
-    return pd.read_csv(data_path)
+    if 'country' in df.columns:
+        df = df[df['country'] == country].drop(columns='country').reset_index(drop=True)
+    return df
 
 
-def calculate_correlation(labor_hours, economic_indicator):
+def calculate_lagged_correlations(df, max_lag=5, base_column='hours_per_year'):
     """
-    労働時間と経済指標の相関係数を計算
-    
+    労働時間と各指標のラグ付き相互相関を計算（FFTによる一括計算）
+
+    ラグkは「労働時間(t)」と「指標(t+k)」の相関を表す。
+    kが正なら労働時間が先行、負なら指標が先行していることを意味する。
+    欠損年はマスクとして扱い、各ラグで両方が観測されている年のみを使用する。
+
+    Args:
+        df: 統合データセット（year列を含む）
+        max_lag: 計算する最大ラグ（年）
+        base_column: 基準となる列
+
     Returns:
-        dict: 相関係数、p値、統計情報
+        dict: 指標ごとのラグ別相関係数、p値、サンプル数
     """
-    # 欠損値を除外
-    valid_data = pd.DataFrame({
-        'labor_hours': labor_hours,
-        'economic': economic_indicator
-    }).dropna()
-    
-    if len(valid_data) < 3:
+    if df is None or base_column not in df.columns:
         return None
-    
-    # ピアソンの相関係数
-    corr, p_value = stats.pearsonr(
-        valid_data['labor_hours'],
-        valid_data['economic']
-    )
-    
-    # スピアマンの順位相関係数（ノンパラメトリック）
-    spearman_corr, spearman_p = stats.spearmanr(
-        valid_data['labor_hours'],
-        valid_data['economic']
-    )
-    
-    return {
-        'pearson_correlation': float(corr),
-        'pearson_p_value': float(p_value),
-        'spearman_correlation': float(spearman_corr),
-        'spearman_p_value': float(spearman_p),
-        'n_samples': len(valid_data),
-        'interpretation': interpret_correlation(corr)
-    }
+
+    indicators = [
+        col for col in df.columns
+        if col not in ('year', base_column) and pd.api.types.is_numeric_dtype(df[col])
+    ]
+    if not indicators:
+        return {}
+
+    # 欠損年を含む連続した年次グリッドに並べ直す
+    grid = year_grid(df, [base_column] + indicators)
+    n = len(grid)
+    max_lag = int(min(max_lag, n - 1))
+
+    x = grid[base_column].to_numpy(dtype=float)
+    y = grid[indicators].to_numpy(dtype=float)
+    mx = ~np.isnan(x)
+    my = ~np.isnan(y)
+
+    # 桁落ちを避けるため、全体の平均・標準偏差で標準化してからモーメントを計算
+    xs = standardize_masked(x, mx)
+    ys = standardize_masked(y, my)
+
+    # 相互相関 c[k] = Σ_t a[t] * b[t+k] を全指標・全モーメントについて一度のFFTで計算
+    nfft = 1 << int(np.ceil(np.log2(2 * n)))
+    a = np.stack([mx.astype(float), xs, xs ** 2])  # (3, n)
+    b = np.stack([my.astype(float), ys, ys ** 2])  # (3, n, m)
+    fa = np.conj(np.fft.rfft(a, n=nfft, axis=-1))
+    fb = np.fft.rfft(b, n=nfft, axis=1)
+    cc = np.fft.irfft(fa[:, None, :, None] * fb[None, :, :, :], n=nfft, axis=2)
+
+    lags = np.arange(-max_lag, max_lag + 1)
+    cc = cc[:, :, lags % nfft, :]  # (3, 3, n_lags, m)
+
+    count = np.rint(cc[0, 0])
+    sum_x, sum_y = cc[1, 0], cc[0, 1]
+    sum_xx, sum_yy, sum_xy = cc[2, 0], cc[0, 2], cc[1, 1]
+
+    cov = count * sum_xy - sum_x * sum_y
+    var_x = count * sum_xx - sum_x ** 2
+    var_y = count * sum_yy - sum_y ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.sqrt(var_x * var_y)
+        corr = np.where((count >= 3) & (var_x > 1e-9) & (var_y > 1e-9), corr, np.nan)
+        corr = np.clip(corr, -1.0, 1.0)
+        dof = count - 2
+        t_stat = corr * np.sqrt(dof / np.maximum(1 - corr ** 2, 1e-300))
+        p_values = 2 * stats.t.sf(np.abs(t_stat), np.maximum(dof, 1))
+    p_values = np.where(np.isnan(corr), np.nan, p_values)
+
+    def _to_list(values):
+        return [None if np.isnan(v) else float(v) for v in values]
+
+    results = {}
+    for j, indicator in enumerate(indicators):
+        valid = ~np.isnan(corr[:, j])
+        best_lag = int(lags[valid][np.argmax(np.abs(corr[valid, j]))]) if valid.any() else None
+        results[indicator] = {
+            'lags': lags.tolist(),
+            'correlations': _to_list(corr[:, j]),
+            'p_values': _to_list(p_values[:, j]),
+            'n_samples': count[:, j].astype(int).tolist(),
+            'best_lag': best_lag
+        }
+
+    return results
 
 
 def interpret_correlation(corr):
@@ -77,52 +144,207 @@ def interpret_correlation(corr):
         return "very_strong"
 
 
-def analyze_all_correlations(df):
-    """全ての経済指標と労働時間の相関を分析"""
-    if df is None or 'hours_per_year' not in df.columns:
-        return None
+def analyze_all_correlations(df, base_column='hours_per_year'):
+    """
+    労働時間と全ての指標の相関を分析
+    
+    数値列は自動的に指標として扱い、相関行列エンジンで全ペアを一括計算した
+    結果から労働時間の行を取り出す。
+    
+    Returns:
+        tuple: (指標ごとの結果のdict, ピアソン・スピアマンの相関行列のdict)
+    """
+    if df is None or base_column not in df.columns:
+        return None, None
+    
+    indicators = select_indicator_columns(df)
+    matrices = {
+        method: correlation_matrix(df, indicators, method=method)
+        for method in CORRELATION_METHODS
+    }
+    pearson = matrices['pearson']
+    spearman = matrices['spearman']
+    base = indicators.index(base_column)
     
-    labor_hours = df['hours_per_year']
     results = {}
+    for j, indicator in enumerate(indicators):
+        if indicator == base_column:
+            continue
+        
+        corr = pearson['correlation'][base, j]
+        if np.isnan(corr):
+            # 両方が観測されている年が3年未満
+            results[indicator] = None
+            continue
+        
+        results[indicator] = {
+            'pearson_correlation': float(corr),
+            'pearson_p_value': float(pearson['p_values'][base, j]),
+            'spearman_correlation': float(spearman['correlation'][base, j]),
+            'spearman_p_value': float(spearman['p_values'][base, j]),
+            'n_samples': int(pearson['n_samples'][base, j]),
+            'interpretation': interpret_correlation(corr)
+        }
     
-    # GDP成長率
-    if 'gdp_growth_rate' in df.columns:
-        results['gdp_growth_rate'] = calculate_correlation(
-            labor_hours,
-            df['gdp_growth_rate']
-        )
+    return results, matrices
+
+
+def add_lagged_correlations(results, df, max_lag=5):
+    """相関分析結果に各指標のラグ付き相互相関を追加"""
+    lagged = calculate_lagged_correlations(df, max_lag=max_lag)
+    if not lagged:
+        return results
+
+    for indicator, result in results.items():
+        if result and indicator in lagged:
+            result['lagged_correlation'] = lagged[indicator]
+
+    return results
+
+
+def _observed_pairs(results, df, base_column):
+    """結果のある指標ごとに、労働時間と指標の両方が観測されている年の系列（年順）を取得"""
+    pairs = {}
+    for indicator, result in results.items():
+        if not result:
+            continue
+        observed = df[['year', base_column, indicator]].dropna().sort_values('year')
+        pairs[indicator] = (observed[base_column].to_numpy(), observed[indicator].to_numpy())
+    return pairs
+
+
+def add_bootstrap_intervals(results, df, base_column='hours_per_year', n_resamples=DEFAULT_RESAMPLES,
+                            confidence=DEFAULT_CONFIDENCE, seed=DEFAULT_SEED, jobs=1):
+    """
+    相関分析結果に各指標のブートストラップ信頼区間を追加
     
-    # 一人当たりGDP
-    if 'gdp_per_capita_usd' in df.columns:
-        results['gdp_per_capita_usd'] = calculate_correlation(
-            labor_hours,
-            df['gdp_per_capita_usd']
-        )
+    独立な復元抽出（iid）と、自己相関を考慮した移動ブロック（block）の両方で
+    ピアソン・スピアマン相関の区間を計算する。
+    """
+    pairs = _observed_pairs(results, df, base_column)
+    intervals = bootstrap_correlation_intervals(
+        pairs, n_resamples=n_resamples, confidence=confidence, seed=seed, jobs=jobs
+    )
+    for indicator, interval in intervals.items():
+        results[indicator]['bootstrap'] = {
+            'confidence': confidence,
+            'n_resamples': n_resamples,
+            'seed': seed,
+            **interval
+        }
     
-    # 労働生産性
-    if 'labor_productivity' in df.columns:
-        results['labor_productivity'] = calculate_correlation(
-            labor_hours,
-            df['labor_productivity']
-        )
+    return results
+
+
+def add_transformed_correlations(results, df, base_column='hours_per_year', transforms=TRANSFORMS):
+    """
+    相関分析結果に、トレンドを除いた系列どうしの相関を追加
     
-    # 労働生産性成長率
-    if 'labor_productivity_growth' in df.columns:
-        results['labor_productivity_growth'] = calculate_correlation(
-            labor_hours,
-            df['labor_productivity_growth']
-        )
+    一階差分・対数差分・線形トレンド除去・HPフィルタ除去の残差を全ての列について
+    一括で計算し、全ての変換の列を並べた1つの表から相関行列エンジンで相関を求める。
+    """
+    indicators = [indicator for indicator, result in results.items() if result]
+    if not indicators:
+        return results
     
-    # 読書時間（サブ要素）
-    if 'reading_minutes_per_day' in df.columns:
-        results['reading_minutes_per_day'] = calculate_correlation(
-            labor_hours,
-            df['reading_minutes_per_day']
-        )
+    grid = year_grid(df, [base_column] + indicators)
+    transformed = transform_grid(grid, transforms)
+    wide = pd.concat(transformed, axis=1)
+    columns = list(wide.columns)
+    matrices = {
+        method: correlation_matrix(wide, columns, method=method)
+        for method in CORRELATION_METHODS
+    }
+    
+    def _value(matrix, key, i, j):
+        value = matrix[key][i, j]
+        return None if np.isnan(value) else float(value)
+    
+    for indicator in indicators:
+        variants = {}
+        for name in transforms:
+            i = columns.index((name, base_column))
+            j = columns.index((name, indicator))
+            if np.isnan(matrices['pearson']['correlation'][i, j]):
+                variants[name] = None
+                continue
+            variants[name] = {
+                'pearson_correlation': _value(matrices['pearson'], 'correlation', i, j),
+                'pearson_p_value': _value(matrices['pearson'], 'p_values', i, j),
+                'spearman_correlation': _value(matrices['spearman'], 'correlation', i, j),
+                'spearman_p_value': _value(matrices['spearman'], 'p_values', i, j),
+                'n_samples': int(matrices['pearson']['n_samples'][i, j]),
+            }
+        results[indicator]['transformed_correlations'] = variants
     
     return results
 
 
+def add_partial_correlations(results, df, base_column='hours_per_year'):
+    """
+    相関分析結果に、年（時間トレンド）および年と他の指標を制御した偏相関を追加
+    
+    偏相関は指標ごとに、労働時間・指標・制御変数の全てが観測されている年だけで計算する
+    （APIの /api/correlation/partial と同じ推定）。
+    """
+    indicators = [indicator for indicator, result in results.items() if result]
+    if not indicators or 'year' not in df.columns:
+        return results
+    
+    frame = df[['year', base_column] + indicators].astype(float)
+    by_year = partial_correlations(frame, base_column, ['year'], columns=indicators)
+    for indicator in indicators:
+        controls = ['year'] + [other for other in indicators if other != indicator]
+        by_all = partial_correlations(frame, base_column, controls, columns=[indicator])[indicator]
+        results[indicator]['partial_correlations'] = {
+            'year': by_year[indicator],
+            'year_and_other_indicators': {'controls': controls, **by_all} if by_all else None,
+        }
+    
+    return results
+
+
+def add_granger_causality(results, df, base_column='hours_per_year', max_lag=DEFAULT_MAX_LAG):
+    """相関分析結果に各指標と労働時間の両方向のグレンジャー因果性検定を追加"""
+    indicators = [indicator for indicator, result in results.items() if result]
+    granger = granger_causality_frame(df, base_column, indicators, max_lag=max_lag)
+    
+    for indicator, result in (granger or {}).items():
+        results[indicator]['granger_causality'] = result
+    
+    return results
+
+
+def add_permutation_tests(results, df, base_column='hours_per_year',
+                          n_permutations=DEFAULT_PERMUTATIONS, seed=DEFAULT_SEED):
+    """
+    相関分析結果に各指標の並べ替え検定のp値を追加
+    
+    全ての並べ替え（早期終了あり）と、自己相関を保つ循環シフトの両方で検定する。
+    """
+    for indicator, (x, y) in _observed_pairs(results, df, base_column).items():
+        results[indicator]['permutation_test'] = {
+            scheme: permutation_test(x, y, scheme=scheme, n_permutations=n_permutations, seed=seed)
+            for scheme in PERMUTATION_SCHEMES
+        }
+    
+    return results
+
+
+def save_correlation_matrix(matrices):
+    """全ペアの相関行列を保存"""
+    output_path = DATA_PROCESSED_DIR / "correlation_matrix.json"
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(
+            {method: matrix_to_json(result) for method, result in matrices.items()},
+            f, ensure_ascii=False, indent=2
+        )
+    
+    print(f"Saved correlation matrix to {output_path}")
+    return output_path
+
+
 def save_correlation_results(results):
     """相関分析結果を保存"""
     output_path = DATA_PROCESSED_DIR / "correlation_analysis.json"
@@ -134,8 +356,14 @@ def save_correlation_results(results):
     return output_path
 
 
-def main():
-    """相関分析のメイン関数"""
+def main(jobs=1, n_permutations=DEFAULT_PERMUTATIONS):
+    """
+    相関分析のメイン関数
+    
+    Args:
+        jobs: ブートストラップを並列実行するプロセス数
+        n_permutations: 並べ替え検定の最大回数（0の場合は検定しない）
+    """
     print("Performing correlation analysis...")
     
     # データ読み込み
@@ -145,9 +373,28 @@ def main():
         return
     
     # 相関分析
-    results = analyze_all_correlations(df)
+    results, matrices = analyze_all_correlations(df)
     
     if results:
+        # ラグ付き相互相関（先行・遅行関係）
+        add_lagged_correlations(results, df)
+        
+        # トレンドを除いた系列どうしの相関
+        add_transformed_correlations(results, df)
+        
+        # 年・他の指標を制御した偏相関
+        add_partial_correlations(results, df)
+        
+        # グレンジャー因果性（労働時間⇄指標）
+        add_granger_causality(results, df)
+        
+        # ブートストラップ信頼区間
+        add_bootstrap_intervals(results, df, jobs=jobs)
+        
+        # 並べ替え検定
+        if n_permutations > 0:
+            add_permutation_tests(results, df, n_permutations=n_permutations)
+        
         # 結果を表示
         print("\nCorrelation Analysis Results:")
         print("=" * 60)
@@ -156,11 +403,35 @@ def main():
                 print(f"\n{indicator}:")
                 print(f"  Pearson correlation: {result['pearson_correlation']:.4f}")
                 print(f"  P-value: {result['pearson_p_value']:.4f}")
+                permuted = result.get('permutation_test', {}).get('permutation')
+                if permuted:
+                    print(f"  Permutation p-value: {permuted['pearson_p_value']:.4f} "
+                          f"({permuted['n_permutations']} permutations)")
+                differenced = result.get('transformed_correlations', {}).get('diff')
+                if differenced:
+                    print(f"  Pearson correlation (first differences): {differenced['pearson_correlation']:.4f}")
+                partial = result.get('partial_correlations', {}).get('year')
+                if partial:
+                    print(f"  Partial correlation (controlling for year): {partial['partial_correlation']:.4f}")
+                granger = result.get('granger_causality')
+                if granger and granger['selected']['bic']:
+                    selected = granger['selected']['bic']
+                    print(f"  Granger (BIC lag {selected['lag']}): "
+                          f"hours->indicator p={selected['hours_to_indicator']['p_value']:.4f}, "
+                          f"indicator->hours p={selected['indicator_to_hours']['p_value']:.4f}")
+                block = result.get('bootstrap', {}).get('pearson', {}).get('block')
+                if block:
+                    print(f"  {result['bootstrap']['confidence']:.0%} CI (block bootstrap): "
+                          f"[{block['lower']:.4f}, {block['upper']:.4f}]")
                 print(f"  Interpretation: {result['interpretation']}")
                 print(f"  Sample size: {result['n_samples']}")
+                if result.get('lagged_correlation'):
+                    print(f"  Best lag: {result['lagged_correlation']['best_lag']} years")
         
         # 保存
         save_correlation_results(results)
+        save_correlation_matrix(matrices)
+        record_rows(rows_in=len(df), rows_out=len(results))
     else:
         print("No correlation analysis could be performed.")
 
@@ -0,0 +1,164 @@
+"""
+相関行列エンジン
+全ての列の組み合わせについて、両方が観測されている年のみを使う
+（ペアワイズ完全）ピアソン・スピアマン相関とp値をマスク付き行列積で一括計算
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# 指標として扱わない列
+KEY_COLUMNS = ('country', 'year')
+
+CORRELATION_METHODS = ('pearson', 'spearman')
+
+
+def select_indicator_columns(df, exclude=KEY_COLUMNS):
+    """数値列を指標として自動的に選択（キー列は除く）"""
+    return [
+        col for col in df.columns
+        if col not in exclude and pd.api.types.is_numeric_dtype(df[col])
+    ]
+
+
+def standardize_masked(values, mask):
+    """列ごとに全体の平均・標準偏差で標準化（桁落ちを避けるため）。欠損は0にする"""
+    counts = mask.sum(axis=0)
+    filled = np.where(mask, values, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=0) / counts
+        centered = np.where(mask, values - mean, 0.0)
+        std = np.sqrt((centered ** 2).sum(axis=0) / counts)
+    std = np.where((std > 0) & np.isfinite(std), std, 1.0)
+    return centered / std
+
+
+def _pairwise_pearson(values, mask):
+    """
+    ペアワイズ完全なピアソン相関
+
+    Returns:
+        tuple: (相関行列, 各ペアのサンプル数)
+    """
+    m = mask.astype(float)
+    x = standardize_masked(values, mask)
+
+    # [i, j] は i と j の両方が観測されている行での和
+    count = m.T @ m
+    sum_x = x.T @ m
+    sum_xx = (x * x).T @ m
+    sum_xy = x.T @ x
+
+    cov = count * sum_xy - sum_x * sum_x.T
+    var_x = count * sum_xx - sum_x ** 2
+    var_y = var_x.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.sqrt(var_x * var_y)
+    corr = np.where((var_x > 1e-12 * count ** 2) & (var_y > 1e-12 * count ** 2), corr, np.nan)
+    return np.clip(corr, -1.0, 1.0), count
+
+
+def _rank_correlation(ranks_x, ranks_y):
+    """順位（平均順位）どうしのピアソン相関（どちらかの順位が全て同じ場合はNaN）"""
+    n = len(ranks_x)
+    mean = (n + 1) / 2
+    cov = ranks_x @ ranks_y - n * mean * mean
+    var_x = ranks_x @ ranks_x - n * mean ** 2
+    var_y = ranks_y @ ranks_y - n * mean ** 2
+    if var_x <= 1e-9 or var_y <= 1e-9:
+        return np.nan
+    return cov / np.sqrt(var_x * var_y)
+
+
+def _pairwise_spearman(values, mask):
+    """
+    ペアワイズ完全なスピアマン相関
+
+    欠損がなければ列ごとに一度だけ順位を付け、順位のピアソン相関を行列積で求める。
+    欠損がある場合は、ペアごとに両方が観測されている行だけを取り出して順位を付け直す
+    （ペアあたり O(n log n) の時間と O(n) のメモリ）。欠損の位置が同じ列の組は
+    同じ行で順位を付けるため、順位を使い回す。
+    """
+    m = mask.astype(float)
+    count = m.T @ m
+    if mask.all():
+        ranks = stats.rankdata(values, axis=0)
+        corr, _ = _pairwise_pearson(ranks, mask)
+        return corr, count
+
+    k = values.shape[1]
+    corr = np.full((k, k), np.nan)
+    rank_cache = {}
+
+    def _ranks(column, rows, key):
+        if (column, key) not in rank_cache:
+            rank_cache[(column, key)] = stats.rankdata(values[rows, column])
+        return rank_cache[(column, key)]
+
+    for i in range(k):
+        for j in range(i, k):
+            rows = mask[:, i] & mask[:, j]
+            if rows.sum() < 2:
+                continue
+            key = rows.tobytes()
+            value = _rank_correlation(_ranks(i, rows, key), _ranks(j, rows, key))
+            corr[i, j] = corr[j, i] = value
+    return np.clip(corr, -1.0, 1.0), count
+
+
+def correlation_p_values(corr, count):
+    """相関係数のt分布によるp値（両側）"""
+    dof = count - 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_stat = corr * np.sqrt(dof / np.maximum(1 - corr ** 2, 1e-300))
+        p_values = 2 * stats.t.sf(np.abs(t_stat), np.maximum(dof, 1))
+    return np.where(np.isnan(corr), np.nan, p_values)
+
+
+def correlation_matrix(df, columns=None, method='pearson', min_periods=3):
+    """
+    全ての列の組み合わせの相関行列を計算
+
+    Args:
+        df: 指標の列を持つDataFrame
+        columns: 対象の列（省略時は数値列を自動選択）
+        method: 'pearson' または 'spearman'
+        min_periods: 相関を計算する最小サンプル数
+
+    Returns:
+        dict: columns（列名のリスト）、correlation・p_values・n_samples（列数×列数の配列）
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unknown correlation method: {method}")
+
+    columns = list(columns) if columns is not None else select_indicator_columns(df)
+    values = df[columns].to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+
+    if method == 'spearman':
+        corr, count = _pairwise_spearman(values, mask)
+    else:
+        corr, count = _pairwise_pearson(values, mask)
+
+    corr = np.where(count >= max(min_periods, 3), corr, np.nan)
+    np.fill_diagonal(corr, np.where(np.diag(count) >= max(min_periods, 3), 1.0, np.nan))
+    return {
+        'columns': columns,
+        'correlation': corr,
+        'p_values': correlation_p_values(corr, count),
+        'n_samples': count.astype(int),
+    }
+
+
+def matrix_to_json(result):
+    """相関行列の結果をJSONシリアライズ可能な形式に変換（NaNはNone）"""
+    def _to_lists(values):
+        return [[None if np.isnan(v) else float(v) for v in row] for row in values]
+
+    return {
+        'columns': result['columns'],
+        'correlation': _to_lists(result['correlation']),
+        'p_values': _to_lists(result['p_values']),
+        'n_samples': result['n_samples'].tolist(),
+    }
@@ -0,0 +1,173 @@
+"""
+グレンジャー因果性検定
+労働時間と各指標について、両方向（労働時間→指標、指標→労働時間）の
+グレンジャー因果性をラグ次数 1..p で検定し、AIC・BICでラグ次数を選択する。
+
+全ての指標・方向・ラグ次数の制約付き／制約なし回帰を、説明変数と標本の
+マスクで揃えた一つの配列にまとめ、一度の最小二乗（擬似逆行列）で解く。
+各回帰には定数項と線形トレンドを含める（トレンド定常を仮定）。
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from scripts.analysis.transforms import year_grid
+
+DEFAULT_MAX_LAG = 4
+
+# 方向の名前（目的変数が指標、労働時間の順）
+DIRECTIONS = ('hours_to_indicator', 'indicator_to_hours')
+
+
+def _lag_matrix(values, max_lag):
+    """(年, ラグ1..max_lag) の行列。系列の先頭より前はNaN"""
+    n = len(values)
+    lagged = np.full((n, max_lag), np.nan)
+    for i in range(1, max_lag + 1):
+        lagged[i:, i - 1] = values[:n - i]
+    return lagged
+
+
+def _standardize(values):
+    """観測値の平均・標準偏差で標準化（標準偏差も返す）"""
+    mean = np.nanmean(values)
+    std = np.nanstd(values)
+    std = std if std > 0 else 1.0
+    return (values - mean) / std, std
+
+
+def granger_causality(grid, base_column, indicators, max_lag=DEFAULT_MAX_LAG):
+    """
+    労働時間と各指標のグレンジャー因果性を両方向・全ラグ次数で検定
+
+    ラグ次数の比較ができるよう、指標ごとに最大ラグまで全て観測されている
+    共通の年を標本とする。
+
+    Args:
+        grid: 連続した年次グリッド（年をindexとし、欠損年はNaN）
+        base_column: 労働時間の列
+        indicators: 指標の列
+        max_lag: 最大ラグ次数
+
+    Returns:
+        dict: 指標ごとの方向別F統計量・p値、AIC・BICと選択されたラグ次数
+            （標本が足りない指標はNone）
+    """
+    n = len(grid)
+    p = int(max_lag)
+    # 列の並び: [定数, トレンド, 目的変数のラグ1..p, 他方の変数のラグ1..p]
+    width = 2 + 2 * p
+    trend = (np.arange(n) - (n - 1) / 2) / max(n, 1)
+
+    hours, hours_scale = _standardize(grid[base_column].to_numpy(dtype=float))
+    hours_lags = _lag_matrix(hours, p)
+
+    # 回帰ごとの説明変数の列マスク (ラグ次数, 制約なし/制約付き, 列)
+    column_mask = np.zeros((p, 2, width), dtype=bool)
+    column_mask[:, :, :2] = True
+    for k in range(1, p + 1):
+        column_mask[k - 1, :, 2:2 + k] = True
+        column_mask[k - 1, 0, 2 + p:2 + p + k] = True
+
+    designs, targets, row_masks, scales = [], [], [], []
+    for indicator in indicators:
+        values, scale = _standardize(grid[indicator].to_numpy(dtype=float))
+        value_lags = _lag_matrix(values, p)
+        # 当期と最大ラグまで両方が観測されている年
+        rows = (
+            ~np.isnan(values) & ~np.isnan(hours)
+            & ~np.isnan(value_lags).any(axis=1) & ~np.isnan(hours_lags).any(axis=1)
+        )
+        for target, own, other in ((values, value_lags, hours_lags), (hours, hours_lags, value_lags)):
+            design = np.column_stack([np.ones(n), trend, own, other])
+            designs.append(np.where(rows[:, None], np.nan_to_num(design), 0.0))
+            targets.append(np.where(rows, np.nan_to_num(target), 0.0))
+        row_masks.append(rows)
+        scales.append(scale)
+
+    if not designs:
+        return {}
+
+    # (指標, 方向, ラグ次数, 制約なし/制約付き, 年, 列) の全ての回帰を一度に解く
+    designs = np.stack(designs).reshape(len(indicators), 2, 1, 1, n, width)
+    targets = np.stack(targets).reshape(len(indicators), 2, 1, 1, n)
+    X = designs * column_mask[None, None, :, :, None, :]
+    y = np.broadcast_to(targets, X.shape[:-1])
+    coef = np.einsum('...wn,...n->...w', np.linalg.pinv(X), y)
+    residuals = y - np.einsum('...nw,...w->...n', X, coef)
+    rss = (residuals ** 2).sum(axis=-1)
+
+    lags = np.arange(1, p + 1)
+    results = {}
+    for j, indicator in enumerate(indicators):
+        T = int(row_masks[j].sum())
+        df_resid = T - (2 + 2 * lags)
+        if df_resid.min() < 1:
+            results[indicator] = None
+            continue
+
+        entry = {'max_lag': p, 'n_samples': T}
+        for d, direction in enumerate(DIRECTIONS):
+            unrestricted, restricted = rss[j, d, :, 0], rss[j, d, :, 1]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                f_stats = ((restricted - unrestricted) / lags) / (unrestricted / df_resid)
+            f_stats = np.where(np.isfinite(f_stats), np.maximum(f_stats, 0.0), np.nan)
+            entry[direction] = {
+                'lags': lags.tolist(),
+                'f_statistics': [None if np.isnan(v) else float(v) for v in f_stats],
+                'p_values': [
+                    None if np.isnan(v) else float(v) for v in stats.f.sf(f_stats, lags, df_resid)
+                ],
+            }
+
+        # 2変数VAR(k)の情報量規準（残差共分散は元の単位に戻す）
+        e = residuals[j, :, :, 0, :]  # (方向, ラグ次数, 年)
+        sigma = np.einsum('akn,bkn->kab', e, e) / T
+        sign, logdet = np.linalg.slogdet(sigma)
+        logdet = np.where(sign > 0, logdet, np.nan) + 2 * np.log(scales[j] * hours_scale)
+        n_params = 2 * (2 + 2 * lags)
+        aic = logdet + 2 * n_params / T
+        bic = logdet + np.log(T) * n_params / T
+        entry['aic'] = [None if np.isnan(v) else float(v) for v in aic]
+        entry['bic'] = [None if np.isnan(v) else float(v) for v in bic]
+
+        selected = {}
+        for criterion, values in (('aic', aic), ('bic', bic)):
+            if np.all(np.isnan(values)):
+                selected[criterion] = None
+                continue
+            k = int(np.nanargmin(values))
+            selected[criterion] = {
+                'lag': int(lags[k]),
+                **{
+                    direction: {
+                        'f_statistic': entry[direction]['f_statistics'][k],
+                        'p_value': entry[direction]['p_values'][k],
+                    }
+                    for direction in DIRECTIONS
+                }
+            }
+        entry['selected'] = selected
+        results[indicator] = entry
+
+    return results
+
+
+def granger_causality_frame(df, base_column='hours_per_year', indicators=None, max_lag=DEFAULT_MAX_LAG):
+    """
+    year列を持つDataFrameからグレンジャー因果性を検定（欠損年を含む年次グリッドに並べ直す）
+
+    Returns:
+        dict: granger_causality の結果
+    """
+    if df is None or base_column not in df.columns:
+        return None
+
+    if indicators is None:
+        indicators = [
+            col for col in df.columns
+            if col not in ('year', base_column) and pd.api.types.is_numeric_dtype(df[col])
+        ]
+    grid = year_grid(df, [base_column] + list(indicators))
+    return granger_causality(grid, base_column, list(indicators), max_lag=max_lag)
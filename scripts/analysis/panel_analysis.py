@@ -0,0 +1,275 @@
+"""
+パネルデータの国別分析
+統合データセットを国ごとに分け、相関分析と時系列分析をプロセスプールで
+並列に実行する。各国の結果は data/processed/panel_analysis/<国>.json に、
+全ての国をまとめた（プールした）結果は _pooled.json に保存し、
+APIが必要な国だけを読み込めるよう index.json に一覧を記録する。
+
+パネルの数値列はワーカーにDataFrameとして渡さず、共有メモリに置いた
+配列（行は国・年順）と各国の行範囲のみを渡す。
+"""
+
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+PANEL_ANALYSIS_DIR = DATA_PROCESSED_DIR / "panel_analysis"
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.data_processing.schema import read_table
+from scripts.data_processing.instrumentation import measure, record_rows, save_run_report
+from scripts.analysis.correlation_analysis import (
+    add_bootstrap_intervals, add_granger_causality, add_lagged_correlations, add_partial_correlations,
+    add_permutation_tests, add_transformed_correlations, analyze_all_correlations
+)
+from scripts.analysis.correlation_matrix import matrix_to_json, select_indicator_columns
+from scripts.analysis.permutation import DEFAULT_PERMUTATIONS
+from scripts.analysis.time_series_analysis import DEFAULT_PERIODS, analyze_time_series, calculate_trends
+
+INDEX_FILE = 'index.json'
+POOLED_SHARD = '_pooled'
+# 分析に必要な最小の年数
+MIN_YEARS = 3
+
+
+class SharedPanel:
+    """
+    パネルの年と数値列を共有メモリに置く
+
+    with文を抜けると共有メモリを解放する。ワーカーには spec（共有メモリ名・形状・列名）
+    だけを渡し、attach_panel で同じメモリを参照させる。
+    """
+
+    def __init__(self, years, values, columns):
+        data = np.column_stack([years.astype(float), values])
+        self._shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        array = np.ndarray(data.shape, dtype=np.float64, buffer=self._shm.buf)
+        array[:] = data
+        self.spec = {'name': self._shm.name, 'shape': data.shape, 'columns': list(columns)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._shm.close()
+        self._shm.unlink()
+
+
+def attach_panel(spec, start, stop):
+    """
+    共有メモリ上のパネルから行範囲 [start, stop) をDataFrameとして取り出す
+
+    Returns:
+        pd.DataFrame: year列（整数）と数値列
+    """
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    try:
+        array = np.ndarray(spec['shape'], dtype=np.float64, buffer=shm.buf)
+        block = array[start:stop].copy()
+    finally:
+        shm.close()
+
+    df = pd.DataFrame(block[:, 1:], columns=spec['columns'])
+    df.insert(0, 'year', block[:, 0].astype(int))
+    return df
+
+
+def _to_serializable(obj):
+    """json.dump で扱えないNumPyの値を変換"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def analyze_country(df, country, periods=DEFAULT_PERIODS, n_permutations=DEFAULT_PERMUTATIONS):
+    """
+    1か国の系列に相関分析と時系列分析を実行
+
+    Args:
+        df: year列（整数）と指標の列
+
+    Returns:
+        dict: 相関分析・相関行列・時系列分析の結果
+    """
+    results, matrices = analyze_all_correlations(df)
+    if results:
+        add_lagged_correlations(results, df)
+        add_transformed_correlations(results, df)
+        add_partial_correlations(results, df)
+        add_granger_causality(results, df)
+        add_bootstrap_intervals(results, df)
+        if n_permutations > 0:
+            add_permutation_tests(results, df, n_permutations=n_permutations)
+
+    dated = df.assign(year=pd.to_datetime(df['year'].astype(str), format='%Y'))
+    time_series = analyze_time_series(
+        dated, panel=df.assign(country=country), periods=periods, country=country
+    )
+    return {
+        'correlation': results,
+        'correlation_matrix': {
+            method: matrix_to_json(result) for method, result in (matrices or {}).items()
+        },
+        'time_series': time_series,
+    }
+
+
+def analyze_pooled(panel, periods=DEFAULT_PERIODS):
+    """
+    全ての国をまとめた分析
+
+    相関は全ての国×年をひとつの標本として計算し、トレンドは年ごとの国平均に当てはめる。
+    """
+    pooled = panel.drop(columns='country')
+    results, matrices = analyze_all_correlations(pooled)
+
+    average = pooled.groupby('year', sort=True).mean().reset_index()
+    average['year'] = pd.to_datetime(average['year'].astype(str), format='%Y')
+    return {
+        'correlation': results,
+        'correlation_matrix': {
+            method: matrix_to_json(result) for method, result in (matrices or {}).items()
+        },
+        'cross_country_mean_trends': calculate_trends(
+            average, periods={'overall': (None, None), **periods}
+        ),
+    }
+
+
+def _write_shard(output_dir, name, payload):
+    """分析結果のシャードを保存"""
+    path = output_dir / f"{name}.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=_to_serializable)
+    return path
+
+
+def _run_country(spec, country, start, stop, periods, n_permutations, output_dir):
+    """1か国分の行を共有メモリから取り出して分析し、シャードを書き出す（ワーカープロセスで実行される）"""
+    with measure(country) as metrics:
+        df = attach_panel(spec, start, stop)
+        payload = {'country': country, **analyze_country(df, country, periods, n_permutations)}
+        path = _write_shard(output_dir, country, payload)
+        record_rows(rows_in=len(df), rows_out=1)
+
+    return {
+        'country': country,
+        'file': path.name,
+        'n_years': int(len(df)),
+        'year_min': int(df['year'].min()),
+        'year_max': int(df['year'].max()),
+        'indicators': [
+            column for column in spec['columns'] if df[column].notna().sum() >= MIN_YEARS
+        ],
+        'metrics': metrics.to_dict(),
+    }
+
+
+def run_panel_analysis(panel=None, periods=DEFAULT_PERIODS, n_permutations=DEFAULT_PERMUTATIONS,
+                       jobs=1, output_dir=PANEL_ANALYSIS_DIR):
+    """
+    国別の分析を並列に実行し、国ごとのシャードと索引を保存
+
+    Args:
+        panel: country・year列を持つパネル（省略時は統合データセット）
+        periods: トレンドを求める期間
+        n_permutations: 並べ替え検定の最大回数（0の場合は検定しない）
+        jobs: 並列実行するプロセス数
+        output_dir: シャードと索引の保存先
+
+    Returns:
+        tuple: (索引のdict, 国ごとの計測結果のlist)。データがない場合はNone
+    """
+    if panel is None:
+        panel = read_table('combined_dataset')
+    if panel is None:
+        print("Combined dataset not found. Please run data processing first.")
+        return None
+    if 'country' not in panel.columns:
+        raise ValueError("Panel analysis requires a 'country' column")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    panel = panel.assign(country=panel['country'].astype(str), year=panel['year'].astype(int))
+    panel = panel.sort_values(['country', 'year'], kind='stable').reset_index(drop=True)
+    columns = select_indicator_columns(panel)
+
+    # 各国の行範囲（国・年順に並べたので連続している）
+    codes, starts, counts = np.unique(panel['country'].to_numpy(), return_index=True, return_counts=True)
+    shards = [
+        (country, int(start), int(start + count))
+        for country, start, count in zip(codes, starts, counts)
+        if count >= MIN_YEARS
+    ]
+    skipped = sorted(set(codes) - {country for country, _, _ in shards})
+
+    entries = []
+    with SharedPanel(panel['year'].to_numpy(), panel[columns].to_numpy(dtype=float), columns) as shared:
+        tasks = [
+            (shared.spec, country, start, stop, periods, n_permutations, output_dir)
+            for country, start, stop in shards
+        ]
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(_run_country, *task) for task in tasks]
+                entries = [future.result() for future in futures]
+        else:
+            entries = [_run_country(*task) for task in tasks]
+
+    pooled_path = _write_shard(output_dir, POOLED_SHARD, analyze_pooled(panel[['country', 'year'] + columns], periods))
+
+    # 今回の実行に含まれない国の古いシャードを削除
+    current = {entry['file'] for entry in entries} | {pooled_path.name, INDEX_FILE}
+    for stale in output_dir.glob('*.json'):
+        if stale.name not in current:
+            stale.unlink()
+
+    index = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'indicators': columns,
+        'periods': {name: list(years) for name, years in periods.items()},
+        'countries': {
+            entry['country']: {key: value for key, value in entry.items() if key not in ('country', 'metrics')}
+            for entry in entries
+        },
+        'skipped_countries': skipped,
+        'pooled': {'file': pooled_path.name, 'n_countries': len(codes), 'n_rows': int(len(panel))},
+    }
+    with open(output_dir / INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    print(f"Saved panel analysis for {len(entries)} countries to {output_dir}")
+    return index, [entry['metrics'] for entry in entries]
+
+
+def main(argv=None):
+    """国別分析のメイン関数"""
+    parser = argparse.ArgumentParser(description='Run per-country analyses on the panel dataset')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes (one country per task)')
+    parser.add_argument('--permutations', type=int, default=DEFAULT_PERMUTATIONS,
+                        help='Maximum permutations per indicator for permutation tests (0 to skip)')
+    args = parser.parse_args(argv)
+
+    with measure('panel_analysis') as total:
+        result = run_panel_analysis(n_permutations=args.permutations, jobs=max(1, args.jobs))
+    if result:
+        save_run_report('panel_analysis', result[1], total.to_dict())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+偏相関
+年（時間トレンド）や他の指標の影響を除いた、労働時間と各指標の偏相関を求める。
+
+指標ごとに、労働時間・その指標・全ての制御変数が観測されている年だけを標本とし、
+労働時間と指標をそれぞれ制御変数（と定数項）に回帰した残差どうしの相関を偏相関とする。
+サンプル数と自由度も同じ標本から求める。スピアマンの場合はその標本内で順位に変換してから計算する。
+"""
+
+import numpy as np
+from scipy import stats
+
+from scripts.analysis.correlation_matrix import correlation_p_values, select_indicator_columns
+
+
+def _residuals(values, design):
+    """定数項と制御変数への最小二乗回帰の残差"""
+    coef, *_ = np.linalg.lstsq(design, values, rcond=None)
+    return values - design @ coef
+
+
+def partial_correlation(df, base_column, column, controls, method='pearson'):
+    """
+    制御変数を与えたときの、基準列とひとつの列との偏相関
+
+    Returns:
+        dict: {'partial_correlation', 'p_value', 'n_samples', 'dof'}
+            （標本が足りない・制御変数で完全に説明される場合はNone）
+    """
+    sample = df[[base_column, column, *controls]].dropna().to_numpy(dtype=float)
+    n = len(sample)
+    # t検定の自由度は n - 2 - 制御変数の数
+    dof = n - 2 - len(controls)
+    if dof < 1:
+        return None
+    if method == 'spearman':
+        sample = stats.rankdata(sample, axis=0)
+
+    design = np.column_stack([np.ones(n), sample[:, 2:]])
+    residuals = _residuals(sample[:, :2], design)
+    scale = np.sqrt((residuals ** 2).sum(axis=0))
+    spread = np.sqrt(((sample[:, :2] - sample[:, :2].mean(axis=0)) ** 2).sum(axis=0))
+    # 定数の列や、制御変数で完全に説明される列は偏相関が定まらない
+    if (scale <= 1e-8 * spread).any() or (spread == 0).any():
+        return None
+    value = float(np.clip(residuals[:, 0] @ residuals[:, 1] / (scale[0] * scale[1]), -1.0, 1.0))
+    p_value = correlation_p_values(np.array(value), np.array(dof + 2))
+    return {
+        'partial_correlation': value,
+        'p_value': float(p_value),
+        'n_samples': n,
+        'dof': dof,
+    }
+
+
+def partial_correlations(df, base_column, controls, columns=None, method='pearson'):
+    """
+    制御変数の組を与えたときの、基準列と各列との偏相関
+
+    Args:
+        df: 対象のDataFrame（制御変数の列も含むこと）
+        base_column: 基準となる列
+        controls: 制御変数の列のリスト
+        columns: 偏相関を求める列（省略時は基準列・制御変数以外の全ての指標。year などのキー列は含まない）
+        method: 'pearson' または 'spearman'
+
+    Returns:
+        dict: {列: partial_correlation の結果}
+
+    Raises:
+        ValueError: DataFrameにない列が指定された場合
+    """
+    missing = [col for col in [base_column, *controls, *(columns or [])] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Unknown columns: {', '.join(missing)}")
+    if base_column in controls:
+        raise ValueError(f"{base_column} cannot be a control variable")
+
+    if columns is None:
+        columns = [
+            col for col in select_indicator_columns(df)
+            if col != base_column and col not in controls
+        ]
+    return {
+        column: partial_correlation(df, base_column, column, controls, method=method)
+        for column in columns
+    }
+
+
+def partial_correlation_frame(df, base_column, controls, method='pearson'):
+    """
+    DataFrameから偏相関を計算（year列は制御変数としてのみ指定できる）
+
+    Returns:
+        dict: 各指標の partial_correlations の結果
+    """
+    numeric = ['year'] + select_indicator_columns(df)
+    return partial_correlations(df[numeric].astype(float), base_column, controls, method=method)
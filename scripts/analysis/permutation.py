@@ -0,0 +1,118 @@
+"""
+相関係数の並べ替え（パーミュテーション）検定
+短いトレンドのある系列ではt分布によるp値が信頼できないため、
+一方の系列を並べ替えた相関の分布からp値を求める。
+
+並べ替えを行番号の行列として生成し、標準化済みの系列との行列積で
+バッチごとに数千個の相関を一括計算する。p値の信頼区間が有意水準を
+含まなくなった時点で打ち切る（早期終了）。
+"""
+
+import numpy as np
+from scipy import stats
+
+from scripts.analysis.constants import DEFAULT_SEED
+
+DEFAULT_PERMUTATIONS = 9999
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_ALPHA = 0.05
+# 早期終了の判定に使うp値の信頼区間の水準
+STOPPING_CONFIDENCE = 0.99
+
+# 'permutation': 全ての並べ替え、'circular': 循環シフト（自己相関を保つ）
+PERMUTATION_SCHEMES = ('permutation', 'circular')
+
+
+def _standardize_rows(values):
+    """行ごとに平均0・ノルム1に標準化（内積が相関係数になる）"""
+    centered = values - values.mean(axis=-1, keepdims=True)
+    norm = np.sqrt((centered ** 2).sum(axis=-1, keepdims=True))
+    return centered / np.where(norm > 0, norm, 1.0)
+
+
+def permutation_indices(n, n_permutations, rng):
+    """各行が0..n-1の並べ替えである行番号の行列 (n_permutations, n)"""
+    return rng.permuted(np.tile(np.arange(n), (n_permutations, 1)), axis=1)
+
+
+def circular_shift_indices(n):
+    """全ての循環シフト（シフト量1..n-1）の行番号の行列 (n-1, n)"""
+    shifts = np.arange(1, n)
+    return (np.arange(n) + shifts[:, None]) % n
+
+
+def _p_value_bounds(exceed, total, confidence=STOPPING_CONFIDENCE):
+    """超過回数からp値のClopper-Pearson信頼区間を計算"""
+    tail = (1 - confidence) / 2
+    lower = np.where(exceed > 0, stats.beta.ppf(tail, exceed, total - exceed + 1), 0.0)
+    upper = np.where(exceed < total, stats.beta.ppf(1 - tail, exceed + 1, total - exceed), 1.0)
+    return lower, upper
+
+
+def permutation_test(x, y, scheme='permutation', n_permutations=DEFAULT_PERMUTATIONS,
+                     batch_size=DEFAULT_BATCH_SIZE, alpha=DEFAULT_ALPHA, early_stop=True,
+                     seed=DEFAULT_SEED):
+    """
+    ピアソン・スピアマン相関の両側並べ替え検定
+
+    Args:
+        x, y: 両方が観測されている年のみの配列（年順）
+        scheme: 'permutation' または 'circular'（循環シフトは全シフトを列挙する厳密検定）
+        n_permutations: 並べ替えの最大回数
+        batch_size: 1バッチで評価する並べ替えの数
+        alpha: 早期終了の判定に使う有意水準
+        early_stop: p値が有意水準のどちら側か確定した時点で打ち切るか
+        seed: 乱数のシード
+
+    Returns:
+        dict: 方法ごとのp値と、評価した並べ替えの数（サンプル数が3未満の場合はNone）
+    """
+    if scheme not in PERMUTATION_SCHEMES:
+        raise ValueError(f"Unknown permutation scheme: {scheme}")
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n < 3:
+        return None
+
+    # 行0がピアソン、行1がスピアマン（順位は並べ替えても変わらないので一度だけ計算）
+    xs = _standardize_rows(np.stack([x, stats.rankdata(x)]))
+    ys = _standardize_rows(np.stack([y, stats.rankdata(y)]))
+    observed = np.abs((xs * ys).sum(axis=1))
+    # 浮動小数点の誤差で同値の並べ替えを取りこぼさないよう、わずかに緩める
+    threshold = observed * (1 - 1e-12)
+
+    if scheme == 'circular':
+        batches = iter([circular_shift_indices(n)])
+    else:
+        rng = np.random.default_rng(seed)
+        sizes = [batch_size] * (n_permutations // batch_size)
+        if n_permutations % batch_size:
+            sizes.append(n_permutations % batch_size)
+        batches = (permutation_indices(n, size, rng) for size in sizes)
+
+    exceed = np.zeros(2, dtype=int)
+    total = 0
+    stopped_early = False
+    for indices in batches:
+        # (2, バッチ, n) と (2, n) の積で各並べ替えの相関を一括計算
+        permuted = np.einsum('kbn,kn->kb', xs[:, indices], ys)
+        exceed += (np.abs(permuted) >= threshold[:, None]).sum(axis=1)
+        total += len(indices)
+
+        if early_stop and scheme == 'permutation' and total < n_permutations:
+            lower, upper = _p_value_bounds(exceed, total)
+            if np.all((upper < alpha) | (lower > alpha)):
+                stopped_early = True
+                break
+
+    # 観測値自身を含めたp値（0にならない）
+    p_values = (exceed + 1) / (total + 1)
+    return {
+        'scheme': scheme,
+        'pearson_p_value': float(p_values[0]),
+        'spearman_p_value': float(p_values[1]),
+        'n_permutations': int(total),
+        'stopped_early': stopped_early,
+    }
@@ -2,26 +2,61 @@
 全分析を実行するメインスクリプト
 """
 
+import argparse
 import sys
 from pathlib import Path
 
-# スクリプトディレクトリをパスに追加
+# スクリプトディレクトリとプロジェクトルートをパスに追加
 sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from correlation_analysis import main as correlation_main
-from time_series_analysis import main as timeseries_main
+from permutation import DEFAULT_PERMUTATIONS
+from time_series_analysis import DEFAULT_PERIODS, main as timeseries_main, parse_periods
+from scripts.data_processing.instrumentation import measure, save_run_report
+from scripts.analysis.panel_analysis import run_panel_analysis
 
-def main():
+def main(argv=None):
     """全分析を実行"""
+    parser = argparse.ArgumentParser(description='Run all analyses')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes for bootstrap resampling')
+    parser.add_argument('--permutations', type=int, default=DEFAULT_PERMUTATIONS,
+                        help='Maximum permutations per indicator for permutation tests (0 to skip)')
+    parser.add_argument('--periods', type=parse_periods, default=DEFAULT_PERIODS,
+                        help='Trend periods as name=start-end, comma-separated (e.g. postwar=1950-1979,recent=2000-)')
+    parser.add_argument('--panel', action='store_true',
+                        help='Also run the analyses per country and pooled (sharded over --jobs processes)')
+    args = parser.parse_args(argv)
+    
     print("=" * 60)
     print("Running all analyses")
     print("=" * 60)
     
-    print("\n[1/2] Correlation Analysis")
-    correlation_main()
+    steps = 3 if args.panel else 2
+    stages = []
+    with measure('run_all_analysis') as total:
+        print(f"\n[1/{steps}] Correlation Analysis")
+        with measure('correlation_analysis') as metrics:
+            correlation_main(jobs=max(1, args.jobs), n_permutations=args.permutations)
+        stages.append(metrics.to_dict())
+        
+        print(f"\n[2/{steps}] Time Series Analysis")
+        with measure('time_series_analysis') as metrics:
+            timeseries_main(periods=args.periods)
+        stages.append(metrics.to_dict())
+        
+        if args.panel:
+            print(f"\n[3/{steps}] Panel Analysis (per country)")
+            with measure('panel_analysis') as metrics:
+                run_panel_analysis(
+                    periods=args.periods,
+                    n_permutations=args.permutations,
+                    jobs=max(1, args.jobs)
+                )
+            stages.append(metrics.to_dict())
     
-    print("\n[2/2] Time Series Analysis")
-    timeseries_main()
+    save_run_report('run_all_analysis', stages, total.to_dict())
     
     print("\n" + "=" * 60)
     print("All analyses completed!")
@@ -1,55 +1,187 @@
 """
 時系列分析
-トレンド、構造変化点の検出
+トレンド、構造変化点の検出（PELTによる区分線形モデル）
 """
 
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import json
+import sys
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+sys.path.insert(0, str(PROJECT_ROOT))
 
+from scripts.data_processing.schema import read_table
+from scripts.data_processing.reconciliation import DOMESTIC_COUNTRY
+from scripts.data_processing.instrumentation import record_rows
+from scripts.analysis.change_points import chow_scan_panel, detect_panel_change_points
+from scripts.analysis.correlation_matrix import select_indicator_columns
 
-def load_combined_data():
-    """統合データセットを読み込み"""
-    data_path = DATA_PROCESSED_DIR / "combined_dataset.csv"
+# トレンドを求める期間（--periods で変更できる）
+DEFAULT_PERIODS = {
+    '1950s_1970s': (1950, 1979),
+    '1980s_1990s': (1980, 1999),
+    '2000s_present': (2000, None),
+}
+OVERALL_PERIOD = 'overall'
+
+
+def load_combined_data(columns=None, country=DOMESTIC_COUNTRY, panel=None):
+    """
+    統合データセットから1か国の系列を読み込み（columns=Noneで全列）
+    
+    panel を渡した場合はファイルを読み直さず、そこから1か国の系列を取り出す。
+    """
+    df = panel if panel is not None else read_table('combined_dataset', columns=columns)
     
-    if not data_path.exists():
+    if df is None:
         return None
     
-    df = pd.read_csv(data_path)
-    df['year'] = pd.to_datetime(df['year'], format='%Y')
-    return df
+    if 'country' in df.columns:
+        df = df[df['country'] == country].drop(columns='country').reset_index(drop=True)
+    
+    return df.assign(year=pd.to_datetime(df['year'].astype(int).astype(str), format='%Y'))
+
 
+def load_panel_data(columns=None):
+    """統合データセットの全ての国の系列を読み込み（年は整数のまま）"""
+    return read_table('combined_dataset', columns=columns)
 
-def detect_trend_changes(series, window=5):
+
+def _scan_panel(panel, detector, country=DOMESTIC_COUNTRY):
+    """パネルの全ての系列（国×指標）に検出関数を適用（国の列がない場合は country の系列として扱う）"""
+    panel = panel.assign(year=panel['year'].astype(int))
+    results = detector(panel, select_indicator_columns(panel))
+    if None in results:
+        results = {country: results[None]}
+    return results
+
+
+def detect_structural_breaks(panel, country=DOMESTIC_COUNTRY):
     """
-    時系列データのトレンド変化点を検出
+    パネルの全ての系列（国×指標）の構造変化点を検出
+    
+    Returns:
+        dict: {国: {指標: 変化点の年と区間ごとの直線}}
+    """
+    return _scan_panel(panel, detect_panel_change_points, country)
+
+
+def scan_chow_breaks(panel, country=DOMESTIC_COUNTRY):
+    """
+    パネルの全ての系列（国×指標）について、全ての候補年でChow検定を行う
+    
+    Returns:
+        dict: {国: {指標: 候補年ごとのF統計量、sup-Fとその年、臨界値}}
+    """
+    return _scan_panel(panel, chow_scan_panel, country)
+
+
+def parse_periods(spec):
+    """
+    期間の指定を解析
     
     Args:
-        series: 時系列データ（pandas Series）
-        window: 移動平均のウィンドウサイズ
+        spec: "名前=開始年-終了年" のカンマ区切り（例: "postwar=1950-1979,recent=2000-"）
+            開始年・終了年は省略可
     
     Returns:
-        list: 変化点の年
+        dict: {名前: (開始年, 終了年)}
     """
-    # 移動平均を計算
-    ma = series.rolling(window=window, center=True).mean()
+    periods = {}
+    for item in spec.split(','):
+        name, _, years = item.strip().partition('=')
+        start, sep, end = years.partition('-')
+        if not name or not sep:
+            raise ValueError(f"Invalid period: {item!r} (expected name=start-end)")
+        periods[name] = (int(start) if start else None, int(end) if end else None)
+    return periods
+
+
+def calculate_trends(df, columns=None, periods=None):
+    """
+    全ての列・期間のトレンド（線形回帰）を一括計算
     
-    # 一次差分を計算
-    diff = ma.diff()
+    列ごとの欠損マスクと期間のマスクから、列×期間の組み合わせごとの
+    モーメント（件数・年・値の和と積和）を一度の行列演算で求め、回帰係数を得る。
     
-    # 変化点の検出（差分の符号が変わる点）
-    change_points = []
-    for i in range(1, len(diff)):
-        if not pd.isna(diff.iloc[i]) and not pd.isna(diff.iloc[i-1]):
-            if (diff.iloc[i] > 0 and diff.iloc[i-1] < 0) or \
-               (diff.iloc[i] < 0 and diff.iloc[i-1] > 0):
-                change_points.append(series.index[i])
+    Args:
+        df: 統合データセット（year列は日付）
+        columns: 対象の列（省略時は数値列を自動選択）
+        periods: {名前: (開始年, 終了年)}（省略時は全期間のみ）
+    
+    Returns:
+        dict: {列: {期間名: calculate_trend と同じ形式の結果（データが2年未満ならNone）}}
+    """
+    if columns is None:
+        columns = select_indicator_columns(df)
+    columns = [col for col in columns if col in df.columns]
+    periods = periods if periods is not None else {'overall': (None, None)}
+    names = list(periods)
     
-    return change_points
+    df = df.sort_values('year', kind='stable').reset_index(drop=True)
+    dates = df['year']
+    # 日数を年に換算した経過年（calculate_trend と同じく1年=365.25日）
+    elapsed = (dates - dates.min()).dt.days.to_numpy(dtype=float) / 365.25
+    calendar_years = dates.dt.year.to_numpy()
+    
+    # 期間のマスク (行, 期間) と列の観測マスク (行, 列) から組み合わせのマスク (行, 期間, 列)
+    in_period = np.ones((len(df), len(names)), dtype=bool)
+    for k, name in enumerate(names):
+        start, end = periods[name]
+        if start:
+            in_period[:, k] &= (dates >= pd.to_datetime(str(start))).to_numpy()
+        if end:
+            in_period[:, k] &= (dates <= pd.to_datetime(str(end))).to_numpy()
+    values = df[columns].to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+    mask = (in_period[:, :, None] & observed[:, None, :]).astype(float)
+    
+    # 桁落ちを避けるため、経過年・値を全体の平均で中心化してからモーメントを計算
+    x = elapsed - elapsed.mean()
+    with np.errstate(invalid='ignore'):
+        y = np.where(observed, values - np.nanmean(np.where(observed, values, np.nan), axis=0), 0.0)
+    n = mask.sum(axis=0)
+    sum_x = np.einsum('r,rpc->pc', x, mask)
+    sum_xx = np.einsum('r,rpc->pc', x * x, mask)
+    sum_y = np.einsum('rc,rpc->pc', y, mask)
+    sum_xy = np.einsum('r,rc,rpc->pc', x, y, mask)
+    sum_yy = np.einsum('rc,rpc->pc', y * y, mask)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sxx = sum_xx - sum_x ** 2 / n
+        sxy = sum_xy - sum_x * sum_y / n
+        syy = sum_yy - sum_y ** 2 / n
+        slope = sxy / sxx
+        ss_res = np.maximum(syy - slope * sxy, 0.0)
+        r_squared = np.where(syy > 0, 1 - ss_res / syy, 0.0)
+    
+    # 切片は各組み合わせの最初の観測年を0とした値
+    first = np.where(mask > 0, np.arange(len(df))[:, None, None], len(df)).min(axis=0)
+    last = np.where(mask > 0, np.arange(len(df))[:, None, None], -1).max(axis=0)
+    
+    results = {}
+    for j, column in enumerate(columns):
+        results[column] = {}
+        for k, name in enumerate(names):
+            if n[k, j] < 2 or not np.isfinite(slope[k, j]):
+                results[column][name] = None
+                continue
+            mean_x = sum_x[k, j] / n[k, j]
+            mean_y = sum_y[k, j] / n[k, j]
+            origin = x[first[k, j]]
+            column_mean = values[observed[:, j], j].mean()
+            results[column][name] = {
+                'slope': float(slope[k, j]),
+                'intercept': float(mean_y + column_mean - slope[k, j] * (mean_x - origin)),
+                'r_squared': float(r_squared[k, j]),
+                'period_start': str(calendar_years[first[k, j]]),
+                'period_end': str(calendar_years[last[k, j]])
+            }
+    
+    return results
 
 
 def calculate_trend(df, column, period_start=None, period_end=None):
@@ -59,71 +191,62 @@ def calculate_trend(df, column, period_start=None, period_end=None):
     Returns:
         dict: 傾き、切片、R²値
     """
-    if period_start:
-        df = df[df['year'] >= pd.to_datetime(str(period_start))]
-    if period_end:
-        df = df[df['year'] <= pd.to_datetime(str(period_end))]
-    
     if column not in df.columns:
         return None
     
-    data = df[['year', column]].dropna()
-    
-    if len(data) < 2:
-        return None
-    
-    # 年を数値に変換（回帰用）
-    years_numeric = (data['year'] - data['year'].min()).dt.days / 365.25
-    
-    # 線形回帰
-    slope, intercept = np.polyfit(years_numeric, data[column], 1)
-    
-    # R²値
-    y_pred = slope * years_numeric + intercept
-    ss_res = np.sum((data[column] - y_pred) ** 2)
-    ss_tot = np.sum((data[column] - np.mean(data[column])) ** 2)
-    r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
-    
-    return {
-        'slope': float(slope),
-        'intercept': float(intercept),
-        'r_squared': float(r_squared),
-        'period_start': str(data['year'].min().year),
-        'period_end': str(data['year'].max().year)
-    }
+    return calculate_trends(df, [column], {'period': (period_start, period_end)})[column]['period']
 
 
-def analyze_time_series(df):
-    """時系列分析を実行"""
+def analyze_time_series(df, panel=None, periods=DEFAULT_PERIODS, country=DOMESTIC_COUNTRY):
+    """
+    時系列分析を実行
+    
+    Args:
+        df: 1か国の系列（year列は日付）
+        panel: 全ての国の系列（省略時は df のみで構造変化点を検出）
+        periods: トレンドを求める期間 {名前: (開始年, 終了年)}
+        country: df の国コード
+    """
     if df is None:
         return None
     
     results = {}
     
+    if panel is None:
+        panel = df.assign(year=df['year'].dt.year)
+    structural_breaks = detect_structural_breaks(panel, country=country)
+    domestic_breaks = structural_breaks.get(country, {})
+    
+    # 全ての数値列・期間のトレンドを一括で計算
+    trends = calculate_trends(df, periods={OVERALL_PERIOD: (None, None), **periods})
+    
+    def _trend_summary(column):
+        column_trends = dict(trends[column])
+        overall = column_trends.pop(OVERALL_PERIOD)
+        return {'overall_trend': overall, 'periods': column_trends}
+    
     # 労働時間の分析
     if 'hours_per_year' in df.columns:
         labor_hours = df.set_index('year')['hours_per_year'].dropna()
         if len(labor_hours) > 0:
             results['labor_hours'] = {
-                'change_points': [str(y.year) for y in detect_trend_changes(labor_hours)],
-                'overall_trend': calculate_trend(df, 'hours_per_year'),
-                'periods': {
-                    '1950s_1970s': calculate_trend(df, 'hours_per_year', 1950, 1979),
-                    '1980s_1990s': calculate_trend(df, 'hours_per_year', 1980, 1999),
-                    '2000s_present': calculate_trend(df, 'hours_per_year', 2000, None)
-                }
+                'change_points': [
+                    str(year) for year in (domestic_breaks.get('hours_per_year') or {}).get('break_years', [])
+                ],
+                **_trend_summary('hours_per_year')
             }
     
     # GDP成長率の分析
     if 'gdp_growth_rate' in df.columns:
-        results['gdp_growth_rate'] = {
-            'overall_trend': calculate_trend(df, 'gdp_growth_rate'),
-            'periods': {
-                '1950s_1970s': calculate_trend(df, 'gdp_growth_rate', 1950, 1979),
-                '1980s_1990s': calculate_trend(df, 'gdp_growth_rate', 1980, 1999),
-                '2000s_present': calculate_trend(df, 'gdp_growth_rate', 2000, None)
-            }
-        }
+        results['gdp_growth_rate'] = _trend_summary('gdp_growth_rate')
+    
+    # 全ての数値列のトレンド
+    results['trends'] = {column: _trend_summary(column) for column in trends}
+    
+    # 全ての指標・国の構造変化点
+    results['structural_breaks'] = structural_breaks
+    # 固定した期間の区切り（1980年・2000年）に代わる、データから推定した変化の年の検定
+    results['chow_scan'] = scan_chow_breaks(panel, country=country)
     
     return results
 
@@ -154,20 +277,28 @@ def save_time_series_results(results):
     return output_path
 
 
-def main():
-    """時系列分析のメイン関数"""
+def main(periods=DEFAULT_PERIODS):
+    """
+    時系列分析のメイン関数
+    
+    Args:
+        periods: トレンドを求める期間 {名前: (開始年, 終了年)}
+    """
     print("Performing time series analysis...")
     
-    df = load_combined_data()
+    # トレンド・構造変化点は全ての指標について求めるため全列を一度だけ読み込む
+    panel = load_panel_data()
+    df = load_combined_data(panel=panel)
     
     if df is None:
         print("Data not found. Please run data processing first.")
         return
     
-    results = analyze_time_series(df)
+    results = analyze_time_series(df, panel=panel, periods=periods)
     
     if results:
         save_time_series_results(results)
+        record_rows(rows_in=len(df), rows_out=len(results))
         print("\nTime series analysis completed.")
     else:
         print("No time series analysis could be performed.")
@@ -0,0 +1,105 @@
+"""
+トレンド除去・差分変換
+強いトレンドを持つ系列どうしの相関がトレンドの共有だけを捉えないよう、
+一階差分・対数差分・線形トレンド除去・HPフィルタ除去の残差を
+全ての列について一括で計算する。
+
+入力は連続した年次グリッド（欠損年はNaN）とし、差分は欠損年をまたがない。
+"""
+
+import numpy as np
+import pandas as pd
+
+TRANSFORMS = ('diff', 'log_diff', 'linear_detrend', 'hp_detrend')
+
+# 年次データのHPフィルタの平滑化パラメータ（Ravn-Uhlig）
+HP_LAMBDA_ANNUAL = 6.25
+
+
+def year_grid(df, columns):
+    """year列を持つDataFrameを連続した年次グリッド（欠損年はNaN）に並べ直す"""
+    years = df['year'].astype(int)
+    grid = df.set_index(years)[list(columns)]
+    grid = grid[~grid.index.duplicated()]
+    return grid.reindex(range(years.min(), years.max() + 1))
+
+
+def first_difference(values):
+    """一階差分（先頭の行はNaN）"""
+    diff = np.full_like(values, np.nan)
+    diff[1:] = values[1:] - values[:-1]
+    return diff
+
+
+def log_difference(values):
+    """対数差分（0以下の値を含む列は全てNaN）"""
+    positive = np.all((values > 0) | np.isnan(values), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        logged = np.where(positive, np.log(np.where(values > 0, values, np.nan)), np.nan)
+    return first_difference(logged)
+
+
+def linear_detrend(values, years):
+    """列ごとに観測されている年で直線を当てはめた残差"""
+    mask = ~np.isnan(values)
+    m = mask.astype(float)
+    t = (years - years.mean())[:, None]
+    y = np.where(mask, values, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = m.sum(axis=0)
+        mean_t = (t * m).sum(axis=0) / n
+        mean_y = y.sum(axis=0) / n
+        tc = np.where(mask, t - mean_t, 0.0)
+        slope = (tc * (y - mean_y)).sum(axis=0) / (tc * tc).sum(axis=0)
+    return np.where(mask, values - mean_y - slope * (t - mean_t), np.nan)
+
+
+def hp_detrend(values, lamb=HP_LAMBDA_ANNUAL):
+    """
+    HPフィルタのトレンドを除いた循環成分
+
+    欠損年は重み0として扱い、(W + λD'D) τ = W y を全ての列について一括で解く。
+    """
+    n, k = values.shape
+    if n < 3:
+        return np.full_like(values, np.nan)
+
+    mask = ~np.isnan(values)
+    second = np.diff(np.eye(n), n=2, axis=0)
+    penalty = lamb * second.T @ second
+    weights = mask.T.astype(float)  # (列, 年)
+    system = penalty[None, :, :] + weights[:, :, None] * np.eye(n)[None, :, :]
+    rhs = np.where(mask, values, 0.0).T
+
+    trend = np.full((k, n), np.nan)
+    # 観測が2点以下の列は直線も決まらないため除く
+    solvable = mask.sum(axis=0) >= 3
+    if solvable.any():
+        trend[solvable] = np.linalg.solve(system[solvable], rhs[solvable][..., None])[..., 0]
+    return np.where(mask, values - trend.T, np.nan)
+
+
+def transform_grid(grid, transforms=TRANSFORMS, hp_lambda=HP_LAMBDA_ANNUAL):
+    """
+    年次グリッドの全ての列に各変換を適用
+
+    Returns:
+        dict: {変換名: 同じ形のDataFrame}
+    """
+    values = grid.to_numpy(dtype=float)
+    years = grid.index.to_numpy(dtype=float)
+    functions = {
+        'diff': lambda: first_difference(values),
+        'log_diff': lambda: log_difference(values),
+        'linear_detrend': lambda: linear_detrend(values, years),
+        'hp_detrend': lambda: hp_detrend(values, hp_lambda),
+    }
+    unknown = [name for name in transforms if name not in functions]
+    if unknown:
+        raise ValueError(f"Unknown transforms: {', '.join(unknown)}")
+
+    return {
+        name: pd.DataFrame(functions[name](), index=grid.index, columns=grid.columns)
+        for name in transforms
+    }
@@ -5,8 +5,9 @@
 import sys
 from pathlib import Path
 
-# スクリプトディレクトリをパスに追加
+# スクリプトディレクトリとプロジェクトルートをパスに追加
 sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from collect_oecd import (
     collect_labor_hours_oecd,
@@ -17,6 +18,7 @@ from collect_japan_gov import (
     collect_cabinet_gdp,
     collect_reading_time
 )
+from scripts.data_processing.instrumentation import measure, save_run_report
 
 def main():
     """全データソースからデータを収集"""
@@ -24,19 +26,30 @@ def main():
     print("Starting data collection from all sources")
     print("=" * 60)
     
-    # OECDデータ
-    print("\n[1/5] Collecting OECD data...")
-    collect_labor_hours_oecd()
-    collect_gdp_oecd()
+    stages = []
     
-    # 日本の政府統計
-    print("\n[2/5] Collecting Japanese government statistics...")
-    collect_mhlw_labor_hours()
-    collect_cabinet_gdp()
+    def run(collector):
+        # 収集元ごとに時間・メモリ・書き出した行数を計測
+        with measure(collector.__name__) as metrics:
+            collector()
+        stages.append(metrics.to_dict())
     
-    # 読書時間データ
-    print("\n[3/5] Collecting reading time data...")
-    collect_reading_time()
+    with measure('collect_all') as total:
+        # OECDデータ
+        print("\n[1/5] Collecting OECD data...")
+        run(collect_labor_hours_oecd)
+        run(collect_gdp_oecd)
+        
+        # 日本の政府統計
+        print("\n[2/5] Collecting Japanese government statistics...")
+        run(collect_mhlw_labor_hours)
+        run(collect_cabinet_gdp)
+        
+        # 読書時間データ
+        print("\n[3/5] Collecting reading time data...")
+        run(collect_reading_time)
+    
+    save_run_report('collect_all', stages, total.to_dict())
     
     print("\n" + "=" * 60)
     print("Data collection completed!")
@@ -7,12 +7,16 @@ import requests
 import pandas as pd
 import json
 import os
+import sys
 from pathlib import Path
 from bs4 import BeautifulSoup
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_RAW_DIR = PROJECT_ROOT / "data" / "raw"
 DATA_RAW_DIR.mkdir(parents=True, exist_ok=True)
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.data_processing.instrumentation import record_rows
 
 
 def collect_mhlw_labor_hours():
@@ -79,6 +83,7 @@ def create_sample_mhlw_labor_hours():
     
     output_path = DATA_RAW_DIR / "mhlw_labor_hours_sample.csv"
     df.to_csv(output_path, index=False)
+    record_rows(rows_out=len(df))
     print(f"Created sample MHLW labor hours data: {output_path}")
 
 
@@ -116,6 +121,7 @@ def create_sample_cabinet_gdp():
     
     output_path = DATA_RAW_DIR / "cabinet_gdp_sample.csv"
     df.to_csv(output_path, index=False)
+    record_rows(rows_out=len(df))
     print(f"Created sample Cabinet Office GDP data: {output_path}")
 
 
@@ -143,6 +149,7 @@ def create_sample_reading_time():
     
     output_path = DATA_RAW_DIR / "reading_time_sample.csv"
     df.to_csv(output_path, index=False)
+    record_rows(rows_out=len(df))
     print(f"Created sample reading time data: {output_path}")
 
 
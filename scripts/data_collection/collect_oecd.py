@@ -7,12 +7,16 @@ import requests
 import pandas as pd
 import json
 import os
+import sys
 from pathlib import Path
 
 # プロジェクトルートのパス
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_RAW_DIR = PROJECT_ROOT / "data" / "raw"
 DATA_RAW_DIR.mkdir(parents=True, exist_ok=True)
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.data_processing.instrumentation import record_rows
 
 
 def get_oecd_data(dataset_code, filter_params=None):
@@ -61,6 +65,7 @@ def collect_labor_hours_oecd():
     if data is not None:
         output_path = DATA_RAW_DIR / "oecd_labor_hours.csv"
         data.to_csv(output_path, index=False)
+        record_rows(rows_out=len(data))
         print(f"Saved OECD labor hours data to {output_path}")
     else:
         print("Failed to collect OECD labor hours data")
@@ -101,6 +106,7 @@ def create_sample_oecd_labor_hours():
     
     output_path = DATA_RAW_DIR / "oecd_labor_hours_sample.csv"
     df.to_csv(output_path, index=False)
+    record_rows(rows_out=len(df))
     print(f"Created sample OECD labor hours data: {output_path}")
 
 
@@ -134,6 +140,7 @@ def create_sample_oecd_gdp():
     
     output_path = DATA_RAW_DIR / "oecd_gdp_sample.csv"
     df.to_csv(output_path, index=False)
+    record_rows(rows_out=len(df))
     print(f"Created sample OECD GDP data: {output_path}")
 
 
@@ -0,0 +1,172 @@
+"""
+処理ステージの計測
+ステージごとの経過時間・CPU時間・ピークメモリ・入出力行数を記録し、
+実行レポート（JSON）として保存する
+
+ピークメモリは既定ではプロセスの最大常駐メモリ（getrusage の ru_maxrss）で測る。
+Pythonのヒープ上の増加分（tracemalloc）は計測のオーバーヘッドが大きいため、
+measure(trace_memory=True) または環境変数 PIPELINE_TRACE_MEMORY=1 で有効にする。
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+RUN_REPORT_DIR = PROJECT_ROOT / "data" / "run_reports"
+TRACE_MEMORY_ENV = 'PIPELINE_TRACE_MEMORY'
+
+# 実行中の計測（入れ子の場合は末尾が最も内側）
+_active = []
+
+
+def trace_memory_enabled():
+    """環境変数で tracemalloc による計測が有効にされているか"""
+    return os.environ.get(TRACE_MEMORY_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+def _max_rss_bytes():
+    """プロセスの最大常駐メモリ（取得できない環境ではNone）"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class StageMetrics:
+    """1ステージの計測結果"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_bytes = None
+        self.rss_growth_bytes = None
+        self.peak_heap_bytes = None
+        self.rows_in = None
+        self.rows_out = None
+        # tracemalloc上のピーク（絶対値）。入れ子の計測から引き継ぐ
+        self._peak = 0
+
+    def add_rows(self, rows_in=None, rows_out=None):
+        """入出力行数を加算"""
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + int(rows_in)
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + int(rows_out)
+
+    def to_dict(self):
+        def _mb(value):
+            return None if value is None else round(value / 2 ** 20, 3)
+
+        result = {
+            'stage': self.stage,
+            'wall_seconds': round(self.wall_seconds, 4),
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'peak_rss_mb': _mb(self.peak_rss_bytes),
+            'rss_growth_mb': _mb(self.rss_growth_bytes),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+        }
+        if self.peak_heap_bytes is not None:
+            result['peak_heap_mb'] = _mb(self.peak_heap_bytes)
+        return result
+
+
+@contextmanager
+def measure(stage, trace_memory=None):
+    """
+    ブロックの経過時間・CPU時間・ピークメモリを計測
+
+    peak_rss はプロセス全体の最大常駐メモリ（ブロック終了時点）、rss_growth は
+    ブロックの間にその最大値が増えた量。trace_memory が有効な場合は、Pythonの
+    ヒープ上の増加分のピーク（入れ子の場合は内側のピークも含む）も記録する。
+
+    Args:
+        stage: ステージ名
+        trace_memory: tracemalloc を使うか（省略時は環境変数 PIPELINE_TRACE_MEMORY に従う）
+
+    Yields:
+        StageMetrics: ブロックを抜けた時点で値が確定する
+    """
+    if trace_memory is None:
+        trace_memory = trace_memory_enabled()
+
+    started_tracing = False
+    baseline = 0
+    if trace_memory:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        baseline, peak = tracemalloc.get_traced_memory()
+        if _active:
+            _active[-1]._peak = max(_active[-1]._peak, peak)
+        tracemalloc.reset_peak()
+
+    metrics = StageMetrics(stage)
+    metrics._peak = baseline
+    _active.append(metrics)
+    rss_start = _max_rss_bytes()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_seconds = time.perf_counter() - wall_start
+        metrics.cpu_seconds = time.process_time() - cpu_start
+        rss_end = _max_rss_bytes()
+        if rss_end is not None:
+            metrics.peak_rss_bytes = rss_end
+            metrics.rss_growth_bytes = rss_end - rss_start
+        _active.pop()
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            metrics._peak = max(metrics._peak, peak)
+            metrics.peak_heap_bytes = metrics._peak - baseline
+            if _active:
+                _active[-1]._peak = max(_active[-1]._peak, metrics._peak)
+            if started_tracing:
+                tracemalloc.stop()
+            else:
+                tracemalloc.reset_peak()
+
+
+def record_rows(rows_in=None, rows_out=None):
+    """実行中のステージに入出力行数を加算（計測中でなければ何もしない）"""
+    if _active:
+        _active[-1].add_rows(rows_in=rows_in, rows_out=rows_out)
+
+
+def save_run_report(name, stages, total=None):
+    """
+    実行レポートを data/run_reports/<name>.json に保存
+
+    Args:
+        name: 実行したスクリプト名
+        stages: ステージごとの計測結果（dictのlist）
+        total: 実行全体の計測結果
+    """
+    RUN_REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    output_path = RUN_REPORT_DIR / f"{name}.json"
+    report = {
+        'run': name,
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'total': total,
+        'stages': stages,
+    }
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Saved run report to {output_path}")
+    return output_path
@@ -0,0 +1,241 @@
+"""
+データ処理パイプライン
+ステージの依存関係（DAG）と入出力ファイルのハッシュを記録し、
+入力が変わっていないステージをスキップする
+"""
+
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from instrumentation import measure
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+PIPELINE_STATE_PATH = DATA_PROCESSED_DIR / ".pipeline_state.json"
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """ファイル内容のSHA-256ハッシュ（存在しない場合はNone）"""
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _relative(path):
+    """状態ファイルに記録するためのプロジェクトルートからの相対パス"""
+    try:
+        return str(Path(path).relative_to(PROJECT_ROOT))
+    except ValueError:
+        return str(path)
+
+
+def _execute_stage(name, func, upstream):
+    """ステージ関数を計測しながら実行し、結果と計測値を返す（ワーカープロセスでも実行される）"""
+    with measure(name) as metrics:
+        result = func(upstream)
+    return result, metrics.to_dict()
+
+
+class Stage:
+    """
+    パイプラインの1ステージ
+
+    Args:
+        name: ステージ名
+        func: 上流ステージの結果（dict）を受け取り、結果を返す関数
+            （並列実行時はプロセス間で受け渡すため、モジュールレベルの関数とする）
+        inputs: 入力ファイル（存在しない候補ファイルも含めてよい）
+        outputs: 出力ファイル
+        depends_on: 依存する上流ステージ名
+        load_cached: スキップ時に出力から結果を復元する関数
+        params: 出力に影響する設定（変わった場合は再実行する）
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), depends_on=(), load_cached=None, params=None):
+        self.name = name
+        self.func = func
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.depends_on = list(depends_on)
+        self.load_cached = load_cached
+        self.params = json.loads(json.dumps(params or {}, sort_keys=True, default=str))
+
+
+class Pipeline:
+    """ステージをトポロジカル順に実行し、変更のないステージを再利用する"""
+
+    def __init__(self, stages, state_path=PIPELINE_STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = Path(state_path)
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        """依存関係からステージの実行順を決定"""
+        order = []
+        visiting = set()
+        done = set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Cyclic dependency detected at stage '{name}'")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _load_state(self):
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+
+    def _input_paths(self, stage):
+        """ステージの入力（自身の入力ファイル＋上流ステージの出力ファイル）"""
+        paths = list(stage.inputs)
+        for dep in stage.depends_on:
+            paths.extend(self.stages[dep].outputs)
+        return paths
+
+    def _hashes(self, paths):
+        return {_relative(p): hash_file(p) for p in paths}
+
+    def _is_up_to_date(self, stage, recorded, input_hashes):
+        """記録済みのハッシュと一致し、出力が手を加えられていなければ最新"""
+        if not recorded or recorded.get('inputs') != input_hashes:
+            return False
+        if recorded.get('params', {}) != stage.params:
+            return False
+        output_hashes = self._hashes(stage.outputs)
+        if any(h is None for h in output_hashes.values()):
+            return False
+        return recorded.get('outputs') == output_hashes
+
+    def run(self, force=False, jobs=1):
+        """
+        パイプラインを実行
+
+        依存関係が解決したステージから順に実行する。jobs > 1 の場合は
+        独立したステージをプロセスプールで並列に実行し、上流の結果
+        （DataFrame）はファイルを再読み込みせずに下流へそのまま渡す。
+
+        Args:
+            force: Trueの場合、全ステージを強制的に再実行
+            jobs: 並列実行するプロセス数
+
+        Returns:
+            tuple: (ステージ名→結果のdict, 実行レポートのlist)
+                スキップされ、下流でも使われなかったステージの結果はNone
+        """
+        state = self._load_state()
+        results = {}
+        report = []
+        pending = list(self.order)
+        running = {}
+
+        def resolve(name):
+            # スキップしたステージの結果は、下流が必要とした時点で出力から復元する
+            value = results.get(name)
+            if callable(value):
+                value = value()
+                results[name] = value
+            return value
+
+        def finish(name, input_hashes, reason, result, metrics):
+            results[name] = result
+            state[name] = {
+                'inputs': input_hashes,
+                'outputs': self._hashes(self.stages[name].outputs),
+                'params': self.stages[name].params
+            }
+            report.append({'stage': name, 'status': 'ran', 'reason': reason,
+                           'seconds': metrics['wall_seconds'], 'metrics': metrics})
+            print(f"[pipeline] {name} finished in {metrics['wall_seconds']:.2f}s")
+            self._save_state(state)
+
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        try:
+            while pending or running:
+                ready = [
+                    name for name in pending
+                    if all(dep in results for dep in self.stages[name].depends_on)
+                ]
+
+                for name in ready:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    input_hashes = self._hashes(self._input_paths(stage))
+
+                    if not force and self._is_up_to_date(stage, state.get(name), input_hashes):
+                        results[name] = stage.load_cached if stage.load_cached else None
+                        report.append({'stage': name, 'status': 'skipped',
+                                       'reason': 'inputs unchanged', 'seconds': 0.0,
+                                       'metrics': None})
+                        continue
+
+                    reason = 'forced' if force else ('inputs or settings changed' if name in state else 'no previous run')
+                    upstream = {dep: resolve(dep) for dep in stage.depends_on}
+
+                    if executor is None:
+                        result, metrics = _execute_stage(name, stage.func, upstream)
+                        finish(name, input_hashes, reason, result, metrics)
+                    else:
+                        future = executor.submit(_execute_stage, name, stage.func, upstream)
+                        running[future] = (name, input_hashes, reason)
+
+                if ready and not running:
+                    # スキップ・逐次実行で新たに実行可能になったステージを確認
+                    continue
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, input_hashes, reason = running.pop(future)
+                    result, metrics = future.result()
+                    finish(name, input_hashes, reason, result, metrics)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        # 下流で使われなかったスキップ済みステージの結果は読み込まない
+        results = {name: (None if callable(value) else value) for name, value in results.items()}
+        return results, report
+
+
+def print_report(report):
+    """実行レポートを表示"""
+    print("\nPipeline stages:")
+    for entry in report:
+        line = f"  {entry['stage']:<24} {entry['status']:<8} {entry['seconds']:>7.2f}s"
+        metrics = entry.get('metrics')
+        if metrics:
+            line += (f"  cpu {metrics['cpu_seconds']:.2f}s"
+                     f"  peak rss {metrics['peak_rss_mb'] or 0:.1f}MB"
+                     f"  rows {metrics['rows_in']}->{metrics['rows_out']}")
+        print(f"{line}  ({entry['reason']})")
@@ -3,66 +3,87 @@
 """
 
 import sys
+import argparse
+from functools import partial
 from pathlib import Path
 
 # スクリプトディレクトリをパスに追加
 sys.path.insert(0, str(Path(__file__).parent))
 
-from process_labor_hours import process_labor_hours
+from process_labor_hours import process_labor_hours, SUB_ANNUAL_PATH, SUB_ANNUAL_TABLES
 from process_economic_indicators import process_economic_indicators
 from process_reading_time import process_reading_time
+from pipeline import Pipeline, Stage, print_report
+from temporal_alignment import align_to_calendar
+from reconciliation import ensure_country
+from streaming import DEFAULT_CHUNKSIZE
+from schema import read_table, write_table, output_paths
+from instrumentation import measure, record_rows, save_run_report
 import pandas as pd
 
+SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = Path(__file__).parent.parent.parent
+DATA_RAW_DIR = PROJECT_ROOT / "data" / "raw"
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
 
+# 統合データセットのキー（国×年のパネル）
+PANEL_KEYS = ['country', 'year']
 
-def create_combined_dataset():
-    """全てのデータを統合した最終データセットを作成"""
+
+def _load_processed(df, table):
+    """渡されたDataFrameを使い、なければ処理済みテーブルをスキーマの型で読み込む"""
+    if df is None:
+        df = read_table(table)
+    # 国の列がない古い出力・日本の統計は国コードを付与
+    return ensure_country(df) if df is not None else None
+
+
+def create_combined_dataset(labor_hours=None, economic=None, reading=None):
+    """
+    全てのデータを統合した最終データセットを作成
+    
+    Args:
+        labor_hours: 処理済み労働時間データ（省略時はCSVから読み込み）
+        economic: 処理済み経済指標データ（省略時はCSVから読み込み）
+        reading: 処理済み読書時間データ（省略時はCSVから読み込み）
+    """
     print("\nCreating combined dataset...")
     
     # 各データを読み込み
-    labor_hours_path = DATA_PROCESSED_DIR / "labor_hours_processed.csv"
-    economic_path = DATA_PROCESSED_DIR / "economic_indicators_processed.csv"
-    reading_path = DATA_PROCESSED_DIR / "reading_time_processed.csv"
+    labor_hours = _load_processed(labor_hours, 'labor_hours_processed')
+    economic = _load_processed(economic, 'economic_indicators_processed')
+    reading = _load_processed(reading, 'reading_time_processed')
+    record_rows(rows_in=sum(len(df) for df in (labor_hours, economic, reading) if df is not None))
     
     combined = pd.DataFrame()
     
     # 労働時間データ
-    if labor_hours_path.exists():
-        labor_hours = pd.read_csv(labor_hours_path)
-        combined = labor_hours[['year', 'hours_per_year']].copy()
+    if labor_hours is not None:
+        combined = labor_hours[PANEL_KEYS + ['hours_per_year']].copy()
     
     # 経済指標データ
-    if economic_path.exists():
-        economic = pd.read_csv(economic_path)
+    if economic is not None:
         if combined.empty:
             combined = economic.copy()
         else:
-            combined = pd.merge(combined, economic, on='year', how='outer')
+            combined = pd.merge(combined, economic, on=PANEL_KEYS, how='outer')
     
-    # 読書時間データ（5年ごとのデータなので、年で結合）
-    if reading_path.exists():
-        reading = pd.read_csv(reading_path)
-        # 読書時間は5年ごとのデータなので、最も近い年で結合
-        # または、線形補間で年次データに変換
-        reading_interpolated = reading.set_index('year')['reading_minutes_per_day']
-        # 年次データに補間
-        if not combined.empty:
-            combined['reading_minutes_per_day'] = combined['year'].map(
-                lambda y: reading_interpolated.reindex(
-                    range(reading_interpolated.index.min(), 
-                          reading_interpolated.index.max() + 1)
-                ).interpolate(method='linear').get(y, None)
-            )
+    # 読書時間データ（5年ごとの調査を含むため、国ごとに年次カレンダーへ線形補間して結合）
+    if reading is not None and not combined.empty:
+        combined = align_to_calendar(
+            {'reading_minutes_per_day': reading},
+            combined,
+            target_freq='A',
+            method='linear'
+        )
     
-    # 年でソート
+    # 国・年でソート
     if not combined.empty:
-        combined = combined.sort_values('year').reset_index(drop=True)
+        combined = combined.sort_values(PANEL_KEYS).reset_index(drop=True)
         
         # 保存
-        output_path = DATA_PROCESSED_DIR / "combined_dataset.csv"
-        combined.to_csv(output_path, index=False)
+        output_path = write_table(combined, 'combined_dataset')
+        record_rows(rows_out=len(combined))
         print(f"Saved combined dataset to {output_path}")
         print(f"Total data points: {len(combined)}")
         print(f"Year range: {combined['year'].min()}-{combined['year'].max()}")
@@ -71,31 +92,165 @@ def create_combined_dataset():
     return combined
 
 
-def main():
+def _read_processed(table):
+    """スキップしたステージの出力を読み込む関数を作成"""
+    return lambda: read_table(table)
+
+
+# ステージ関数（プロセスプールへ渡すためモジュールレベルで定義）
+def run_labor_hours_stage(upstream, **options):
+    return process_labor_hours(**options)
+
+
+def run_economic_indicators_stage(upstream, **options):
+    return process_economic_indicators(upstream['labor_hours'], **options)
+
+
+def run_reading_time_stage(upstream, **options):
+    return process_reading_time(**options)
+
+
+def run_combined_dataset_stage(upstream):
+    return create_combined_dataset(
+        labor_hours=upstream['labor_hours'],
+        economic=upstream['economic_indicators'],
+        reading=upstream['reading_time']
+    )
+
+
+def build_pipeline(stream_options=None):
+    """
+    処理ステージのDAGを構築
+    
+    Args:
+        stream_options: ストリーミング読み込みの設定（stream, chunksize, countries, year_range）
+    """
+    stream_options = stream_options or {}
+    # 月次・四半期データがある場合のみ書き出されるテーブル
+    sub_annual_outputs = [
+        path for table in SUB_ANNUAL_TABLES.values() for path in output_paths(table)
+    ] if SUB_ANNUAL_PATH.exists() else []
+    return Pipeline([
+        Stage(
+            'labor_hours',
+            partial(run_labor_hours_stage, **stream_options),
+            inputs=[
+                DATA_RAW_DIR / "mhlw_labor_hours_real.csv",
+                DATA_RAW_DIR / "mhlw_labor_hours_sample.csv",
+                DATA_RAW_DIR / "oecd_labor_hours_sample.csv",
+                SUB_ANNUAL_PATH,
+                SCRIPT_DIR / "process_labor_hours.py",
+                SCRIPT_DIR / "temporal_alignment.py",
+                SCRIPT_DIR / "reconciliation.py",
+                SCRIPT_DIR / "streaming.py",
+                SCRIPT_DIR / "schema.py",
+            ],
+            outputs=[
+                *output_paths('labor_hours_processed'),
+                DATA_PROCESSED_DIR / "labor_hours_metadata.json",
+                *sub_annual_outputs,
+            ],
+            load_cached=_read_processed('labor_hours_processed'),
+            params=stream_options,
+        ),
+        # 経済指標データの処理（労働時間データが必要）
+        Stage(
+            'economic_indicators',
+            partial(run_economic_indicators_stage, **stream_options),
+            inputs=[
+                DATA_RAW_DIR / "cabinet_gdp_real.csv",
+                DATA_RAW_DIR / "cabinet_gdp_sample.csv",
+                DATA_RAW_DIR / "oecd_gdp_sample.csv",
+                SCRIPT_DIR / "process_economic_indicators.py",
+                SCRIPT_DIR / "reconciliation.py",
+                SCRIPT_DIR / "temporal_alignment.py",
+                SCRIPT_DIR / "streaming.py",
+                SCRIPT_DIR / "schema.py",
+            ],
+            outputs=[
+                *output_paths('economic_indicators_processed'),
+                DATA_PROCESSED_DIR / "economic_indicators_metadata.json",
+            ],
+            depends_on=['labor_hours'],
+            load_cached=_read_processed('economic_indicators_processed'),
+            params=stream_options,
+        ),
+        Stage(
+            'reading_time',
+            partial(run_reading_time_stage, **stream_options),
+            inputs=[
+                DATA_RAW_DIR / "reading_time_real.csv",
+                DATA_RAW_DIR / "reading_time_sample.csv",
+                SCRIPT_DIR / "process_reading_time.py",
+                SCRIPT_DIR / "streaming.py",
+                SCRIPT_DIR / "schema.py",
+            ],
+            outputs=[
+                *output_paths('reading_time_processed'),
+                DATA_PROCESSED_DIR / "reading_time_metadata.json",
+            ],
+            load_cached=_read_processed('reading_time_processed'),
+            params=stream_options,
+        ),
+        Stage(
+            'combined_dataset',
+            run_combined_dataset_stage,
+            inputs=[
+                SCRIPT_DIR / "process_all.py",
+                SCRIPT_DIR / "temporal_alignment.py",
+                SCRIPT_DIR / "reconciliation.py",
+                SCRIPT_DIR / "schema.py",
+            ],
+            outputs=output_paths('combined_dataset'),
+            depends_on=['labor_hours', 'economic_indicators', 'reading_time'],
+            load_cached=_read_processed('combined_dataset'),
+        ),
+    ])
+
+
+def main(argv=None):
     """全データの処理メイン関数"""
+    parser = argparse.ArgumentParser(description='Process all data sources')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-run every stage even if its inputs are unchanged')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes for independent stages')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read raw CSVs in bounded chunks (for large panel exports)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='Rows per chunk in streaming mode')
+    parser.add_argument('--countries', default=None,
+                        help='Comma-separated country codes to keep in streaming mode (e.g. JPN,USA)')
+    parser.add_argument('--years', default=None,
+                        help='Year window to keep in streaming mode (e.g. 1950-2023)')
+    args = parser.parse_args(argv)
+    
+    stream_options = {}
+    if args.stream:
+        stream_options = {'stream': True, 'chunksize': args.chunksize}
+        if args.countries:
+            stream_options['countries'] = [c.strip() for c in args.countries.split(',')]
+        if args.years:
+            start, _, end = args.years.partition('-')
+            stream_options['year_range'] = (int(start) if start else None, int(end) if end else None)
+    
     print("=" * 60)
     print("Starting data processing for all sources")
     print("=" * 60)
     
-    # 労働時間データの処理
-    print("\n[1/4] Processing labor hours data...")
-    labor_hours = process_labor_hours()
-    
-    # 経済指標データの処理（労働時間データが必要）
-    print("\n[2/4] Processing economic indicators data...")
-    economic = process_economic_indicators(labor_hours)
-    
-    # 読書時間データの処理
-    print("\n[3/4] Processing reading time data...")
-    reading = process_reading_time()
-    
-    # 統合データセットの作成
-    print("\n[4/4] Creating combined dataset...")
-    combined = create_combined_dataset()
+    # 入力ファイルのハッシュが変わったステージのみ実行
+    # （労働時間と読書時間は独立しているため、--jobsで並列実行できる）
+    pipeline = build_pipeline(stream_options)
+    with measure('process_all') as total:
+        results, report = pipeline.run(force=args.force, jobs=max(1, args.jobs))
+    print_report(report)
+    # ステージごとの時間・メモリ・行数を実行レポートとして保存
+    save_run_report('process_all', report, total.to_dict())
     
     print("\n" + "=" * 60)
     print("Data processing completed!")
     print("=" * 60)
+    return results
 
 
 if __name__ == "__main__":
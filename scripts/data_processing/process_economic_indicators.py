@@ -3,101 +3,124 @@
 GDP成長率、一人当たりGDP、労働生産性などのデータを統合
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from reconciliation import reconcile_sources, source_bit, ensure_country, harmonize_columns
+from streaming import read_raw_csv
+from temporal_alignment import fill_panel_gaps, panel_pct_change
+from schema import enforce_schema, write_table
+from instrumentation import record_rows
+
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_RAW_DIR = PROJECT_ROOT / "data" / "raw"
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
 DATA_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
+# 複数ソースの統合ルール（'mean' / 'priority' / 'prefer_real'）
+RECONCILIATION_RULE = 'mean'
+SOURCE_PRIORITY = ['Cabinet_Office', 'OECD']
+
+# 単位の換算（元の列名: (統一後の列名, 係数)）
+UNIT_CONVERSIONS = {
+    'real_gdp_billion_yen': ('real_gdp_trillion_yen', 1e-3),
+    'gdp_growth_ratio': ('gdp_growth_rate', 100),
+}
+
+# 経済指標として読み込む列
+ECONOMIC_COLUMNS = ['gdp_growth_rate', 'gdp_per_capita_usd', 'real_gdp_trillion_yen', *UNIT_CONVERSIONS]
+
+# パネルのキー
+PANEL_KEYS = ['country', 'year']
+
 
-def load_economic_data():
-    """複数のソースから経済指標データを読み込み"""
+def load_economic_data(stream=False, **stream_options):
+    """
+    複数のソースから経済指標データを読み込み
+    
+    Args:
+        stream: Trueの場合、チャンクごとに正規化・絞り込み・集約しながら読み込む
+        stream_options: countries, year_range, chunksize（streaming.read_raw_csvを参照）
+    """
     data_sources = {}
     
+    def read(path):
+        return read_raw_csv(path, stream=stream, value_columns=ECONOMIC_COLUMNS, **stream_options)
+    
     # 実データを優先的に使用
     # 内閣府の実GDPデータ
     cabinet_real_path = DATA_RAW_DIR / "cabinet_gdp_real.csv"
     if cabinet_real_path.exists():
-        cabinet_gdp = pd.read_csv(cabinet_real_path)
+        cabinet_gdp = read(cabinet_real_path)
+        cabinet_gdp.attrs['real'] = True
         data_sources['cabinet_gdp'] = cabinet_gdp
         print("Using REAL Cabinet Office GDP data")
     else:
         # サンプルデータをフォールバック
         cabinet_gdp_path = DATA_RAW_DIR / "cabinet_gdp_sample.csv"
         if cabinet_gdp_path.exists():
-            cabinet_gdp = pd.read_csv(cabinet_gdp_path)
+            cabinet_gdp = read(cabinet_gdp_path)
+            cabinet_gdp.attrs['real'] = False
             data_sources['cabinet_gdp'] = cabinet_gdp
             print("Using SAMPLE Cabinet Office GDP data")
     
     # OECD GDPデータ
     oecd_gdp_path = DATA_RAW_DIR / "oecd_gdp_sample.csv"
     if oecd_gdp_path.exists():
-        oecd_gdp = pd.read_csv(oecd_gdp_path)
+        oecd_gdp = read(oecd_gdp_path)
+        oecd_gdp.attrs['real'] = False
         data_sources['oecd_gdp'] = oecd_gdp
     
     return data_sources
 
 
-def normalize_economic_data(data_sources):
-    """経済指標データを正規化・統合"""
-    # GDP成長率
-    gdp_growth_data = []
-    
-    # OECDデータ
-    if 'oecd_gdp' in data_sources:
-        oecd_df = data_sources['oecd_gdp'].copy()
-        if 'gdp_growth_rate' in oecd_df.columns:
-            gdp_growth = oecd_df[['year', 'gdp_growth_rate']].copy()
-            gdp_growth['source'] = 'OECD'
-            gdp_growth_data.append(gdp_growth)
-    
-    # 内閣府データ
-    if 'cabinet_gdp' in data_sources:
-        cabinet_df = data_sources['cabinet_gdp'].copy()
-        if 'gdp_growth_rate' in cabinet_df.columns:
-            gdp_growth = cabinet_df[['year', 'gdp_growth_rate']].copy()
-            gdp_growth['source'] = 'Cabinet_Office'
-            gdp_growth_data.append(gdp_growth)
-    
-    # GDP成長率を統合
-    if gdp_growth_data:
-        gdp_growth_combined = pd.concat(gdp_growth_data, ignore_index=True)
-        gdp_growth_processed = gdp_growth_combined.groupby('year').agg({
-            'gdp_growth_rate': 'mean',
-            'source': lambda x: ', '.join(x.unique())
-        }).reset_index()
-    else:
-        gdp_growth_processed = pd.DataFrame(columns=['year', 'gdp_growth_rate', 'source'])
+def normalize_economic_data(data_sources, rule=RECONCILIATION_RULE):
+    """
+    経済指標データを国×年のパネルとして正規化・統合
     
-    # 一人当たりGDP
-    gdp_per_capita_data = []
-    
-    if 'oecd_gdp' in data_sources:
-        oecd_df = data_sources['oecd_gdp'].copy()
-        if 'gdp_per_capita_usd' in oecd_df.columns:
-            gdp_pc = oecd_df[['year', 'gdp_per_capita_usd']].copy()
-            gdp_pc['source'] = 'OECD'
-            gdp_per_capita_data.append(gdp_pc)
-    
-    if gdp_per_capita_data:
-        gdp_pc_combined = pd.concat(gdp_per_capita_data, ignore_index=True)
-        gdp_pc_processed = gdp_pc_combined.groupby('year').agg({
-            'gdp_per_capita_usd': 'mean',
-            'source': lambda x: ', '.join(x.unique())
-        }).reset_index()
-    else:
-        gdp_pc_processed = pd.DataFrame(columns=['year', 'gdp_per_capita_usd', 'source'])
+    単位の統一、ソースの統合、国ごとの欠損年の補間をパネル全体に一括で適用する。
+    
+    Args:
+        data_sources: load_economic_dataの戻り値
+        rule: 複数ソースの統合ルール（'mean' / 'priority' / 'prefer_real'）
+    """
+    source_names = {'oecd_gdp': 'OECD', 'cabinet_gdp': 'Cabinet_Office'}
+    # 国の列がない内閣府のデータは国コードを付与
+    frames = {
+        source_names[key]: ensure_country(harmonize_columns(df, conversions=UNIT_CONVERSIONS))
+        for key, df in data_sources.items()
+        if key in source_names
+    }
+    real_sources = [
+        source_names[key] for key, df in data_sources.items()
+        if key in source_names and df.attrs.get('real')
+    ]
+    
+    def reconcile(column, sources):
+        reconciled = reconcile_sources(
+            {name: frames[name] for name in sources if name in frames},
+            column,
+            keys=PANEL_KEYS,
+            rule=rule,
+            priority=SOURCE_PRIORITY,
+            real_sources=real_sources
+        )
+        return fill_panel_gaps(reconciled, [column])
+    
+    # GDP成長率（OECD・内閣府）
+    gdp_growth_processed = reconcile('gdp_growth_rate', ['OECD', 'Cabinet_Office'])
+    
+    # 一人当たりGDP（OECD）
+    gdp_pc_processed = reconcile('gdp_per_capita_usd', ['OECD'])
     
     # 実質GDP（内閣府データから）
     real_gdp_processed = None
-    if 'cabinet_gdp' in data_sources:
-        cabinet_df = data_sources['cabinet_gdp'].copy()
-        if 'real_gdp_trillion_yen' in cabinet_df.columns:
-            real_gdp_processed = cabinet_df[['year', 'real_gdp_trillion_yen']].copy()
-            real_gdp_processed['source'] = 'Cabinet_Office'
+    if 'Cabinet_Office' in frames and 'real_gdp_trillion_yen' in frames['Cabinet_Office'].columns:
+        real_gdp_processed = frames['Cabinet_Office'][PANEL_KEYS + ['real_gdp_trillion_yen']].copy()
+        real_gdp_processed['source_mask'] = source_bit('Cabinet_Office')
     
     # 労働生産性の計算（実質GDP / 労働時間）
     # これは後で労働時間データと結合して計算
@@ -114,42 +137,42 @@ def calculate_labor_productivity(labor_hours_df, real_gdp_df):
     if real_gdp_df is None or labor_hours_df is None:
         return None
     
-    # データを結合
+    # 国×年で結合
     merged = pd.merge(
-        real_gdp_df,
-        labor_hours_df[['year', 'hours_per_year']],
-        on='year',
+        ensure_country(real_gdp_df),
+        ensure_country(labor_hours_df)[PANEL_KEYS + ['hours_per_year']],
+        on=PANEL_KEYS,
         how='inner'
-    )
+    ).sort_values(PANEL_KEYS).reset_index(drop=True)
     
     # 労働生産性 = 実質GDP（兆円） / 労働時間（時間/年）
     # 単位: 兆円/時間
     merged['labor_productivity'] = merged['real_gdp_trillion_yen'] / merged['hours_per_year']
     
-    # 前年比成長率を計算
-    merged['labor_productivity_growth'] = merged['labor_productivity'].pct_change() * 100
+    # 国ごとの前年比成長率を計算
+    merged['labor_productivity_growth'] = panel_pct_change(merged, 'labor_productivity')
     
-    return merged[['year', 'labor_productivity', 'labor_productivity_growth', 'source']]
+    return merged[PANEL_KEYS + ['labor_productivity', 'labor_productivity_growth', 'source_mask']]
 
 
 def combine_economic_indicators(processed_data, labor_hours_df):
     """全ての経済指標を統合"""
-    # 年を基準に全てのデータを結合
+    # 国×年を基準に全てのデータを結合
     result = pd.DataFrame()
     
     # GDP成長率
     if not processed_data['gdp_growth'].empty:
-        result = processed_data['gdp_growth'][['year', 'gdp_growth_rate']].copy()
+        result = processed_data['gdp_growth'][PANEL_KEYS + ['gdp_growth_rate']].copy()
     
     # 一人当たりGDP
     if not processed_data['gdp_per_capita'].empty:
         if result.empty:
-            result = processed_data['gdp_per_capita'][['year', 'gdp_per_capita_usd']].copy()
+            result = processed_data['gdp_per_capita'][PANEL_KEYS + ['gdp_per_capita_usd']].copy()
         else:
             result = pd.merge(
                 result,
-                processed_data['gdp_per_capita'][['year', 'gdp_per_capita_usd']],
-                on='year',
+                processed_data['gdp_per_capita'][PANEL_KEYS + ['gdp_per_capita_usd']],
+                on=PANEL_KEYS,
                 how='outer'
             )
     
@@ -157,34 +180,30 @@ def combine_economic_indicators(processed_data, labor_hours_df):
     if processed_data['real_gdp'] is not None and labor_hours_df is not None:
         productivity = calculate_labor_productivity(labor_hours_df, processed_data['real_gdp'])
         if productivity is not None:
+            columns = PANEL_KEYS + ['labor_productivity', 'labor_productivity_growth']
             if result.empty:
-                result = productivity[['year', 'labor_productivity', 'labor_productivity_growth']].copy()
+                result = productivity[columns].copy()
             else:
-                result = pd.merge(
-                    result,
-                    productivity[['year', 'labor_productivity', 'labor_productivity_growth']],
-                    on='year',
-                    how='outer'
-                )
-    
-    # 年でソート
+                result = pd.merge(result, productivity[columns], on=PANEL_KEYS, how='outer')
+    
+    # 国・年でソート
     if not result.empty:
-        result = result.sort_values('year').reset_index(drop=True)
+        result = result.sort_values(PANEL_KEYS).reset_index(drop=True)
     
     return result
 
 
 def save_processed_economic_indicators(df):
     """処理済み経済指標データを保存"""
-    output_path = DATA_PROCESSED_DIR / "economic_indicators_processed.csv"
-    df.to_csv(output_path, index=False)
+    output_path = write_table(df, 'economic_indicators_processed')
     print(f"Saved processed economic indicators to {output_path}")
     
     # メタデータ
     import json
     metadata = {
         'description': 'Processed economic indicators (GDP growth, GDP per capita, labor productivity)',
-        'indicators': list(df.columns),
+        'indicators': [col for col in df.columns if col != 'country'],
+        'countries': sorted(df['country'].astype(str).unique().tolist()) if not df.empty else [],
         'year_range': f"{df['year'].min()}-{df['year'].max()}" if not df.empty else "N/A",
         'data_points': len(df)
     }
@@ -196,12 +215,19 @@ def save_processed_economic_indicators(df):
     return output_path
 
 
-def process_economic_indicators(labor_hours_df=None):
-    """経済指標データの処理メイン関数"""
+def process_economic_indicators(labor_hours_df=None, stream=False, **stream_options):
+    """
+    経済指標データの処理メイン関数
+    
+    Args:
+        labor_hours_df: 処理済み労働時間データ（労働生産性の計算に使用）
+        stream: Trueの場合、大きな生データをチャンクごとに読み込む（メモリ使用量を一定に保つ）
+        stream_options: countries, year_range, chunksize
+    """
     print("Processing economic indicators data...")
     
     # データ読み込み
-    data_sources = load_economic_data()
+    data_sources = load_economic_data(stream=stream, **stream_options)
     
     if not data_sources:
         print("No economic data found. Please run data collection first.")
@@ -217,8 +243,10 @@ def process_economic_indicators(labor_hours_df=None):
         print("Failed to process economic indicators data.")
         return None
     
-    # 保存
+    # スキーマの型に変換して保存
+    combined = enforce_schema(combined, 'economic_indicators_processed')
     save_processed_economic_indicators(combined)
+    record_rows(rows_out=len(combined))
     
     print(f"Processed {len(combined)} data points")
     return combined
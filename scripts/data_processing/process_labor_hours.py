@@ -3,101 +3,295 @@
 複数のデータソースから取得した労働時間データを統合
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from reconciliation import reconcile_sources, describe_sources, ensure_country, harmonize_columns, DOMESTIC_COUNTRY
+from streaming import read_raw_csv
+from temporal_alignment import (
+    FREQUENCIES, detect_frequency, parse_periods, period_ordinals, fill_panel_gaps
+)
+from schema import enforce_schema, write_table
+from instrumentation import record_rows
+
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_RAW_DIR = PROJECT_ROOT / "data" / "raw"
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
 DATA_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
+# 複数ソースの統合ルール（'mean' / 'priority' / 'prefer_real'）
+RECONCILIATION_RULE = 'mean'
+SOURCE_PRIORITY = ['MHLW', 'MHLW_Monthly', 'OECD']
+
+# ソースごとの列名の対応（統一後は hours_per_year）
+SOURCE_COLUMNS = {
+    'mhlw': {'average_hours_per_year': 'hours_per_year'},
+    'oecd': {'average_hours_worked': 'hours_per_year'},
+    'mhlw_monthly': {},
+}
+
+# 単位の換算（元の列名: (統一後の列名, 係数)）。週・月あたりの労働時間を年間に換算
+UNIT_CONVERSIONS = {
+    'average_hours_per_week': ('hours_per_year', 365.25 / 7),
+    'average_hours_per_month': ('hours_per_year', 12),
+}
+
+# 読み込み時のキーと、統合時のソース名（reconciliation.SOURCE_BITS）の対応
+SOURCE_NAMES = {
+    'mhlw': 'MHLW',
+    'oecd': 'OECD',
+    'mhlw_monthly': 'MHLW_Monthly',
+}
+
+# 毎月勤労統計などの月次・四半期データ
+# （period列: '2020-01' や '2020Q1'、total_hours_worked: 期間内の総労働時間）
+SUB_ANNUAL_PATH = DATA_RAW_DIR / "mhlw_labor_hours_monthly.csv"
+SUB_ANNUAL_COLUMNS = {'total_hours_worked': 'hours_worked'}
+
+# 月次・四半期データから作成するテーブル
+SUB_ANNUAL_TABLES = {
+    'source': 'labor_hours_sub_annual_processed',
+    'Q': 'labor_hours_quarterly_processed',
+    'TTM': 'labor_hours_ttm_processed',
+}
 
-def load_labor_hours_data():
-    """複数のソースから労働時間データを読み込み"""
+
+def load_labor_hours_data(stream=False, **stream_options):
+    """
+    複数のソースから労働時間データを読み込み
+    
+    Args:
+        stream: Trueの場合、チャンクごとに正規化・絞り込み・集約しながら読み込む
+        stream_options: countries, year_range, chunksize（streaming.read_raw_csvを参照）
+    """
     data_sources = {}
     
+    def read(path, source_name):
+        return read_raw_csv(
+            path,
+            stream=stream,
+            value_columns=['hours_per_year', *UNIT_CONVERSIONS],
+            rename=SOURCE_COLUMNS[source_name],
+            **stream_options
+        )
+    
     # 実データを優先的に使用
     # 厚生労働省の実データ
     mhlw_real_path = DATA_RAW_DIR / "mhlw_labor_hours_real.csv"
     if mhlw_real_path.exists():
-        mhlw_df = pd.read_csv(mhlw_real_path)
+        mhlw_df = read(mhlw_real_path, 'mhlw')
+        mhlw_df.attrs['real'] = True
         data_sources['mhlw'] = mhlw_df
         print("Using REAL MHLW labor hours data")
     else:
         # サンプルデータをフォールバック
         mhlw_path = DATA_RAW_DIR / "mhlw_labor_hours_sample.csv"
         if mhlw_path.exists():
-            mhlw_df = pd.read_csv(mhlw_path)
+            mhlw_df = read(mhlw_path, 'mhlw')
+            mhlw_df.attrs['real'] = False
             data_sources['mhlw'] = mhlw_df
             print("Using SAMPLE MHLW labor hours data")
     
     # OECDデータ（実データがあれば優先）
     oecd_path = DATA_RAW_DIR / "oecd_labor_hours_sample.csv"
     if oecd_path.exists():
-        oecd_df = pd.read_csv(oecd_path)
+        oecd_df = read(oecd_path, 'oecd')
+        oecd_df.attrs['real'] = False
         data_sources['oecd'] = oecd_df
     
     return data_sources
 
 
-def normalize_labor_hours(data_sources):
-    """労働時間データを正規化・統合"""
-    all_data = []
+def load_sub_annual_labor_hours(path=SUB_ANNUAL_PATH, countries=None, year_range=None):
+    """
+    period列を持つ月次・四半期の労働時間データを読み込み
+
+    期間は year と month / quarter の整数列に変換し、同じ期間の重複は平均する。
+
+    Returns:
+        pd.DataFrame: （country,）year, month または quarter, hours_worked（ファイルがない場合はNone）
+    """
+    if not path.exists():
+        return None
+
+    raw = read_raw_csv(path).rename(columns=SUB_ANNUAL_COLUMNS)
+    periods, freq = parse_periods(raw['period'])
+    if freq == 'A':
+        raise ValueError(f"{path.name} contains annual periods only")
+
+    df = periods
+    if 'country' in raw.columns:
+        df.insert(0, 'country', raw['country'].to_numpy())
+    df['hours_worked'] = pd.to_numeric(raw['hours_worked'], errors='coerce').to_numpy()
+
+    mask = df['hours_worked'].notna()
+    if countries is not None:
+        # country列のないファイルは ensure_country と同じく国内のデータとして絞り込む
+        mask &= df['country'].isin(countries) if 'country' in df.columns else DOMESTIC_COUNTRY in countries
+    if year_range is not None:
+        start, end = year_range
+        if start is not None:
+            mask &= df['year'] >= start
+        if end is not None:
+            mask &= df['year'] <= end
+
+    keys = [column for column in df.columns if column != 'hours_worked']
+    return df[mask].groupby(keys, as_index=False, sort=True)['hours_worked'].mean()
+
+
+def _period_frame(codes, countries, ordinals, freq):
+    """国コードと通し番号から（country,）year, 期間列のDataFrameを作成"""
+    periods, column = FREQUENCIES[freq]
+    df = pd.DataFrame()
+    if countries is not None:
+        df['country'] = countries[codes]
+    df['year'] = ordinals // periods
+    if column:
+        df[column] = ordinals % periods + 1
+    return df
+
+
+def resample_labor_hours(sub_annual, freq='A'):
+    """
+    月次・四半期の総労働時間を年次・四半期・直近12か月（TTM）の年間労働時間に集約
+
+    国×期間のキーを整数の通し番号にし、bincount / 累積和による一括処理で集約する。
+    欠けている期間を含む集約値は出力しない。
+
+    Args:
+        sub_annual: load_sub_annual_labor_hoursの戻り値
+        freq: 'A'（暦年）、'Q'（四半期、年換算）、'TTM'（直近12か月、元データの頻度で出力）
+
+    Returns:
+        pd.DataFrame: キー列と hours_per_year
+    """
+    source_freq = detect_frequency(sub_annual)
+    periods, _ = FREQUENCIES[source_freq]
+
+    if 'country' in sub_annual.columns:
+        codes, countries = pd.factorize(sub_annual['country'], sort=True)
+        countries = np.asarray(countries)
+    else:
+        codes, countries = np.zeros(len(sub_annual), dtype=np.int64), None
+    n_countries = int(codes.max()) + 1 if len(codes) else 0
+    values = sub_annual['hours_worked'].to_numpy(dtype=float)
+
+    if freq == 'TTM':
+        # 国×期間の密なグリッドで、直近1年分の期間の累積和の差を取る
+        ordinals = period_ordinals(sub_annual, source_freq, source_freq)
+        if len(ordinals) == 0:
+            return _period_frame(codes, countries, ordinals, source_freq).assign(hours_per_year=[])
+        start = ordinals.min()
+        width = int(ordinals.max() - start) + 1
+        grid = np.zeros((n_countries, width))
+        observed = np.zeros((n_countries, width))
+        grid[codes, ordinals - start] = values
+        observed[codes, ordinals - start] = 1
+
+        zeros = np.zeros((n_countries, 1))
+        value_sums = np.cumsum(np.hstack([zeros, grid]), axis=1)
+        observed_sums = np.cumsum(np.hstack([zeros, observed]), axis=1)
+        window_sums = value_sums[:, periods:] - value_sums[:, :-periods]
+        complete = (observed_sums[:, periods:] - observed_sums[:, :-periods]) == periods
+
+        country_index, end_index = np.nonzero(complete)
+        result = _period_frame(country_index, countries, start + periods - 1 + end_index, source_freq)
+        result['hours_per_year'] = window_sums[country_index, end_index]
+        return result
+
+    if freq not in FREQUENCIES or FREQUENCIES[freq][0] > periods:
+        raise ValueError(f"Cannot resample {source_freq} labor hours to {freq}")
+
+    # 国と集約先の期間を1つの整数キーにまとめ、期間内の合計と観測数を数える
+    target_periods, _ = FREQUENCIES[freq]
+    ordinals = period_ordinals(sub_annual, source_freq, freq)
+    base = ordinals.min() if len(ordinals) else 0
+    span = int(ordinals.max() - base) + 1 if len(ordinals) else 1
+    keys, inverse = np.unique(codes * span + (ordinals - base), return_inverse=True)
+    sums = np.bincount(inverse, weights=values, minlength=len(keys))
+    counts = np.bincount(inverse, minlength=len(keys))
+    complete = counts == periods // target_periods
+
+    result = _period_frame(keys[complete] // span, countries, keys[complete] % span + base, freq)
+    # 年換算（四半期の合計は4倍）
+    result['hours_per_year'] = sums[complete] * target_periods
+    return result
+
+
+def save_sub_annual_labor_hours(sub_annual):
+    """月次・四半期の観測値と、四半期・TTMの集約値を保存"""
+    tables = {
+        'source': sub_annual,
+        'Q': resample_labor_hours(sub_annual, 'Q'),
+        'TTM': resample_labor_hours(sub_annual, 'TTM'),
+    }
+    for key, df in tables.items():
+        output_path = write_table(df, SUB_ANNUAL_TABLES[key])
+        print(f"Saved {len(df)} rows of sub-annual labor hours to {output_path}")
+
+
+def normalize_labor_hours(data_sources, rule=RECONCILIATION_RULE):
+    """
+    労働時間データを国×年のパネルとして正規化・統合
+    
+    列名・単位の統一、ソースの統合、国ごとの欠損年の補間を、国の数によらず
+    パネル全体への一括処理で行う。
+    
+    Args:
+        data_sources: load_labor_hours_dataの戻り値
+        rule: 複数ソースの統合ルール（'mean' / 'priority' / 'prefer_real'）
+    """
+    frames = {}
+    real_sources = []
     
     for source_name, df in data_sources.items():
         # データソースごとに列名を統一
-        if source_name == 'oecd':
-            # OECDデータの処理
-            normalized = df.copy()
-            if 'average_hours_worked' in normalized.columns:
-                normalized = normalized.rename(columns={
-                    'average_hours_worked': 'hours_per_year',
-                    'year': 'year'
-                })
-            normalized['source'] = 'OECD'
-        elif source_name == 'mhlw':
-            # 厚生労働省データの処理
-            normalized = df.copy()
-            if 'average_hours_per_year' in normalized.columns:
-                normalized = normalized.rename(columns={
-                    'average_hours_per_year': 'hours_per_year'
-                })
-            normalized['source'] = 'MHLW'
+        if source_name not in SOURCE_NAMES:
+            continue
+        name = SOURCE_NAMES[source_name]
+        # 国の列がない日本の統計は国コードを付与
+        normalized = ensure_country(
+            harmonize_columns(df, SOURCE_COLUMNS[source_name], UNIT_CONVERSIONS)
+        )
         
-        # 必要な列のみを抽出
         if 'year' in normalized.columns and 'hours_per_year' in normalized.columns:
-            normalized = normalized[['year', 'hours_per_year', 'source']]
-            all_data.append(normalized)
+            frames[name] = normalized
+            if df.attrs.get('real'):
+                real_sources.append(name)
     
-    if not all_data:
+    if not frames:
         return None
     
-    # データを統合
-    combined = pd.concat(all_data, ignore_index=True)
-    
-    # 年ごとに平均を計算（複数ソースがある場合）
-    processed = combined.groupby('year').agg({
-        'hours_per_year': 'mean',  # 複数ソースの平均
-        'source': lambda x: ', '.join(x.unique())  # ソース情報を保持
-    }).reset_index()
+    # 国×年ごとにソースを統合（プロベナンスはsource_maskのビットで保持）
+    processed = reconcile_sources(
+        frames,
+        'hours_per_year',
+        keys=['country', 'year'],
+        rule=rule,
+        priority=SOURCE_PRIORITY,
+        real_sources=real_sources
+    )
     
-    # 欠損値の補間（線形補間）
-    processed['hours_per_year'] = processed['hours_per_year'].interpolate(method='linear')
+    # 国ごとに欠けている年を線形補間（補間した年はどのソースにも由来しないためsource_mask=0）
+    processed = fill_panel_gaps(processed, ['hours_per_year'])
+    processed['source_mask'] = processed['source_mask'].fillna(0).astype(np.int64)
     
     return processed
 
 
 def save_processed_labor_hours(df):
     """処理済み労働時間データを保存"""
-    output_path = DATA_PROCESSED_DIR / "labor_hours_processed.csv"
-    df.to_csv(output_path, index=False)
+    output_path = write_table(df, 'labor_hours_processed')
     print(f"Saved processed labor hours data to {output_path}")
     
     # メタデータも保存
     metadata = {
         'description': 'Processed labor hours data (annual average hours worked)',
-        'sources': df['source'].iloc[0] if len(df) > 0 else 'Unknown',
+        'sources': describe_sources(df['source_mask']) if len(df) > 0 else 'Unknown',
+        'countries': sorted(df['country'].astype(str).unique().tolist()),
         'year_range': f"{df['year'].min()}-{df['year'].max()}",
         'data_points': len(df)
     }
@@ -110,12 +304,29 @@ def save_processed_labor_hours(df):
     return output_path
 
 
-def process_labor_hours():
-    """労働時間データの処理メイン関数"""
+def process_labor_hours(stream=False, **stream_options):
+    """
+    労働時間データの処理メイン関数
+    
+    Args:
+        stream: Trueの場合、大きな生データをチャンクごとに読み込む（メモリ使用量を一定に保つ）
+        stream_options: countries, year_range, chunksize
+    """
     print("Processing labor hours data...")
     
     # データ読み込み
-    data_sources = load_labor_hours_data()
+    data_sources = load_labor_hours_data(stream=stream, **stream_options)
+    
+    # 月次・四半期データ（あれば暦年に集約して1つのソースとして統合）
+    sub_annual = load_sub_annual_labor_hours(
+        countries=stream_options.get('countries'),
+        year_range=stream_options.get('year_range')
+    )
+    if sub_annual is not None:
+        annual = resample_labor_hours(sub_annual, 'A')
+        annual.attrs['real'] = True
+        data_sources['mhlw_monthly'] = annual
+        print(f"Using {len(sub_annual)} sub-annual labor hours observations")
     
     if not data_sources:
         print("No labor hours data found. Please run data collection first.")
@@ -128,8 +339,12 @@ def process_labor_hours():
         print("Failed to process labor hours data.")
         return None
     
-    # 保存
+    # スキーマの型に変換して保存
+    processed = enforce_schema(processed, 'labor_hours_processed')
     save_processed_labor_hours(processed)
+    record_rows(rows_out=len(processed))
+    if sub_annual is not None:
+        save_sub_annual_labor_hours(sub_annual)
     
     print(f"Processed {len(processed)} data points")
     return processed
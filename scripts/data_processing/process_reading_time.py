@@ -2,17 +2,33 @@
 読書時間データの前処理
 """
 
+import sys
 import pandas as pd
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from streaming import iter_normalized_chunks, require_columns, DEFAULT_CHUNKSIZE
+from schema import enforce_schema, read_table, write_table, write_table_chunks
+from instrumentation import record_rows
+
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_RAW_DIR = PROJECT_ROOT / "data" / "raw"
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
 DATA_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
+# 生データに必ず必要な列
+REQUIRED_COLUMNS = ['year', 'reading_minutes_per_day', 'source']
+
 
-def process_reading_time():
-    """読書時間データの処理"""
+def process_reading_time(stream=False, year_range=None, chunksize=DEFAULT_CHUNKSIZE, **stream_options):
+    """
+    読書時間データの処理
+    
+    Args:
+        stream: Trueの場合、チャンクごとに絞り込みながら処理済みCSVへ追記する
+        year_range: ストリーミング時に残す年の範囲 (開始年, 終了年)
+        chunksize: ストリーミング時の1チャンクの行数
+    """
     print("Processing reading time data...")
     
     # 実データを優先的に使用
@@ -30,7 +46,14 @@ def process_reading_time():
     else:
         print("Using SAMPLE reading time data")
     
+    output_path = DATA_PROCESSED_DIR / "reading_time_processed.csv"
+    
+    if stream:
+        return _process_reading_time_streaming(reading_path, output_path, year_range, chunksize)
+    
     df = pd.read_csv(reading_path)
+    require_columns(reading_path, df.columns, REQUIRED_COLUMNS)
+    record_rows(rows_in=len(df))
     
     # データクリーニング
     # 欠損値の処理（必要に応じて）
@@ -39,13 +62,13 @@ def process_reading_time():
     # 年でソート
     df = df.sort_values('year').reset_index(drop=True)
     
-    # 保存
-    output_path = DATA_PROCESSED_DIR / "reading_time_processed.csv"
-    df.to_csv(output_path, index=False)
+    # スキーマの型に変換して保存
+    df = enforce_schema(df, 'reading_time_processed')
+    write_table(df, 'reading_time_processed')
+    record_rows(rows_out=len(df))
     print(f"Saved processed reading time data to {output_path}")
     
     # メタデータ
-    import json
     metadata = {
         'description': 'Processed reading time data (minutes per day)',
         'source': df['source'].iloc[0] if len(df) > 0 else 'Unknown',
@@ -54,11 +77,56 @@ def process_reading_time():
         'note': 'Data collected every 5 years (社会生活基本調査)'
     }
     
+    save_reading_time_metadata(metadata)
+    
+    return df
+
+
+def save_reading_time_metadata(metadata):
+    """読書時間データのメタデータを保存"""
+    import json
     metadata_path = DATA_PROCESSED_DIR / "reading_time_metadata.json"
     with open(metadata_path, 'w', encoding='utf-8') as f:
         json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+
+def _process_reading_time_streaming(reading_path, output_path, year_range, chunksize):
+    """
+    チャンクごとに欠損値を除き、検証しながら処理済みCSV・Parquetへ追記
+    （メモリ使用量はチャンクサイズと出力の年数で決まる）
     
-    return df
+    Returns:
+        None（後段は処理済みファイルから読み込む）
+    """
+    chunks = (
+        chunk.dropna(subset=['year', 'reading_minutes_per_day'])
+        for chunk in iter_normalized_chunks(
+            reading_path,
+            ['reading_minutes_per_day', 'source'],
+            year_range=year_range,
+            chunksize=chunksize,
+            required=REQUIRED_COLUMNS
+        )
+    )
+    summary = write_table_chunks(chunks, 'reading_time_processed')
+    record_rows(rows_out=summary['rows'])
+    print(f"Saved processed reading time data to {output_path}")
+    
+    if not summary['ordered']:
+        # 年はキーとして重複しないことを検証済みのため、出力は年数（最大でも数百行）に収まる
+        df = read_table('reading_time_processed')
+        write_table(df.sort_values('year', kind='stable').reset_index(drop=True), 'reading_time_processed')
+    
+    metadata = {
+        'description': 'Processed reading time data (minutes per day)',
+        'source': pd.read_csv(output_path, nrows=1)['source'].iloc[0] if summary['rows'] > 0 else 'Unknown',
+        'year_range': f"{summary['year_min']}-{summary['year_max']}" if summary['rows'] > 0 else "N/A",
+        'data_points': summary['rows'],
+        'note': 'Data collected every 5 years (社会生活基本調査)'
+    }
+    save_reading_time_metadata(metadata)
+    
+    return None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+複数ソースの統合
+同じ年（国×年）に複数のデータソースがある場合の値の決め方と、
+どのソースを使ったかの情報（プロベナンス）をビットマスクで管理する
+"""
+
+import numpy as np
+import pandas as pd
+
+# ソースごとのビット（ファイル間で値が変わらないよう固定）
+SOURCE_BITS = {
+    'MHLW': 1 << 0,
+    'OECD': 1 << 1,
+    'Cabinet_Office': 1 << 2,
+    'Statistics_Bureau': 1 << 3,
+    'MHLW_Monthly': 1 << 4,
+}
+
+RECONCILIATION_RULES = ('mean', 'priority', 'prefer_real')
+
+# 国の列を持たないソース（日本の政府統計）に付与する国コード
+DOMESTIC_COUNTRY = 'JPN'
+
+
+def source_bit(source_name):
+    """ソース名に対応するビットを取得"""
+    if source_name not in SOURCE_BITS:
+        raise ValueError(f"Unknown data source: {source_name}")
+    return SOURCE_BITS[source_name]
+
+
+def decode_source_mask(mask):
+    """ビットマスクをソース名のリストに変換"""
+    mask = int(mask)
+    return [name for name, bit in SOURCE_BITS.items() if mask & bit]
+
+
+def describe_sources(masks):
+    """ビットマスク列全体で使われたソース名（カンマ区切り）"""
+    masks = np.asarray(masks, dtype=np.int64)
+    combined = int(np.bitwise_or.reduce(masks)) if len(masks) else 0
+    return ', '.join(decode_source_mask(combined)) or 'Unknown'
+
+
+def ensure_country(df, country=DOMESTIC_COUNTRY):
+    """国の列がなければ追加し、国×年のパネルとして扱えるようにする"""
+    if 'country' in df.columns:
+        return df
+    return df.assign(country=country)
+
+
+def harmonize_columns(df, rename=None, conversions=None):
+    """
+    列名の統一と単位の換算
+
+    Args:
+        df: ソースのDataFrame
+        rename: {元の列名: 統一後の列名}
+        conversions: {元の列名: (統一後の列名, 係数)}。統一後の列が既にある場合は欠損のみ補う
+
+    Returns:
+        pd.DataFrame: 統一後の列名・単位のDataFrame
+    """
+    df = df.rename(columns=rename or {})
+    for column, (target, factor) in (conversions or {}).items():
+        if column not in df.columns:
+            continue
+        converted = df[column].to_numpy(dtype=float) * factor
+        if target in df.columns:
+            current = df[target].to_numpy(dtype=float)
+            converted = np.where(np.isnan(current), converted, current)
+        df = df.drop(columns=column).assign(**{target: converted})
+    return df
+
+
+def reconcile_sources(frames, value_column, keys=('year',), rule='mean', priority=None, real_sources=()):
+    """
+    複数ソースの値を統合
+
+    Args:
+        frames: {ソース名: DataFrame}（各DataFrameはキー列と値の列を持つ）
+        value_column: 統合する値の列名
+        keys: 統合の単位となる列（例: ['year'] や ['country', 'year']）
+        rule: 'mean'（全ソースの平均。同じソース内の重複行は先に平均する）、'priority'（優先順位が最も高いソース）、
+              'prefer_real'（実データがあれば実データのみの平均、なければ全ソースの平均）
+        priority: rule='priority' のときのソース名の優先順（先頭が最優先）
+        real_sources: rule='prefer_real' のときに実データとして扱うソース名
+
+    Returns:
+        pd.DataFrame: キー列、値の列、source_mask（使用したソースのビットマスク）
+    """
+    if rule not in RECONCILIATION_RULES:
+        raise ValueError(f"Unknown reconciliation rule: {rule}")
+
+    keys = list(keys)
+    parts = []
+    for source_name, df in frames.items():
+        if df is None or value_column not in df.columns:
+            continue
+        part = df[keys + [value_column]]
+        part = part[part[value_column].notna()]
+        if part.duplicated(keys).any():
+            # 同じソース内の重複行は先に平均し、ソースごとの重みを揃える
+            # （ストリーミング読み込みでソースごとに集約した場合と同じ結果にする）
+            part = part.groupby(keys, as_index=False, sort=False)[value_column].mean()
+        parts.append(pd.DataFrame({
+            **{key: part[key].to_numpy() for key in keys},
+            value_column: part[value_column].to_numpy(dtype=float),
+            'source_mask': np.full(len(part), source_bit(source_name), dtype=np.int64),
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=keys + [value_column, 'source_mask'])
+
+    combined = pd.concat(parts, ignore_index=True)
+
+    if rule == 'priority':
+        order = list(priority or frames.keys())
+        rank_by_bit = {source_bit(name): rank for rank, name in enumerate(order)}
+        combined['_rank'] = combined['source_mask'].map(rank_by_bit).fillna(len(order))
+        chosen = combined.sort_values(keys + ['_rank'], kind='stable').drop_duplicates(keys, keep='first')
+        return chosen.drop(columns='_rank').sort_values(keys).reset_index(drop=True)
+
+    if rule == 'prefer_real':
+        real_bits = [source_bit(name) for name in real_sources]
+        combined['_real'] = combined['source_mask'].isin(real_bits)
+        has_real = combined.groupby(keys, sort=False)['_real'].transform('max')
+        combined = combined[combined['_real'] == has_real].drop(columns='_real')
+
+    # グループ番号を一度だけ求め、値の平均とビットORをbincountで一括計算
+    grouped = combined.groupby(keys, sort=True)
+    group_ids = grouped.ngroup().to_numpy()
+    result = grouped.size().reset_index()[keys]
+    n_groups = len(result)
+
+    values = combined[value_column].to_numpy()
+    sums = np.bincount(group_ids, weights=values, minlength=n_groups)
+    counts = np.bincount(group_ids, minlength=n_groups)
+    result[value_column] = sums / counts
+
+    source_masks = combined['source_mask'].to_numpy()
+    mask = np.zeros(n_groups, dtype=np.int64)
+    for bit in np.unique(source_masks):
+        present = np.bincount(group_ids[source_masks == bit], minlength=n_groups) > 0
+        mask |= np.where(present, bit, 0)
+    result['source_mask'] = mask
+
+    return result
@@ -0,0 +1,391 @@
+"""
+処理済みテーブルのスキーマ
+列ごとの型（年は小さい整数、国・ソースはカテゴリ、指標は浮動小数点）を宣言し、
+書き込み時と読み込み時に同じ型と検証を適用する
+
+pyarrow がインストールされている場合は、CSVに加えて列指向のParquetも書き出し、
+読み込み時はParquetから必要な列のみを読む（ない場合はCSVにフォールバック）。
+"""
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+
+# 指標列の型（相関・回帰の精度を保つため float64 のまま）
+INDICATOR = 'indicator'
+INDICATOR_DTYPE = 'float64'
+
+# 列指向フォーマット（CSVと同じ場所に同じテーブル名で保存）
+COLUMNAR_SUFFIX = '.parquet'
+
+TABLE_SCHEMAS = {
+    'labor_hours_processed': {
+        'columns': {
+            'country': 'category',
+            'year': 'int16',
+            'hours_per_year': INDICATOR,
+            'source_mask': 'uint8',
+        },
+        'required': ['year', 'hours_per_year'],
+        'keys': ['country', 'year'],
+        'ranges': {'year': (1800, 2200), 'hours_per_year': (0, 8784)},
+    },
+    # 月次・四半期の観測値（期間内の総労働時間）
+    'labor_hours_sub_annual_processed': {
+        'columns': {
+            'country': 'category',
+            'year': 'int16',
+            'quarter': 'int8',
+            'month': 'int8',
+            'hours_worked': INDICATOR,
+        },
+        'required': ['year', 'hours_worked'],
+        'keys': ['country', 'year', 'quarter', 'month'],
+        'ranges': {'year': (1800, 2200), 'quarter': (1, 4), 'month': (1, 12), 'hours_worked': (0, 2208)},
+    },
+    # 四半期ごとの年換算労働時間
+    'labor_hours_quarterly_processed': {
+        'columns': {
+            'country': 'category',
+            'year': 'int16',
+            'quarter': 'int8',
+            'hours_per_year': INDICATOR,
+        },
+        'required': ['year', 'quarter', 'hours_per_year'],
+        'keys': ['country', 'year', 'quarter'],
+        'ranges': {'year': (1800, 2200), 'quarter': (1, 4), 'hours_per_year': (0, 8784)},
+    },
+    # 直近12か月（TTM）の労働時間（各月・各四半期末時点）
+    'labor_hours_ttm_processed': {
+        'columns': {
+            'country': 'category',
+            'year': 'int16',
+            'quarter': 'int8',
+            'month': 'int8',
+            'hours_per_year': INDICATOR,
+        },
+        'required': ['year', 'hours_per_year'],
+        'keys': ['country', 'year', 'quarter', 'month'],
+        'ranges': {'year': (1800, 2200), 'quarter': (1, 4), 'month': (1, 12), 'hours_per_year': (0, 8784)},
+    },
+    'economic_indicators_processed': {
+        'columns': {
+            'country': 'category',
+            'year': 'int16',
+            'gdp_growth_rate': INDICATOR,
+            'gdp_per_capita_usd': INDICATOR,
+            'labor_productivity': INDICATOR,
+            'labor_productivity_growth': INDICATOR,
+        },
+        'required': ['year'],
+        'keys': ['country', 'year'],
+        'ranges': {'year': (1800, 2200)},
+    },
+    'reading_time_processed': {
+        'columns': {
+            'year': 'int16',
+            'reading_minutes_per_day': INDICATOR,
+            'source': 'category',
+        },
+        'required': ['year', 'reading_minutes_per_day'],
+        'keys': ['year'],
+        'ranges': {'year': (1800, 2200), 'reading_minutes_per_day': (0, 1440)},
+    },
+    'combined_dataset': {
+        'columns': {
+            'country': 'category',
+            'year': 'int16',
+            'hours_per_year': INDICATOR,
+            'gdp_growth_rate': INDICATOR,
+            'gdp_per_capita_usd': INDICATOR,
+            'labor_productivity': INDICATOR,
+            'labor_productivity_growth': INDICATOR,
+            'reading_minutes_per_day': INDICATOR,
+        },
+        'required': ['year'],
+        'keys': ['country', 'year'],
+        'ranges': {'year': (1800, 2200), 'hours_per_year': (0, 8784)},
+    },
+}
+
+
+class SchemaError(ValueError):
+    """スキーマ検証エラー"""
+
+
+def table_path(table, suffix='.csv'):
+    """テーブル名から処理済みファイルのパスを取得"""
+    return DATA_PROCESSED_DIR / f"{table}{suffix}"
+
+
+def columnar_available():
+    """Parquetの読み書きに使う pyarrow がインストールされているか"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def output_paths(table):
+    """テーブルの書き出し先（Parquetは書き出せる環境の場合のみ含む）"""
+    paths = [table_path(table)]
+    if columnar_available():
+        paths.append(table_path(table, COLUMNAR_SUFFIX))
+    return paths
+
+
+def column_dtypes(table, columns=None):
+    """
+    テーブルの列型を取得
+
+    Args:
+        table: テーブル名
+        columns: 対象の列（省略時はスキーマの全列）
+    """
+    declared = TABLE_SCHEMAS[table]['columns']
+    dtypes = {
+        column: INDICATOR_DTYPE if dtype == INDICATOR else dtype
+        for column, dtype in declared.items()
+    }
+    if columns is not None:
+        dtypes = {column: dtypes[column] for column in columns if column in dtypes}
+    return dtypes
+
+
+def validate_table(df, table, partial=False):
+    """
+    必須列・欠損・値の範囲・キーの重複をベクトル演算で検証
+
+    Args:
+        partial: Trueの場合、一部の列のみ読み込んだものとして必須列の有無を検証しない
+
+    Raises:
+        SchemaError: 検証に失敗した場合
+    """
+    schema = TABLE_SCHEMAS[table]
+    errors = []
+
+    missing = [column for column in schema['required'] if column not in df.columns]
+    if missing and not partial:
+        errors.append(f"missing required columns: {', '.join(missing)}")
+
+    if 'year' in df.columns and df['year'].isna().any():
+        errors.append("year contains missing values")
+
+    for column, (low, high) in schema.get('ranges', {}).items():
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy(dtype=float, na_value=np.nan)
+        bad = ~np.isnan(values) & ((values < low) | (values > high))
+        if bad.any():
+            errors.append(f"{column} has {int(bad.sum())} values outside [{low}, {high}]")
+
+    keys = [key for key in schema.get('keys', []) if key in df.columns]
+    if keys and df.duplicated(keys).any():
+        errors.append(f"duplicate rows for key ({', '.join(keys)})")
+
+    if errors:
+        raise SchemaError(f"{table}: " + '; '.join(errors))
+
+
+def enforce_schema(df, table, validate=True):
+    """
+    スキーマの型に変換（スキーマにない数値列は指標として扱う）
+
+    Returns:
+        pd.DataFrame: 型変換済みのDataFrame
+    """
+    dtypes = column_dtypes(table, df.columns)
+    for column in df.columns:
+        if column not in dtypes and pd.api.types.is_numeric_dtype(df[column]):
+            dtypes[column] = INDICATOR_DTYPE
+
+    df = df.astype(dtypes)
+    if validate:
+        validate_table(df, table)
+    return df
+
+
+def write_table(df, table):
+    """スキーマを適用して処理済みCSV（と、可能であればParquet）に保存"""
+    df = enforce_schema(df, table)
+    output_path = table_path(table)
+    df.to_csv(output_path, index=False)
+
+    columnar_path = table_path(table, COLUMNAR_SUFFIX)
+    if columnar_available():
+        df.to_parquet(columnar_path, index=False)
+    elif columnar_path.exists():
+        # 古いParquetが読み込まれないよう削除
+        columnar_path.unlink()
+    return output_path
+
+
+class TableChunkWriter:
+    """
+    処理済みテーブルをチャンクごとにCSV（と、可能であればParquet）へ書き出す
+
+    チャンクごとにスキーマの型変換と検証を行い、キーの重複はチャンクをまたいで
+    検出する。保持するのは書き出したキーのみなので、メモリ使用量は入力ではなく
+    出力のキーの数で決まる。Parquetは pyarrow の ParquetWriter で行グループとして追記する。
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.csv_path = table_path(table)
+        self.columnar_path = table_path(table, COLUMNAR_SUFFIX)
+        self.keys = TABLE_SCHEMAS[table].get('keys', [])
+        self.seen_keys = set()
+        self.rows = 0
+        self.year_min = None
+        self.year_max = None
+        self.ordered = True
+        self._last_year = None
+        self._parquet_writer = None
+        self._arrow_schema = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None:
+            # 途中までの出力が読み込まれないよう削除
+            for path in (self.csv_path, self.columnar_path):
+                if path.exists():
+                    path.unlink()
+        return False
+
+    def write(self, chunk):
+        """チャンクを型変換・検証して追記"""
+        if len(chunk) == 0:
+            return
+        chunk = enforce_schema(chunk, self.table)
+        keys = [key for key in self.keys if key in chunk.columns]
+        if keys:
+            new_keys = set(chunk[keys].itertuples(index=False, name=None))
+            if not new_keys.isdisjoint(self.seen_keys):
+                raise SchemaError(f"{self.table}: duplicate rows for key ({', '.join(keys)}) across chunks")
+            self.seen_keys |= new_keys
+
+        chunk.to_csv(self.csv_path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        if columnar_available():
+            self._write_columnar(chunk)
+        elif self.rows == 0 and self.columnar_path.exists():
+            # 古いParquetが読み込まれないよう削除
+            self.columnar_path.unlink()
+
+        self.rows += len(chunk)
+        years = chunk['year']
+        if len(years):
+            self.year_min = int(years.min()) if self.year_min is None else min(self.year_min, int(years.min()))
+            self.year_max = int(years.max()) if self.year_max is None else max(self.year_max, int(years.max()))
+            if not years.is_monotonic_increasing or (
+                    self._last_year is not None and years.iloc[0] < self._last_year):
+                self.ordered = False
+            self._last_year = years.iloc[-1]
+
+    def _write_columnar(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # カテゴリの辞書はチャンクごとに異なるため文字列として保存（読み込み時にカテゴリに戻す）
+        categorical = [column for column in chunk.columns if isinstance(chunk[column].dtype, pd.CategoricalDtype)]
+        chunk = chunk.astype({column: 'object' for column in categorical})
+        if self._parquet_writer is None:
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            for column in categorical:
+                schema = schema.set(schema.get_field_index(column), pa.field(column, pa.string()))
+            self._arrow_schema = schema
+            self._parquet_writer = pq.ParquetWriter(self.columnar_path, self._arrow_schema)
+        self._parquet_writer.write_table(
+            pa.Table.from_pandas(chunk, schema=self._arrow_schema, preserve_index=False)
+        )
+
+    def close(self):
+        """Parquetのフッタを書き出して閉じる"""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def summary(self):
+        """書き込んだ行数と年の範囲、年順が崩れていないか"""
+        return {'rows': self.rows, 'year_min': self.year_min, 'year_max': self.year_max, 'ordered': self.ordered}
+
+
+def write_table_chunks(chunks, table):
+    """
+    チャンクを順に検証しながら処理済みテーブルへ書き出す
+
+    Returns:
+        dict: TableChunkWriter.summary の結果
+    """
+    with TableChunkWriter(table) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.summary()
+
+
+def _select_source(table, path):
+    """読み込むファイルを決定（CSVより新しいParquetがあればそちらを優先）"""
+    if path is not None:
+        return Path(path)
+
+    csv_path = table_path(table)
+    columnar_path = table_path(table, COLUMNAR_SUFFIX)
+    if columnar_available() and columnar_path.exists():
+        if not csv_path.exists() or columnar_path.stat().st_mtime >= csv_path.stat().st_mtime:
+            return columnar_path
+    return csv_path
+
+
+def _read_columnar(path, columns):
+    """Parquetから指定された列のみを読み込む"""
+    import pyarrow.parquet as pq
+
+    header = pq.read_schema(path).names
+    selected = [column for column in header if columns is None or column in columns]
+    return pd.read_parquet(path, columns=selected), selected
+
+
+def _read_csv(path, table, columns):
+    """CSVから指定された列のみを宣言された型で読み込む"""
+    header = pd.read_csv(path, nrows=0).columns
+    selected = [column for column in header if columns is None or column in columns]
+    # スキーマにない列は型推論に任せる
+    dtypes = column_dtypes(table, selected)
+    # 既定の高速な浮動小数点パーサは末尾の桁がずれ得るため、Parquetと同じ値になるよう厳密に読む
+    return pd.read_csv(path, usecols=selected, dtype=dtypes, float_precision='round_trip'), selected
+
+
+def read_table(table, columns=None, validate=True, path=None):
+    """
+    処理済みテーブルを宣言された型で読み込む（型推論を行わない）
+
+    Args:
+        table: テーブル名
+        columns: 読み込む列（省略時は全列）
+        validate: 読み込み後に検証するか
+        path: 読み込むファイル（省略時は data/processed/<table>.parquet、なければ .csv）
+
+    Returns:
+        pd.DataFrame（ファイルがない場合はNone）
+    """
+    path = _select_source(table, path)
+    if not path.exists():
+        return None
+
+    try:
+        if path.suffix == COLUMNAR_SUFFIX:
+            df, selected = _read_columnar(path, columns)
+            df = df.astype(column_dtypes(table, selected))
+        else:
+            df, selected = _read_csv(path, table, columns)
+    except ValueError as e:
+        raise SchemaError(f"{table}: {e}")
+    df = df[selected]
+    if validate:
+        validate_table(df, table, partial=columns is not None)
+    return df
@@ -0,0 +1,181 @@
+"""
+大きな生データCSVのストリーミング読み込み
+ファイル全体を読み込まず、一定行数のチャンクごとに正規化・絞り込みを行う
+"""
+
+import pandas as pd
+
+from instrumentation import record_rows
+from reconciliation import DOMESTIC_COUNTRY
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def read_header(path, rename=None):
+    """CSVのヘッダーのみを読み込み、統一後の列名の集合を返す"""
+    rename = rename or {}
+    return {rename.get(column, column) for column in pd.read_csv(path, nrows=0).columns}
+
+
+def require_columns(path, present, required):
+    """必要な列がなければ、ファイル名を含むValueErrorを送出"""
+    missing = [column for column in required if column not in present]
+    if missing:
+        raise ValueError(f"{path}: missing required columns: {', '.join(missing)}")
+
+
+def iter_normalized_chunks(path, columns, rename=None, countries=None, year_range=None,
+                           chunksize=DEFAULT_CHUNKSIZE, required=('year',),
+                           default_country=DOMESTIC_COUNTRY):
+    """
+    CSVをチャンクごとに読み込み、列名の統一と絞り込みを行う
+
+    Args:
+        path: CSVファイルのパス
+        columns: 必要な列（統一後の列名）。ファイルにない列は無視する
+        rename: {元の列名: 統一後の列名}
+        countries: 残す国コードのリスト
+        year_range: (開始年, 終了年)。どちらかはNoneでもよい
+        chunksize: 1チャンクの行数
+        required: ファイルに必ず必要な列（統一後の列名）。読み込む前にヘッダーで検証する
+        default_country: country列のないファイルの国（countries での絞り込みに使う）
+
+    Yields:
+        pd.DataFrame: 正規化・絞り込み済みのチャンク
+    """
+    rename = rename or {}
+    header = read_header(path, rename)
+    require_columns(path, header, required)
+    # country列のないファイルは ensure_country と同じく default_country のデータとして絞り込む
+    if countries is not None and 'country' not in header and default_country not in countries:
+        return
+
+    wanted = set(columns) | {'country', 'year'}
+    source_columns = {original for original, target in rename.items() if target in wanted}
+    # 必要な列のみパースする
+    usecols = lambda column: column in wanted or column in source_columns
+
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+        record_rows(rows_in=len(chunk))
+        chunk = chunk.rename(columns=rename)
+        mask = pd.Series(True, index=chunk.index)
+        if countries is not None and 'country' in header:
+            mask &= chunk['country'].isin(countries)
+        if year_range is not None:
+            start, end = year_range
+            if start is not None:
+                mask &= chunk['year'] >= start
+            if end is not None:
+                mask &= chunk['year'] <= end
+        chunk = chunk[mask]
+        if len(chunk):
+            yield chunk[[c for c in chunk.columns if c in wanted]]
+
+
+class ChunkAggregator:
+    """
+    チャンクごとの部分集計（合計・件数）を積み上げ、キーごとの平均を求める
+
+    保持するのはキーの数だけの集計値なので、メモリ使用量は入力ファイルの
+    大きさではなく、出力の行数（国×年）で決まる。
+    """
+
+    def __init__(self, keys, value_columns, first_columns=()):
+        self.keys = list(keys)
+        self.value_columns = list(value_columns)
+        self.first_columns = list(first_columns)
+        self.state = None
+        self.rows_in = 0
+
+    def add(self, chunk):
+        """チャンクを集計に加える"""
+        self.rows_in += len(chunk)
+        values = [c for c in self.value_columns if c in chunk.columns]
+        grouped = chunk.groupby(self.keys, sort=False)
+        partial = pd.concat(
+            [grouped[values].sum(min_count=1).add_suffix('__sum'),
+             grouped[values].count().add_suffix('__count')],
+            axis=1
+        )
+        firsts = [c for c in self.first_columns if c in chunk.columns]
+        if firsts:
+            partial = partial.join(grouped[firsts].first())
+
+        if self.state is None:
+            self.state = partial
+            return
+
+        combined = pd.concat([self.state, partial])
+        grouped = combined.groupby(level=self.keys, sort=False)
+        numeric = [c for c in combined.columns if c.endswith('__sum') or c.endswith('__count')]
+        state = grouped[numeric].sum(min_count=1)
+        firsts = [c for c in self.first_columns if c in combined.columns]
+        if firsts:
+            state = state.join(grouped[firsts].first())
+        self.state = state
+
+    def result(self):
+        """キーごとの平均値（キーでソート済み）"""
+        if self.state is None:
+            return pd.DataFrame(columns=self.keys + self.value_columns)
+
+        result = pd.DataFrame(index=self.state.index)
+        for column in self.value_columns:
+            if f'{column}__sum' in self.state.columns:
+                counts = self.state[f'{column}__count']
+                result[column] = self.state[f'{column}__sum'] / counts.where(counts > 0)
+        for column in self.first_columns:
+            if column in self.state.columns:
+                result[column] = self.state[column]
+        return result.sort_index().reset_index()
+
+
+def read_csv_streaming(path, value_columns, keys=('year',), rename=None, countries=None,
+                       year_range=None, chunksize=DEFAULT_CHUNKSIZE, first_columns=()):
+    """
+    CSVをチャンクごとに読み込み、キー（年・国×年）ごとに集約したDataFrameを返す
+
+    Returns:
+        pd.DataFrame: キー列と値の列（同じキーの行は平均）
+    """
+    # キー列のないファイル（単一国のデータなど）はその列を除いて集計
+    present = read_header(path, rename)
+    keys = [key for key in keys if key in present]
+
+    aggregator = ChunkAggregator(keys, value_columns, first_columns)
+    for chunk in iter_normalized_chunks(
+        path,
+        list(value_columns) + list(first_columns),
+        rename=rename,
+        countries=countries,
+        year_range=year_range,
+        chunksize=chunksize
+    ):
+        aggregator.add(chunk)
+    return aggregator.result()
+
+
+def read_raw_csv(path, stream=False, value_columns=(), rename=None, keys=('country', 'year'),
+                 **stream_options):
+    """
+    生データCSVを読み込む（stream=Trueの場合はチャンクごとに集約しながら読み込む）
+
+    Args:
+        path: CSVファイルのパス
+        stream: ストリーミングモードで読み込むか
+        value_columns: ストリーミング時に残す値の列（統一後の列名）
+        rename: ストリーミング時に適用する列名の対応
+        keys: ストリーミング時の集約キー（ファイルにない列は無視）
+        stream_options: countries, year_range, chunksize, first_columns
+    """
+    if not stream:
+        df = pd.read_csv(path)
+        record_rows(rows_in=len(df))
+        return df
+    return read_csv_streaming(
+        path,
+        list(value_columns),
+        keys=keys,
+        rename=rename,
+        **stream_options
+    )
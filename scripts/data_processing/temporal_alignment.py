@@ -0,0 +1,342 @@
+"""
+時系列の頻度合わせ
+5年ごと・年次・四半期・月次など頻度の異なる系列を、共通のカレンダーへ
+ベクトル化された一括処理で揃える
+"""
+
+import numpy as np
+import pandas as pd
+
+# 頻度ごとの1年あたりの期間数と、期間を表す列名
+FREQUENCIES = {
+    'A': (1, None),
+    'Q': (4, 'quarter'),
+    'M': (12, 'month'),
+}
+
+INTERPOLATION_METHODS = ('linear', 'nearest', 'ffill', 'none')
+
+# 期間文字列（'2020'、'2020-01'、'2020M01'、'2020Q1'、'2020-Q1'）
+PERIOD_PATTERN = (
+    r'^\s*(?P<year>\d{4})'
+    r'(?:[-/.]?(?:M?(?P<month>\d{1,2})|Q(?P<quarter>[1-4])))?\s*$'
+)
+
+
+def detect_frequency(df):
+    """期間列（month / quarter）から系列の頻度を判定"""
+    if 'month' in df.columns:
+        return 'M'
+    if 'quarter' in df.columns:
+        return 'Q'
+    return 'A'
+
+
+def parse_periods(values):
+    """
+    期間文字列を year と month / quarter 列に一括変換
+
+    Args:
+        values: 期間文字列の配列（全て同じ頻度であること）
+
+    Returns:
+        tuple: (year と期間列を持つDataFrame, 頻度 'A' / 'Q' / 'M')
+
+    Raises:
+        ValueError: 解釈できない期間、または頻度が混在している場合
+    """
+    parts = pd.Series(values, dtype='string').str.upper().str.extract(PERIOD_PATTERN)
+    invalid = parts['year'].isna()
+    if invalid.any():
+        raise ValueError(f"Unrecognized period: {pd.Series(values)[invalid.to_numpy()].iloc[0]}")
+
+    has_month = parts['month'].notna()
+    has_quarter = parts['quarter'].notna()
+    if has_month.all():
+        freq = 'M'
+    elif has_quarter.all():
+        freq = 'Q'
+    elif not (has_month.any() or has_quarter.any()):
+        freq = 'A'
+    else:
+        raise ValueError("Periods mix different frequencies")
+
+    periods, column = FREQUENCIES[freq]
+    result = pd.DataFrame({'year': parts['year'].astype(np.int64).to_numpy()})
+    if column:
+        sub = parts[column].astype(np.int64).to_numpy()
+        if ((sub < 1) | (sub > periods)).any():
+            raise ValueError(f"{column} must be between 1 and {periods}")
+        result[column] = sub
+    return result, freq
+
+
+def period_ordinals(df, freq, target_freq):
+    """
+    各行の期間をターゲット頻度の通し番号（year * 期間数 + 期内番号）に変換
+
+    ターゲットより細かい頻度の場合は、属するターゲット期間の番号（整数）を返す。
+    粗い頻度の場合は、その期間の開始時点をターゲット単位で表す。
+    """
+    periods, column = FREQUENCIES[freq]
+    target_periods, _ = FREQUENCIES[target_freq]
+    years = df['year'].to_numpy(dtype=np.int64)
+    sub = df[column].to_numpy(dtype=np.int64) - 1 if column else np.zeros(len(df), dtype=np.int64)
+
+    if periods >= target_periods:
+        return years * target_periods + (sub * target_periods) // periods
+    return years * target_periods + sub * (target_periods // periods)
+
+
+def calendar_ordinals(calendar, target_freq):
+    """カレンダー（year と期間列を持つDataFrame）の通し番号"""
+    return period_ordinals(calendar, target_freq, target_freq)
+
+
+def _collapse(ordinals, values, agg):
+    """同じ通し番号の観測を集約（ソート済みの一意な番号と値を返す）"""
+    keys, inverse = np.unique(ordinals, return_inverse=True)
+    if agg == 'last':
+        collapsed = np.empty(len(keys))
+        collapsed[inverse] = values
+        return keys, collapsed
+    sums = np.bincount(inverse, weights=values, minlength=len(keys))
+    if agg == 'sum':
+        return keys, sums
+    counts = np.bincount(inverse, minlength=len(keys))
+    return keys, sums / counts
+
+
+def _interpolate(keys, values, targets, method, max_gap, group_span=None):
+    """
+    ソート済みの観測点から目標点の値を一括で補間
+
+    Args:
+        keys: 観測点の通し番号（昇順・一意）
+        values: 観測値
+        targets: 目標点の通し番号
+        method: 'linear' / 'nearest' / 'ffill' / 'none'
+        max_gap: 補間を許す最大の欠損期間数（Noneで無制限）
+        group_span: _offset_groups で国ごとにずらした場合の国あたりの番号の幅
+    """
+    result = np.full(len(targets), np.nan)
+    if len(keys) == 0:
+        return result
+
+    right = np.searchsorted(keys, targets, side='left')
+    exact = (right < len(keys)) & (keys[np.minimum(right, len(keys) - 1)] == targets)
+    result[exact] = values[right[exact]]
+    if method == 'none':
+        return result
+
+    left = right - 1
+    has_left = (left >= 0) & ~exact
+    has_right = (right < len(keys)) & ~exact
+    inside = has_left & has_right
+
+    left_key = keys[np.clip(left, 0, len(keys) - 1)]
+    right_key = keys[np.clip(right, 0, len(keys) - 1)]
+    if group_span is not None:
+        # 次の国の最初の観測は右隣として扱わない
+        has_right &= right_key // group_span == targets // group_span
+    left_value = values[np.clip(left, 0, len(keys) - 1)]
+    right_value = values[np.clip(right, 0, len(keys) - 1)]
+
+    if method == 'ffill':
+        fill = has_left
+        gap = np.where(has_right, right_key - left_key - 1, targets - left_key)
+        filled = left_value
+    elif method == 'nearest':
+        fill = inside
+        gap = right_key - left_key - 1
+        filled = np.where(targets - left_key <= right_key - targets, left_value, right_value)
+    else:
+        fill = inside
+        gap = right_key - left_key - 1
+        span = np.where(inside, right_key - left_key, 1)
+        filled = left_value + (right_value - left_value) * (targets - left_key) / span
+
+    if max_gap is not None:
+        fill &= gap <= max_gap
+
+    result[fill] = filled[fill]
+    return result
+
+
+def _offset_groups(source_groups, calendar_groups, ordinals, targets):
+    """
+    国ごとに通し番号をずらし、国をまたいだ補間が起きないようにする
+
+    国の間隔を観測範囲の2倍にするため、国内の欠損（範囲 - 1 期間以下）は補間でき、
+    国をまたぐ欠損は必ずそれより長くなる。
+
+    Returns:
+        tuple: (ずらした観測の通し番号, ずらした目標の通し番号, 国内で許される最大の欠損期間数,
+                国あたりの番号の幅)
+    """
+    groups = pd.Index(pd.unique(np.concatenate([
+        np.asarray(source_groups, dtype=object),
+        np.asarray(calendar_groups, dtype=object),
+    ])))
+    combined = np.concatenate([ordinals, targets])
+    low = combined.min() if len(combined) else 0
+    width = int(combined.max() - low) + 1 if len(combined) else 1
+    span = 2 * width
+    source_codes = groups.get_indexer(np.asarray(source_groups, dtype=object))
+    calendar_codes = groups.get_indexer(np.asarray(calendar_groups, dtype=object))
+    return (
+        source_codes * span + (ordinals - low),
+        calendar_codes * span + (targets - low),
+        width - 1,
+        span
+    )
+
+
+def align_series(df, column, calendar, target_freq='A', method='linear', max_gap=None, agg='mean'):
+    """
+    1つの系列をターゲットのカレンダーに揃える
+
+    ターゲットより細かい頻度の系列は期間ごとに集約し、粗い頻度の系列は補間する。
+
+    df と calendar の両方に country 列がある場合は国ごとに揃える。
+
+    Args:
+        df: year（と month / quarter）列、および値の列を持つDataFrame
+        column: 値の列名
+        calendar: ターゲットのカレンダー（year と期間列を持つDataFrame）
+        target_freq: 'A' / 'Q' / 'M'
+        method: 補間方法（'linear' / 'nearest' / 'ffill' / 'none'）
+        max_gap: 補間を許す最大の欠損期間数（Noneで無制限）
+        agg: 細かい頻度を集約する方法（'mean' / 'sum' / 'last'）
+
+    Returns:
+        np.ndarray: カレンダーの各行に対応する値
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {method}")
+
+    source_freq = detect_frequency(df)
+    valid = df[column].notna().to_numpy()
+    data = df[valid]
+    ordinals = period_ordinals(data, source_freq, target_freq)
+    targets = calendar_ordinals(calendar, target_freq)
+    group_span = None
+    if 'country' in df.columns and 'country' in calendar.columns:
+        ordinals, targets, group_gap, group_span = _offset_groups(
+            data['country'], calendar['country'], ordinals, targets
+        )
+        max_gap = group_gap if max_gap is None else min(max_gap, group_gap)
+    keys, values = _collapse(ordinals, data[column].to_numpy(dtype=float), agg)
+
+    if FREQUENCIES[source_freq][0] > FREQUENCIES[target_freq][0]:
+        # 集約済みの期間のみ値を持つ（補間は行わない）
+        return _interpolate(keys, values, targets, 'none', None)
+
+    return _interpolate(keys, values, targets, method, max_gap, group_span=group_span)
+
+
+def align_to_calendar(sources, calendar, target_freq='A', method='linear', max_gap=None, agg='mean'):
+    """
+    複数の系列をターゲットのカレンダーに揃えて1つのDataFrameにする
+
+    Args:
+        sources: {列名: DataFrame} の辞書
+        calendar: ターゲットのカレンダー（year と期間列を持つDataFrame）
+        method, max_gap, agg: 全系列共通、または {列名: 値} の辞書で系列ごとに指定
+
+    Returns:
+        pd.DataFrame: カレンダーに各系列の列を追加したもの
+    """
+    def option(value, column):
+        return value.get(column) if isinstance(value, dict) else value
+
+    aligned = calendar.reset_index(drop=True).copy()
+    for column, df in sources.items():
+        aligned[column] = align_series(
+            df,
+            column,
+            aligned,
+            target_freq=target_freq,
+            method=option(method, column) or 'linear',
+            max_gap=option(max_gap, column),
+            agg=option(agg, column) or 'mean'
+        )
+    return aligned
+
+
+def fill_panel_gaps(df, value_columns, group='country', max_gap=None):
+    """
+    国×年のパネルで、国ごとの最初と最後の年の間に欠けている年を補い、値を線形補間
+
+    追加した行の他の列（source_mask など）は欠損となる。各列とも、その国で
+    最初と最後に観測された年の間のみ補間する（前後への外挿は行わない）。
+
+    Args:
+        df: group列・year列と値の列を持つDataFrame
+        value_columns: 補間する列
+        group: 国の列名
+        max_gap: 補間を許す最大の欠損年数（Noneで無制限）
+
+    Returns:
+        pd.DataFrame: group・yearでソートした連続した年のパネル
+    """
+    if df.empty:
+        return df.reset_index(drop=True)
+
+    codes, groups = pd.factorize(df[group], sort=True)
+    years = df['year'].to_numpy(dtype=np.int64)
+    starts = np.full(len(groups), np.iinfo(np.int64).max)
+    ends = np.full(len(groups), np.iinfo(np.int64).min)
+    np.minimum.at(starts, codes, years)
+    np.maximum.at(ends, codes, years)
+
+    # 国ごとの連続した年のグリッド
+    lengths = ends - starts + 1
+    grid_codes = np.repeat(np.arange(len(groups)), lengths)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    grid_years = starts[grid_codes] + (np.arange(lengths.sum()) - offsets[grid_codes])
+    grid = pd.DataFrame({group: np.asarray(groups)[grid_codes], 'year': grid_years})
+    panel = grid.merge(
+        df.astype({'year': np.int64}), on=[group, 'year'], how='left', sort=False
+    )
+
+    # 国ごとにずらした通し番号で、国をまたがない補間を一括で行う
+    for column in value_columns:
+        values = panel[column].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        ordinals, targets, group_gap, _ = _offset_groups(
+            grid_codes[valid], grid_codes, grid_years[valid], grid_years
+        )
+        keys, observed = _collapse(ordinals, values[valid], 'mean')
+        gap = group_gap if max_gap is None else min(max_gap, group_gap)
+        panel[column] = _interpolate(keys, observed, targets, 'linear', gap)
+    return panel
+
+
+def panel_pct_change(df, column, group='country'):
+    """
+    国ごとの前年比（%）を一括で計算
+
+    前年の行が同じ国で、年が連続している場合のみ値を持つ。
+    df は group・year でソートされていること。
+    """
+    values = df[column].to_numpy(dtype=float)
+    years = df['year'].to_numpy(dtype=np.int64)
+    codes = pd.factorize(df[group])[0]
+    change = np.full(len(df), np.nan)
+    if len(df) > 1:
+        consecutive = (codes[1:] == codes[:-1]) & (years[1:] == years[:-1] + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = values[1:] / values[:-1] - 1
+        change[1:] = np.where(consecutive, ratio * 100, np.nan)
+    return change
+
+
+def build_calendar(start_year, end_year, target_freq='A'):
+    """開始年から終了年までのターゲットカレンダーを作成"""
+    periods, column = FREQUENCIES[target_freq]
+    years = np.repeat(np.arange(start_year, end_year + 1), periods)
+    calendar = pd.DataFrame({'year': years})
+    if column:
+        calendar[column] = np.tile(np.arange(1, periods + 1), end_year - start_year + 1)
+    return calendar
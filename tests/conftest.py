@@ -0,0 +1,12 @@
+"""
+テスト共通設定
+プロジェクトルートと、データ処理スクリプトのディレクトリをインポートパスに追加する
+（データ処理スクリプトは同じディレクトリのモジュールを直接インポートするため）
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'scripts' / 'data_processing'))
+sys.path.insert(0, str(PROJECT_ROOT))
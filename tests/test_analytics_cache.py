@@ -0,0 +1,160 @@
+"""
+分析結果キャッシュのテスト
+"""
+
+import itertools
+import multiprocessing
+import sqlite3
+import threading
+import time
+import types
+
+import pytest
+
+import backend.models.analytics_cache as analytics_cache_module
+import backend.models.data_loader as data_loader_module
+from backend.models.analytics_cache import AnalyticsCache
+from backend.models.data_loader import DataLoader
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """最終アクセス時刻の順序が決まるよう、呼ぶたびに1秒進む時計にする"""
+    ticks = itertools.count(1_000_000)
+    fake_time = types.SimpleNamespace(time=lambda: float(next(ticks)), monotonic=time.monotonic)
+    monkeypatch.setattr(analytics_cache_module, 'time', fake_time)
+
+
+def _counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value
+    return compute, calls
+
+
+def test_miss_computes_once_and_hit_reuses(tmp_path):
+    cache = AnalyticsCache(tmp_path / 'cache.sqlite3')
+    compute, calls = _counting({'r': [0.1, 0.2]})
+
+    assert cache.get('snap', 'bootstrap', {'n': 10}) is None
+    assert cache.get_or_compute('snap', 'bootstrap', {'n': 10}, compute) == {'r': [0.1, 0.2]}
+    assert cache.get_or_compute('snap', 'bootstrap', {'n': 10}, compute) == {'r': [0.1, 0.2]}
+    assert len(calls) == 1
+    # パラメータの順序や None の有無はキーに影響しない
+    assert cache.get('snap', 'bootstrap', {'start_year': None, 'n': 10}) == {'r': [0.1, 0.2]}
+    assert cache.get('snap', 'bootstrap', {'n': 11}) is None
+    assert cache.get('snap', 'other', {'n': 10}) is None
+
+
+def test_changed_snapshot_is_a_miss(tmp_path):
+    cache = AnalyticsCache(tmp_path / 'cache.sqlite3')
+    cache.set('snap-1', 'bootstrap', {'n': 10}, [1])
+
+    assert cache.get('snap-2', 'bootstrap', {'n': 10}) is None
+    compute, calls = _counting([2])
+    assert cache.get_or_compute('snap-2', 'bootstrap', {'n': 10}, compute) == [2]
+    assert cache.get('snap-1', 'bootstrap', {'n': 10}) == [1]
+    assert len(calls) == 1
+
+
+def test_loader_recomputes_after_the_snapshot_changes(monkeypatch, tmp_path):
+    state = {'snapshot': 'snap-1'}
+    monkeypatch.setattr(data_loader_module, 'read_table', lambda table, *a, **k: None)
+    monkeypatch.setattr(DataLoader, '_compute_snapshot_hash', staticmethod(lambda: state['snapshot']))
+    loader = DataLoader(cache=AnalyticsCache(tmp_path / 'cache.sqlite3'))
+    compute, calls = _counting({'value': 1})
+
+    loader._cached('bootstrap', {'n': 1}, compute)
+    loader._cached('bootstrap', {'n': 1}, compute)
+    assert len(calls) == 1
+
+    state['snapshot'] = 'snap-2'
+    loader.reload()
+    loader._cached('bootstrap', {'n': 1}, compute)
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    # 1件あたり約1KBなので、上限2.5KBでは2件までしか残らない
+    cache = AnalyticsCache(tmp_path / 'cache.sqlite3', max_bytes=2500)
+    for name in ['a', 'b']:
+        cache.set('snap', 'ns', {'k': name}, 'x' * 1000)
+
+    # a を読むと b の方が古くなる（アクセス時刻は次の保存時に書き込まれる）
+    assert cache.get('snap', 'ns', {'k': 'a'}) is not None
+    cache.set('snap', 'ns', {'k': 'c'}, 'x' * 1000)
+
+    assert cache.get('snap', 'ns', {'k': 'a'}) is not None
+    assert cache.get('snap', 'ns', {'k': 'b'}) is None
+    assert cache.get('snap', 'ns', {'k': 'c'}) is not None
+    # 上限を超える値は保存しない
+    cache.set('snap', 'ns', {'k': 'huge'}, 'x' * 5000)
+    assert cache.get('snap', 'ns', {'k': 'huge'}) is None
+
+
+def _write_entries(path, writer, count):
+    cache = AnalyticsCache(path)
+    for i in range(count):
+        cache.set('snap', 'ns', {'writer': writer, 'i': i}, [writer, i])
+        cache.get('snap', 'ns', {'writer': writer, 'i': i // 2})
+    cache.close()
+
+
+def test_concurrent_writers_in_separate_processes(tmp_path):
+    path = tmp_path / 'cache.sqlite3'
+    AnalyticsCache(path).close()
+    context = multiprocessing.get_context('spawn')
+    writers = [context.Process(target=_write_entries, args=(path, writer, 50)) for writer in range(2)]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join(timeout=60)
+    assert [process.exitcode for process in writers] == [0, 0]
+
+    cache = AnalyticsCache(path)
+    for writer, i in itertools.product(range(2), range(50)):
+        assert cache.get('snap', 'ns', {'writer': writer, 'i': i}) == [writer, i]
+
+
+def test_concurrent_writers_sharing_one_connection(tmp_path):
+    cache = AnalyticsCache(tmp_path / 'cache.sqlite3')
+    errors = []
+
+    def write(writer):
+        try:
+            for i in range(100):
+                cache.set('snap', 'ns', {'writer': writer, 'i': i}, i)
+                cache.get('snap', 'ns', {'writer': 1 - writer, 'i': i})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert all(cache.get('snap', 'ns', {'writer': w, 'i': i}) == i for w in range(2) for i in range(100))
+
+
+class _BrokenStore(AnalyticsCache):
+    def set(self, *args, **kwargs):
+        raise sqlite3.OperationalError('disk I/O error')
+
+
+class _BrokenRead(AnalyticsCache):
+    def get(self, *args, **kwargs):
+        raise sqlite3.OperationalError('database is locked')
+
+
+@pytest.mark.parametrize('cache_class', [_BrokenStore, _BrokenRead])
+def test_cache_failure_does_not_recompute(monkeypatch, tmp_path, cache_class):
+    monkeypatch.setattr(data_loader_module, 'read_table', lambda table, *a, **k: None)
+    loader = DataLoader(cache=cache_class(tmp_path / 'cache.sqlite3'))
+    compute, calls = _counting([1.0])
+
+    assert loader._cached('bootstrap', {'n': 1}, compute) == [1.0]
+    assert len(calls) == 1
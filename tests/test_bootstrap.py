@@ -0,0 +1,178 @@
+"""
+相関係数のブートストラップ信頼区間のテスト
+"""
+
+import inspect
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+import backend.models.data_loader as data_loader_module
+from backend.models.analytics_cache import AnalyticsCache
+from backend.models.data_loader import DataLoader
+from scripts.analysis.bootstrap import (
+    BOOTSTRAP_SCHEMES, _batch_sizes, bootstrap_correlation_intervals, bootstrap_indices, default_block_length
+)
+from scripts.analysis.constants import DEFAULT_SEED
+from scripts.analysis.permutation import permutation_test
+
+
+def _domestic(seed=0, years=range(1960, 2024)):
+    rng = np.random.default_rng(seed)
+    years = np.asarray(list(years))
+    df = pd.DataFrame({'country': 'JPN', 'year': years})
+    df['hours_per_year'] = 2200 - 8 * (years - years.min()) + rng.normal(scale=30, size=len(df))
+    df['gdp_growth_rate'] = 0.01 * df['hours_per_year'] + rng.normal(size=len(df))
+    df['reading_minutes_per_day'] = rng.normal(40, 3, size=len(df))
+    df.loc[df['year'] < 1980, 'reading_minutes_per_day'] = np.nan
+    return df
+
+
+@pytest.fixture
+def loader(monkeypatch, tmp_path):
+    df = _domestic()
+    monkeypatch.setattr(
+        data_loader_module, 'read_table',
+        lambda table, *a, **k: df.copy() if table == 'combined_dataset' else None
+    )
+    monkeypatch.setattr(DataLoader, '_compute_snapshot_hash', staticmethod(lambda: 'snapshot'))
+    return DataLoader(cache=AnalyticsCache(tmp_path / 'cache.sqlite3'))
+
+
+def test_loader_intervals_use_the_requested_years_and_are_cached(loader, monkeypatch):
+    calls = []
+    compute = data_loader_module.bootstrap_correlation_intervals
+
+    def counting(pairs, **kwargs):
+        calls.append({name: len(x) for name, (x, _) in pairs.items()})
+        return compute(pairs, **kwargs)
+
+    monkeypatch.setattr(data_loader_module, 'bootstrap_correlation_intervals', counting)
+    query = {'start_year': 1990, 'end_year': 2009, 'n_resamples': 200}
+    first = loader.get_bootstrap_intervals(**query)
+    second = loader.get_bootstrap_intervals(**query)
+
+    assert first == second
+    assert calls == [{'gdp_growth_rate': 20, 'reading_minutes_per_day': 20}]
+    result = first['gdp_growth_rate']
+    assert (result['n_samples'], result['n_resamples'], result['confidence']) == (20, 200, 0.95)
+    for method in ['pearson', 'spearman']:
+        for scheme in ['iid', 'block']:
+            interval = result[method][scheme]
+            assert -1 <= interval['lower'] <= interval['upper'] <= 1
+
+    # 条件が変わればキャッシュを使わない
+    loader.get_bootstrap_intervals(indicator='reading_minutes_per_day', n_resamples=200)
+    assert calls[-1] == {'reading_minutes_per_day': 44}
+
+
+def test_loader_cli_and_permutations_share_one_seed(loader):
+    result = loader.get_bootstrap_intervals(n_resamples=100)
+    assert {entry['seed'] for entry in result.values()} == {DEFAULT_SEED}
+    for function in (bootstrap_correlation_intervals, permutation_test):
+        assert inspect.signature(function).parameters['seed'].default == DEFAULT_SEED
+
+    # API の結果は同じシードで直接計算した結果と一致する
+    df = _domestic()
+    observed = df[['hours_per_year', 'gdp_growth_rate']].dropna()
+    expected = bootstrap_correlation_intervals(
+        {'gdp_growth_rate': (observed['hours_per_year'].to_numpy(), observed['gdp_growth_rate'].to_numpy())},
+        n_resamples=100,
+    )['gdp_growth_rate']
+    for scheme in BOOTSTRAP_SCHEMES:
+        assert result['gdp_growth_rate']['pearson'][scheme] == pytest.approx(expected['pearson'][scheme])
+
+
+@pytest.mark.parametrize('query,message', [
+    ({'indicator': 'nope'}, 'Unknown indicator'),
+    ({'n_resamples': 0}, 'n_resamples'),
+    ({'n_resamples': 10 ** 6}, 'n_resamples'),
+    ({'confidence': 1.0}, 'confidence'),
+])
+def test_invalid_loader_arguments_are_rejected(loader, query, message):
+    with pytest.raises(ValueError, match=message):
+        loader.get_bootstrap_intervals(**query)
+
+
+@pytest.mark.parametrize('query', [{'n_resamples': '0'}, {'confidence': '1.5'}, {'indicator': 'nope'}])
+def test_invalid_query_returns_400(query):
+    from backend.app import app
+
+    response = app.test_client().get('/api/correlation/bootstrap', query_string=query)
+    assert response.status_code == 400
+
+
+def _pairs(seed=0, n=40):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    return {
+        'linear': (x, x + rng.normal(size=n)),
+        # 同順位を多く含む系列
+        'ties': (np.round(x), np.round(x + rng.normal(size=n))),
+    }
+
+
+def _reference_intervals(pairs, n_resamples, confidence, seed, batch_size, block_length=None):
+    """同じ乱数列から行番号を作り、リサンプルごとに scipy で相関を求める"""
+    sizes = _batch_sizes(n_resamples, batch_size)
+    children = np.random.SeedSequence(seed).spawn(len(pairs) * len(BOOTSTRAP_SCHEMES))
+    alpha = (1 - confidence) / 2
+    results = {}
+    for i, (name, (x, y)) in enumerate(pairs.items()):
+        length = block_length or default_block_length(len(x))
+        for k, scheme in enumerate(BOOTSTRAP_SCHEMES):
+            values = {'pearson': [], 'spearman': []}
+            for size, batch_seed in zip(sizes, children[i * len(BOOTSTRAP_SCHEMES) + k].spawn(len(sizes))):
+                rng = np.random.default_rng(batch_seed)
+                indices = bootstrap_indices(len(x), size, rng, length if scheme == 'block' else None)
+                for rows in indices:
+                    if np.ptp(x[rows]) == 0 or np.ptp(y[rows]) == 0:
+                        continue
+                    values['pearson'].append(stats.pearsonr(x[rows], y[rows]).statistic)
+                    values['spearman'].append(stats.spearmanr(x[rows], y[rows]).statistic)
+            for method, samples in values.items():
+                lower, upper = np.quantile(samples, [alpha, 1 - alpha])
+                results.setdefault(name, {}).setdefault(method, {})[scheme] = (
+                    lower, upper, np.std(samples, ddof=1)
+                )
+    return results
+
+
+def test_intervals_match_a_per_resample_reference():
+    pairs = _pairs()
+    result = bootstrap_correlation_intervals(pairs, n_resamples=300, confidence=0.9, seed=7, batch_size=64)
+    expected = _reference_intervals(pairs, 300, 0.9, seed=7, batch_size=64)
+
+    for name, methods in expected.items():
+        for method, schemes in methods.items():
+            for scheme, (lower, upper, standard_error) in schemes.items():
+                interval = result[name][method][scheme]
+                assert interval['lower'] == pytest.approx(lower, abs=1e-12)
+                assert interval['upper'] == pytest.approx(upper, abs=1e-12)
+                assert interval['standard_error'] == pytest.approx(standard_error, abs=1e-12)
+
+
+def test_results_do_not_depend_on_process_count():
+    pairs = _pairs(1)
+    sequential = bootstrap_correlation_intervals(pairs, n_resamples=500, seed=3, batch_size=100, jobs=1)
+    parallel = bootstrap_correlation_intervals(pairs, n_resamples=500, seed=3, batch_size=100, jobs=2)
+    assert parallel == sequential
+
+
+def test_moving_block_indices_are_contiguous_runs():
+    rng = np.random.default_rng(0)
+    indices = bootstrap_indices(23, 50, rng, block_length=5)
+
+    assert indices.shape == (50, 23)
+    assert indices.min() >= 0 and indices.max() < 23
+    # 各ブロック（5行ずつ、最後は切り詰め）の中では行番号が1ずつ増える
+    for start in range(0, 23, 5):
+        block = indices[:, start:start + 5]
+        assert (np.diff(block, axis=1) == 1).all()
+
+
+def test_short_series_have_no_interval():
+    result = bootstrap_correlation_intervals({'short': ([1.0, 2.0], [2.0, 1.0])}, n_resamples=10)
+    assert result == {'short': {'block_length': 1}}
@@ -0,0 +1,106 @@
+"""
+構造変化点検出のテスト
+PELTは全ての区切りを調べる動的計画法と、Chow検定の走査は分割ごとの最小二乗法と比較する。
+"""
+
+import numpy as np
+import pytest
+
+from scripts.analysis.change_points import SegmentMoments, chow_scan, detect_change_points, pelt
+
+
+def _optimal_partitioning(moments, penalty, min_size):
+    """枝刈りなしの動的計画法（O(n²)）による最小の目的関数値"""
+    n = len(moments.years)
+    best = np.full(n + 1, np.inf)
+    best[0] = -penalty
+    for end in range(min_size, n + 1):
+        for start in [0] + list(range(min_size, end - min_size + 1)):
+            best[end] = min(best[end], best[start] + moments.cost(start, end) + penalty)
+    return best[n]
+
+
+def _objective(moments, ends, penalty):
+    starts = [0] + ends[:-1]
+    return sum(moments.cost(start, end) for start, end in zip(starts, ends)) + penalty * (len(ends) - 1)
+
+
+@pytest.mark.parametrize('seed', range(400))
+def test_pelt_matches_exhaustive_search(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(8, 50))
+    min_size = 5 if seed % 2 else int(rng.integers(1, 8))
+    years = 1950.0 + np.arange(n)
+    values = np.cumsum(rng.normal(size=n)) * rng.random() + rng.normal(size=n)
+    moments = SegmentMoments(years, values)
+    penalty = float(rng.random() * 2)
+
+    ends = pelt(moments, penalty, min_size=min_size)
+
+    assert ends[-1] == n
+    lengths = np.diff([0] + ends)
+    assert (lengths >= min_size).all()
+    assert _objective(moments, ends, penalty) == pytest.approx(
+        _optimal_partitioning(moments, penalty, min_size), abs=1e-9
+    )
+
+
+def test_detects_a_slope_change():
+    years = np.arange(1950, 2010)
+    values = np.where(years < 1980, 2.0 * (years - 1950), 60.0 - 1.5 * (years - 1980))
+    values = values + np.random.default_rng(0).normal(scale=0.5, size=len(years))
+
+    # ペナルティは標準化した値の単位（既知のノイズ分散 × BIC相当）
+    penalty = 3 * (0.5 / values.std()) ** 2 * np.log(len(years))
+    result = detect_change_points(years, values, penalty=penalty)
+    # 連続した折れ線なので、折れ曲がりの年の前後どちらを区間の初年にしてもよい
+    assert len(result['break_years']) == 1
+    assert abs(result['break_years'][0] - 1980) <= 1
+    assert [segment['slope'] for segment in result['segments']] == [
+        pytest.approx(2.0, abs=0.1), pytest.approx(-1.5, abs=0.1)
+    ]
+
+
+def _ssr(years, values):
+    """切片と傾きの最小二乗法による残差平方和"""
+    design = np.column_stack([np.ones_like(years), years - years.mean()])
+    coef = np.linalg.lstsq(design, values, rcond=None)[0]
+    return float(np.sum((values - design @ coef) ** 2))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_chow_statistics_match_split_regressions(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(12, 60))
+    years = 1960.0 + np.arange(n)
+    values = 1000 + np.cumsum(rng.normal(size=n)) * 10 + rng.normal(size=n)
+
+    result = chow_scan(years, values)
+
+    restricted = _ssr(years, values)
+    for year, f_stat in zip(result['years'], result['f_statistics']):
+        before = years < year
+        unrestricted = _ssr(years[before], values[before]) + _ssr(years[~before], values[~before])
+        expected = ((restricted - unrestricted) / 2) / (unrestricted / (n - 4))
+        assert f_stat == pytest.approx(expected, rel=1e-8)
+    # 両端の15%を除いた全ての候補年を調べる
+    assert result['years'][0] == years[int(np.ceil(0.15 * n))]
+    assert result['years'][-1] == years[int(np.floor(0.85 * n))]
+    assert result['sup_f'] == max(result['f_statistics'])
+
+
+def test_chow_scan_finds_a_known_step():
+    years = np.arange(1960, 2020)
+    values = np.where(years < 1990, 10.0, 14.0) + np.random.default_rng(0).normal(scale=0.5, size=len(years))
+
+    result = chow_scan(years, values)
+    assert result['break_year'] == 1990
+    assert result['significant_at'] == '1%'
+
+    # 構造変化のない直線ではどの水準でも有意にならない
+    flat = 0.1 * years + np.random.default_rng(1).normal(scale=0.5, size=len(years))
+    assert chow_scan(years, flat)['significant_at'] is None
+
+
+def test_chow_scan_needs_enough_years():
+    assert chow_scan(np.arange(4.0), np.arange(4.0)) is None
@@ -0,0 +1,25 @@
+"""
+DataLoader の再読み込みのテスト
+"""
+
+import pandas as pd
+
+import backend.models.data_loader as data_loader_module
+from backend.models.analytics_cache import AnalyticsCache
+from backend.models.data_loader import DataLoader
+
+
+def test_reload_drops_labor_hours_tables_that_no_longer_exist(monkeypatch, tmp_path):
+    combined = pd.DataFrame({'year': [2020, 2021], 'hours_per_year': [1600.0, 1610.0]})
+    quarterly = pd.DataFrame({'year': [2021], 'quarter': [1], 'hours_per_year': [1590.0]})
+    tables = {'combined_dataset': combined, 'labor_hours_quarterly_processed': quarterly}
+
+    monkeypatch.setattr(data_loader_module, 'read_table', lambda table, *a, **k: tables.get(table))
+    loader = DataLoader(cache=AnalyticsCache(tmp_path / 'cache.sqlite3'))
+    assert loader.get_labor_hours('Q') is not None
+
+    # 四半期のテーブルが削除された後に再読み込みすると、古いテーブルを返さない
+    del tables['labor_hours_quarterly_processed']
+    loader.reload()
+    assert 'Q' not in loader.labor_hours_tables
+    assert loader.get_labor_hours('Q') is None
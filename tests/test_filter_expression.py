@@ -0,0 +1,126 @@
+"""
+フィルタ式（where=）のパーサとマスク生成のテスト
+"""
+
+import numpy as np
+import pytest
+
+from backend.models.filter_expression import FilterExpressionError, compile_filter
+
+NAN = np.nan
+COLUMNS = {
+    'a': np.array([1.0, 2.0, 3.0, 4.0, NAN]),
+    'b': np.array([10.0, NAN, 30.0, 40.0, 50.0]),
+}
+
+
+def mask(expression):
+    return compile_filter(expression)(COLUMNS).tolist()
+
+
+def test_comparison_operators():
+    assert mask('a > 2') == [False, False, True, True, False]
+    assert mask('a >= 2') == [False, True, True, True, False]
+    assert mask('a = 3') == mask('a == 3') == [False, False, True, False, False]
+    assert mask('a != 3') == mask('a <> 3') == [True, True, False, True, False]
+    assert mask('2 < a') == mask('a > 2')
+    assert mask('a > 0') == [True, True, True, True, False]
+
+
+def test_and_binds_tighter_than_or():
+    # a = 1 OR (a = 4 AND b = 40)
+    assert mask('a = 1 OR a = 4 AND b = 40') == [True, False, False, True, False]
+    assert mask('a = 1 OR a = 4 AND b = 10') == [True, False, False, False, False]
+
+
+def test_parentheses_override_precedence():
+    assert mask('(a = 1 OR a = 4) AND b = 40') == [False, False, False, True, False]
+    assert mask('((a > 1)) AND (b > 20)') == [False, False, True, True, False]
+
+
+def test_not_precedence():
+    # NOT は AND より強く結合する
+    assert mask('NOT a = 1 AND a < 4') == [False, True, True, False, False]
+    assert mask('NOT (a = 1 OR a = 2)') == [False, False, True, True, False]
+
+
+def test_keywords_are_case_insensitive():
+    assert mask('a > 1 and b > 20') == mask('a > 1 AND b > 20')
+
+
+def test_in_and_not_in():
+    assert mask('a IN (1, 3)') == [True, False, True, False, False]
+    assert mask('a IN (2)') == [False, True, False, False, False]
+    assert mask('a NOT IN (1, 3)') == [False, True, False, True, False]
+
+
+def test_between_is_inclusive():
+    assert mask('a BETWEEN 2 AND 3') == [False, True, True, False, False]
+    assert mask('a NOT BETWEEN 2 AND 3') == [True, False, False, True, False]
+    # BETWEEN の AND と論理演算の AND が混在しても解釈できる
+    assert mask('a BETWEEN 1 AND 3 AND b > 20') == [False, False, True, False, False]
+    assert mask('a BETWEEN 1 AND b') == [True, False, True, True, False]
+
+
+def test_comparisons_with_nan_are_never_true():
+    assert mask('b > 0') == [True, False, True, True, True]
+    assert mask('b < 0') == [False, False, False, False, False]
+    # NULLとの比較は NOT を付けても真にならない（SQLの三値論理）
+    assert mask('NOT b < 0') == [True, False, True, True, True]
+    assert mask('NOT a IN (1)') == [False, True, True, True, False]
+    assert mask('a NOT BETWEEN 10 AND 20') == [True, True, True, True, False]
+
+
+def test_three_valued_and_or():
+    # 不明 OR 真 は真、不明 AND 偽 は偽、不明 AND 真 は不明（NOT しても真にならない）
+    assert mask('b > 20 OR a = 2') == [False, True, True, True, True]
+    assert mask('NOT (b > 20 AND a = 1)') == [True, True, True, True, False]
+    assert mask('NOT (b > 20 AND a = 2)') == [True, False, True, True, False]
+
+
+def test_is_null():
+    assert mask('b IS NULL') == [False, True, False, False, False]
+    assert mask('a IS NOT NULL AND b IS NOT NULL') == [True, False, True, True, False]
+    assert mask('NOT a IS NULL') == [True, True, True, True, False]
+
+
+def test_unknown_column_is_rejected():
+    with pytest.raises(FilterExpressionError, match='Unknown column'):
+        compile_filter('c > 1')(COLUMNS)
+
+
+@pytest.mark.parametrize('expression', [
+    '',
+    'a >',
+    'a > > 1',
+    '(a > 1',
+    'a > 1)',
+    'a > 1 AND',
+    '1 > 2',
+    'a IS 1',
+    '1 IS NULL',
+    'a IN ()',
+    'a IN (1, b)',
+    '1 IN (1)',
+    'a BETWEEN 1',
+    'a NOT > 1',
+    'a > 1; DROP TABLE',
+    "a > '1'",
+    '__import__("os")',
+])
+def test_syntax_errors(expression):
+    with pytest.raises(FilterExpressionError):
+        compile_filter(expression)
+
+
+def test_invalid_expression_returns_400():
+    from backend.app import app
+
+    client = app.test_client()
+    response = client.get('/api/data', query_string={'where': 'hours_per_year >'})
+    assert response.status_code == 400
+    assert 'Invalid filter expression' in response.get_json()['error']
+
+    response = client.get('/api/data', query_string={'where': 'no_such_column > 1'})
+    assert response.status_code == 400
+    assert 'no_such_column' in response.get_json()['error']
@@ -0,0 +1,119 @@
+"""
+グレンジャー因果性検定のテスト（回帰ごとに np.linalg.lstsq で当てはめた結果と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from scripts.analysis.granger import DIRECTIONS, granger_causality, granger_causality_frame
+
+
+def _frame(seed, years=range(1960, 2024), missing=0.05):
+    """労働時間が指標に先行する系列（欠損年を含み、行は年順でない）"""
+    rng = np.random.default_rng(seed)
+    years = np.asarray(list(years))
+    hours = 2200 - 6 * (years - years.min()) + np.cumsum(rng.normal(scale=20, size=len(years)))
+    growth = np.empty(len(years))
+    growth[0] = 3.0
+    for t in range(1, len(years)):
+        growth[t] = 0.4 * growth[t - 1] + 0.02 * (hours[t - 1] - 2000) + rng.normal()
+    df = pd.DataFrame({
+        'year': years,
+        'hours_per_year': hours,
+        'gdp_growth_rate': growth,
+        'reading_minutes_per_day': 40 + rng.normal(scale=3, size=len(years)),
+    })
+    for column in df.columns[1:]:
+        df.loc[rng.random(len(df)) < missing, column] = np.nan
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def _lagged(series, lag):
+    return series.shift(lag).to_numpy(dtype=float)
+
+
+def _reference(df, base_column, indicator, max_lag):
+    """指標ごとに共通の標本を作り、制約付き・制約なしの回帰を1本ずつ解く"""
+    grid = df.set_index('year').sort_index().reindex(range(df['year'].min(), df['year'].max() + 1))
+    series = {'indicator': grid[indicator], 'hours': grid[base_column]}
+    lags = {
+        name: np.column_stack([_lagged(values, k) for k in range(1, max_lag + 1)])
+        for name, values in series.items()
+    }
+    rows = (
+        series['indicator'].notna().to_numpy() & series['hours'].notna().to_numpy()
+        & ~np.isnan(lags['indicator']).any(axis=1) & ~np.isnan(lags['hours']).any(axis=1)
+    )
+    T = int(rows.sum())
+    if T - (2 + 2 * max_lag) < 1:
+        return T, None, None, None
+    trend = np.arange(len(grid), dtype=float)[rows]
+
+    results = {}
+    for direction, (target, other) in zip(DIRECTIONS, [('indicator', 'hours'), ('hours', 'indicator')]):
+        y = series[target].to_numpy(dtype=float)[rows]
+        f_stats, p_values, residuals = [], [], []
+        for k in range(1, max_lag + 1):
+            restricted = np.column_stack([np.ones(T), trend, lags[target][rows, :k]])
+            unrestricted = np.column_stack([restricted, lags[other][rows, :k]])
+            rss = {}
+            for name, X in [('restricted', restricted), ('unrestricted', unrestricted)]:
+                coef = np.linalg.lstsq(X, y, rcond=None)[0]
+                rss[name] = np.sum((y - X @ coef) ** 2)
+                if name == 'unrestricted':
+                    residuals.append(y - X @ coef)
+            df_resid = T - unrestricted.shape[1]
+            f_stat = ((rss['restricted'] - rss['unrestricted']) / k) / (rss['unrestricted'] / df_resid)
+            f_stats.append(f_stat)
+            p_values.append(stats.f.sf(f_stat, k, df_resid))
+        results[direction] = {'f_statistics': f_stats, 'p_values': p_values, 'residuals': residuals}
+
+    # 2本の式の残差共分散による情報量規準
+    aic, bic = [], []
+    for k in range(1, max_lag + 1):
+        e = np.stack([results[direction]['residuals'][k - 1] for direction in DIRECTIONS])
+        logdet = np.log(np.linalg.det(e @ e.T / T))
+        n_params = 2 * (2 + 2 * k)
+        aic.append(logdet + 2 * n_params / T)
+        bic.append(logdet + np.log(T) * n_params / T)
+    return T, results, aic, bic
+
+
+@pytest.mark.parametrize('max_lag', [1, 3, 4])
+@pytest.mark.parametrize('seed', range(4))
+def test_matches_per_regression_lstsq(seed, max_lag):
+    df = _frame(seed)
+    indicators = ['gdp_growth_rate', 'reading_minutes_per_day']
+    result = granger_causality_frame(df, indicators=indicators, max_lag=max_lag)
+
+    for indicator in indicators:
+        T, expected, aic, bic = _reference(df, 'hours_per_year', indicator, max_lag)
+        entry = result[indicator]
+        if expected is None:
+            assert entry is None
+            continue
+        assert entry['n_samples'] == T
+        for direction in DIRECTIONS:
+            assert entry[direction]['lags'] == list(range(1, max_lag + 1))
+            np.testing.assert_allclose(entry[direction]['f_statistics'],
+                                       expected[direction]['f_statistics'], rtol=1e-7, atol=1e-10)
+            np.testing.assert_allclose(entry[direction]['p_values'],
+                                       expected[direction]['p_values'], rtol=1e-6, atol=1e-12)
+        np.testing.assert_allclose(entry['aic'], aic, rtol=1e-9)
+        np.testing.assert_allclose(entry['bic'], bic, rtol=1e-9)
+        assert entry['selected']['aic']['lag'] == int(np.argmin(aic)) + 1
+        assert entry['selected']['bic']['lag'] == int(np.argmin(bic)) + 1
+
+
+def test_detects_the_leading_series():
+    df = _frame(0, missing=0.0)
+    result = granger_causality_frame(df, indicators=['gdp_growth_rate'], max_lag=2)['gdp_growth_rate']
+    assert result['hours_to_indicator']['p_values'][0] < 0.01
+
+
+def test_short_samples_have_no_result():
+    grid = pd.DataFrame({'hours_per_year': np.arange(6.0), 'x': np.arange(6.0) ** 2}, index=range(2000, 2006))
+    assert granger_causality(grid, 'hours_per_year', ['x'], max_lag=2) == {'x': None}
+    assert granger_causality_frame(pd.DataFrame({'year': [2000]}), 'hours_per_year') is None
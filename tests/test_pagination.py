@@ -0,0 +1,172 @@
+"""
+/api/data のカーソルページネーションのテスト
+"""
+
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backend.models.data_loader as data_loader_module
+from backend.models.analytics_cache import AnalyticsCache
+from backend.models.data_loader import DataLoader, InvalidCursorError, StaleCursorError
+
+
+def _panel(countries=('DEU', 'FRA', 'JPN', 'USA'), years=range(1950, 2024)):
+    rng = np.random.default_rng(0)
+    rows = [
+        {'country': country, 'year': year, 'hours_per_year': 1500 + rng.normal() * 100,
+         'gdp_growth_rate': rng.normal() * 3}
+        for country in countries for year in years
+    ]
+    # 読み込み時に国・年順へ並べ直されることを確かめるため逆順にする
+    return pd.DataFrame(rows[::-1])
+
+
+@pytest.fixture
+def make_loader(monkeypatch, tmp_path):
+    state = {'panel': _panel(), 'snapshot': 'snapshot-1'}
+
+    def fake_read_table(table, *args, **kwargs):
+        return state['panel'].copy() if table == 'combined_dataset' else None
+
+    monkeypatch.setattr(data_loader_module, 'read_table', fake_read_table)
+    monkeypatch.setattr(DataLoader, '_compute_snapshot_hash', staticmethod(lambda: state['snapshot']))
+
+    def make():
+        loader = DataLoader(cache=AnalyticsCache(tmp_path / 'cache.sqlite3'))
+        return loader, state
+    return make
+
+
+def _collect(loader, limit, **query):
+    pages, cursor = [], None
+    while True:
+        page = loader.get_data_page(limit, cursor=cursor, **query)
+        pages.append(page)
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('query', [
+    {},
+    {'start_year': 2000},
+    {'end_year': 1960},
+    {'start_year': 1990, 'end_year': 1995},
+    {'start_year': 1990, 'end_year': 2010, 'where': 'gdp_growth_rate > 0'},
+    {'start_year': 2030},
+])
+@pytest.mark.parametrize('limit', [1, 7, 50, 1000])
+def test_pages_cover_the_unpaginated_result(make_loader, query, limit):
+    loader, _ = make_loader()
+    expected = loader.get_data(**query)
+    pages = _collect(loader, limit, **query)
+
+    records = [record for page in pages for record in page['data']]
+    assert records == expected
+    assert all(page['count'] <= limit for page in pages)
+    assert all(page['count'] == limit for page in pages[:-1] if page['next_cursor'])
+
+
+def test_year_bounded_pages_seek_within_each_country(make_loader, monkeypatch):
+    loader, _ = make_loader()
+    # フィルタ式に渡される行数を数える
+    scanned = []
+    compile_filter = data_loader_module.compile_filter
+
+    def counting_compile(expression):
+        compiled = compile_filter(expression)
+
+        def evaluate(columns, length):
+            scanned.append(length)
+            return compiled(columns, length)
+        return evaluate
+
+    monkeypatch.setattr(data_loader_module, 'compile_filter', counting_compile)
+    pages = _collect(loader, 2, start_year=1990, end_year=1992, where='year > 0')
+
+    assert [page['count'] for page in pages] == [2] * 6
+    # 各国の 1990-1992 年の区間だけを読む（範囲外の行は走査しない）
+    assert max(scanned) <= 3
+    assert sum(scanned) <= 2 * 12
+    assert [(r['country'], r['year']) for r in pages[0]['data']] == [('DEU', 1990), ('DEU', 1991)]
+
+
+def test_cursor_round_trip(make_loader):
+    loader, _ = make_loader()
+    query = {'start_year': 2000, 'indicators': ['hours_per_year']}
+    first = loader.get_data_page(3, **query)
+    second = loader.get_data_page(3, cursor=first['next_cursor'], **query)
+
+    assert [r['year'] for r in first['data']] == [2000, 2001, 2002]
+    assert [r['year'] for r in second['data']] == [2003, 2004, 2005]
+    # 同じ位置からは何度でも同じページが得られる
+    assert loader.get_data_page(3, cursor=first['next_cursor'], **query) == second
+
+
+def _tamper(cursor, **changes):
+    payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    payload.update(changes)
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '!!!', base64.urlsafe_b64encode(b'[1, 2]').decode()])
+def test_malformed_cursor_is_rejected(make_loader, cursor):
+    loader, _ = make_loader()
+    with pytest.raises(InvalidCursorError, match='Malformed'):
+        loader.get_data_page(5, cursor=cursor)
+
+
+def test_tampered_cursor_is_rejected(make_loader):
+    loader, _ = make_loader()
+    cursor = loader.get_data_page(5)['next_cursor']
+
+    with pytest.raises(InvalidCursorError, match='out of range'):
+        loader.get_data_page(5, cursor=_tamper(cursor, p=10 ** 6))
+    with pytest.raises(InvalidCursorError, match='out of range'):
+        loader.get_data_page(5, cursor=_tamper(cursor, p=-1))
+    # 位置を書き換えると、その位置の行のキーと一致しない
+    with pytest.raises(StaleCursorError):
+        loader.get_data_page(5, cursor=_tamper(cursor, p=100))
+    # 別の条件のカーソルは使えない
+    with pytest.raises(InvalidCursorError, match='query parameters'):
+        loader.get_data_page(5, cursor=cursor, start_year=2000)
+
+
+def test_cursor_expires_after_reload(make_loader):
+    loader, state = make_loader()
+    cursor = loader.get_data_page(5)['next_cursor']
+
+    state['snapshot'] = 'snapshot-2'
+    loader.reload()
+    with pytest.raises(StaleCursorError, match='reloaded'):
+        loader.get_data_page(5, cursor=cursor)
+
+
+def test_cursor_expires_when_rows_change_under_same_snapshot(make_loader):
+    loader, state = make_loader()
+    cursor = loader.get_data_page(5)['next_cursor']
+
+    state['panel'] = _panel(countries=('AUS', 'DEU', 'FRA', 'JPN', 'USA'))
+    loader.reload()
+    with pytest.raises(StaleCursorError):
+        loader.get_data_page(5, cursor=cursor)
+
+
+@pytest.mark.parametrize('limit', ['0', '-3', 'abc', '1.5', ''])
+def test_invalid_limit_returns_400(limit):
+    from backend.app import app
+
+    response = app.test_client().get('/api/data', query_string={'limit': limit})
+    assert response.status_code == 400
+    assert 'limit' in response.get_json()['error']
+
+
+def test_non_positive_limit_is_rejected_by_loader(make_loader):
+    loader, _ = make_loader()
+    with pytest.raises(ValueError):
+        loader.get_data_page(0)
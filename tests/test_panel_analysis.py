@@ -0,0 +1,70 @@
+"""
+国別分析（パネル）のテスト
+"""
+
+import json
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.analysis.panel_analysis import analyze_pooled, run_panel_analysis
+
+INDICATORS = ['hours_per_year', 'gdp_growth_rate', 'gdp_per_capita_usd', 'reading_minutes_per_day']
+
+
+def _panel(n_countries, years=range(1948, 2024), seed=0):
+    rng = np.random.default_rng(seed)
+    years = np.asarray(list(years))
+    df = pd.DataFrame({
+        'country': np.repeat([f'C{i:02d}' for i in range(n_countries)], len(years)),
+        'year': np.tile(years, n_countries),
+    })
+    trend = (df['year'] - years.min()).to_numpy(dtype=float)
+    df['hours_per_year'] = 2200 - 8 * trend + rng.normal(scale=20, size=len(df))
+    df['gdp_growth_rate'] = 6 - 0.08 * trend + rng.normal(size=len(df))
+    df['gdp_per_capita_usd'] = 5000 + 400 * trend + rng.normal(scale=500, size=len(df))
+    df['reading_minutes_per_day'] = 40 - 0.2 * trend + rng.normal(scale=3, size=len(df))
+    df.loc[rng.random(len(df)) < 0.3, 'reading_minutes_per_day'] = np.nan
+    return df
+
+
+def test_pooled_step_on_a_large_panel_is_bounded():
+    panel = _panel(45)
+    tracemalloc.start()
+    pooled = analyze_pooled(panel)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # 全ての国×年をひとつの標本として相関を求める
+    spearman = pooled['correlation_matrix']['spearman']
+    assert spearman['columns'] == INDICATORS
+    assert spearman['n_samples'][0][0] == len(panel)
+    assert spearman['n_samples'][0][3] == int(panel['reading_minutes_per_day'].notna().sum())
+    expected = panel[INDICATORS].corr(method='spearman').to_numpy()
+    np.testing.assert_allclose(np.array(spearman['correlation'], dtype=float), expected, atol=1e-12)
+    # トレンドは年ごとの国平均に当てはめる（全体の傾きは -8 時間/年）
+    overall = pooled['cross_country_mean_trends']['hours_per_year']['overall']
+    assert (overall['period_start'], overall['period_end']) == ('1948', '2023')
+    assert overall['slope'] == pytest.approx(-8, abs=0.5)
+    # 行数の2乗に比例する一時配列を作らない（以前は45か国×76年で数百MB）
+    # 実行時間は環境に左右されるため、確定的なメモリの上限だけを確かめる
+    assert peak < 64 * 2 ** 20
+
+
+def test_run_panel_analysis_writes_country_and_pooled_shards(tmp_path):
+    panel = pd.concat([_panel(3), _panel(1, years=range(2020, 2022)).assign(country='TINY')])
+    index, metrics = run_panel_analysis(panel, n_permutations=0, output_dir=tmp_path)
+
+    assert sorted(index['countries']) == ['C00', 'C01', 'C02']
+    assert index['skipped_countries'] == ['TINY']
+    assert index['pooled'] == {'file': '_pooled.json', 'n_countries': 4, 'n_rows': len(panel)}
+    assert len(metrics) == 3
+
+    shard = json.loads((tmp_path / 'C01.json').read_text(encoding='utf-8'))
+    assert shard['country'] == 'C01'
+    assert shard['correlation']['gdp_growth_rate']['n_samples'] == 76
+
+    pooled = json.loads((tmp_path / '_pooled.json').read_text(encoding='utf-8'))
+    assert pooled['correlation_matrix']['pearson']['n_samples'][0][0] == len(panel)
@@ -0,0 +1,93 @@
+"""
+国×年パネルの一括処理のテスト（国ごとに1か国ずつ処理した結果と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from process_economic_indicators import combine_economic_indicators, normalize_economic_data
+from process_labor_hours import normalize_labor_hours
+from temporal_alignment import panel_pct_change
+
+COUNTRIES = ['DEU', 'FRA', 'JPN', 'USA']
+
+
+def _source(rng, value_columns, years=range(1960, 2000), missing=0.3, countries=COUNTRIES):
+    rows = []
+    for country in countries:
+        start = int(rng.integers(0, 8))
+        for year in list(years)[start:]:
+            if rng.random() < missing:
+                continue
+            rows.append({'country': country, 'year': year,
+                         **{column: float(rng.normal(*scale)) for column, scale in value_columns.items()}})
+    return pd.DataFrame(rows)
+
+
+def _per_country(sources, country):
+    subset = {}
+    for key, df in sources.items():
+        part = df[df['country'] == country].reset_index(drop=True)
+        part.attrs = dict(df.attrs)
+        subset[key] = part
+    return subset
+
+
+def _concat_per_country(process, sources):
+    frames = [process(_per_country(sources, country)) for country in COUNTRIES]
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_labor_hours_panel_matches_per_country_processing(seed):
+    rng = np.random.default_rng(seed)
+    sources = {
+        'mhlw': _source(rng, {'average_hours_per_year': (2000, 100)}),
+        'oecd': _source(rng, {'average_hours_worked': (1800, 100)}),
+    }
+    sources['mhlw'].attrs['real'] = True
+
+    panel = normalize_labor_hours(sources)
+    expected = _concat_per_country(normalize_labor_hours, sources)
+
+    pd.testing.assert_frame_equal(
+        panel.reset_index(drop=True), expected,
+        check_exact=False, rtol=1e-12, check_dtype=False, check_categorical=False, check_column_type=False,
+    )
+    # 国をまたいで補間しない（各国の最初と最後の観測年の間のみ）
+    spans = panel.groupby('country', observed=True)['year'].agg(['min', 'max', 'count'])
+    assert (spans['max'] - spans['min'] + 1 == spans['count']).all()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_economic_panel_matches_per_country_processing(seed):
+    rng = np.random.default_rng(seed)
+    sources = {
+        'cabinet_gdp': _source(rng, {'gdp_growth_rate': (3, 2), 'real_gdp_billion_yen': (400_000, 50_000)}),
+        'oecd_gdp': _source(rng, {'gdp_growth_rate': (3, 2), 'gdp_per_capita_usd': (20_000, 5_000)}),
+    }
+    labor = _source(rng, {'hours_per_year': (1800, 100)}, missing=0.0)
+
+    def process(data):
+        countries = data['oecd_gdp']['country'].unique()
+        hours = labor[labor['country'].isin(countries)].reset_index(drop=True)
+        return combine_economic_indicators(normalize_economic_data(data), hours)
+
+    panel = process(sources)
+    expected = _concat_per_country(process, sources)
+    pd.testing.assert_frame_equal(
+        panel.reset_index(drop=True), expected,
+        check_exact=False, rtol=1e-12, check_dtype=False, check_categorical=False, check_column_type=False,
+    )
+
+
+def test_pct_change_matches_groupby_on_consecutive_years():
+    rng = np.random.default_rng(0)
+    df = _source(rng, {'value': (100, 10)}).sort_values(['country', 'year']).reset_index(drop=True)
+
+    grouped = df.groupby('country')
+    expected = grouped['value'].pct_change() * 100
+    # 前年が欠けている場合は前年比を求めない
+    expected[grouped['year'].diff() != 1] = np.nan
+    np.testing.assert_allclose(panel_pct_change(df, 'value'), expected.to_numpy(), rtol=1e-12)
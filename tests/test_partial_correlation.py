@@ -0,0 +1,116 @@
+"""
+偏相関のテスト（共通の観測年での残差回帰と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+import backend.models.data_loader as data_loader_module
+from backend.models.analytics_cache import AnalyticsCache
+from backend.models.data_loader import DataLoader
+from scripts.analysis.correlation_analysis import add_partial_correlations
+from scripts.analysis.partial_correlation import partial_correlations
+
+INDICATORS = ['gdp_growth_rate', 'gdp_per_capita_usd', 'reading_minutes_per_day']
+
+
+def _frame(seed=0, years=range(1948, 2024)):
+    rng = np.random.default_rng(seed)
+    years = np.asarray(list(years))
+    trend = (years - years.min()).astype(float)
+    df = pd.DataFrame({'year': years})
+    df['hours_per_year'] = 2200 - 8 * trend + rng.normal(scale=30, size=len(df))
+    df['gdp_growth_rate'] = 6 - 0.08 * trend + rng.normal(size=len(df))
+    df['gdp_per_capita_usd'] = 5000 + 400 * trend + rng.normal(scale=800, size=len(df))
+    # 労働時間の残差と相関する指標。観測年の少ない系列を想定して前半を欠損にする
+    df['reading_minutes_per_day'] = 40 + 0.05 * (df['hours_per_year'] - 2200 + 8 * trend) + rng.normal(size=len(df))
+    df.loc[df['year'] < 1976, 'reading_minutes_per_day'] = np.nan
+    df.loc[rng.random(len(df)) < 0.1, 'gdp_per_capita_usd'] = np.nan
+    return df
+
+
+def _residual_regression(df, base_column, column, controls):
+    sample = df[[base_column, column, *controls]].dropna()
+    design = np.column_stack([np.ones(len(sample)), sample[controls].to_numpy(dtype=float)])
+
+    def residuals(name):
+        values = sample[name].to_numpy(dtype=float)
+        return values - design @ np.linalg.lstsq(design, values, rcond=None)[0]
+    return stats.pearsonr(residuals(base_column), residuals(column))[0], len(sample)
+
+
+@pytest.mark.parametrize('controls', [
+    ['year'],
+    ['year', 'gdp_per_capita_usd'],
+    ['year', 'gdp_per_capita_usd', 'reading_minutes_per_day'],
+])
+def test_matches_residual_regression_on_the_shared_sample(controls):
+    df = _frame()
+    results = partial_correlations(df, 'hours_per_year', controls)
+
+    assert set(results) == set(INDICATORS) - set(controls)
+    for column, result in results.items():
+        expected, n = _residual_regression(df, 'hours_per_year', column, controls)
+        assert result['partial_correlation'] == pytest.approx(expected, abs=1e-10)
+        assert result['n_samples'] == n
+        assert result['dof'] == n - 2 - len(controls)
+
+
+def test_spearman_ranks_within_the_shared_sample():
+    df = _frame(1)
+    result = partial_correlations(df, 'hours_per_year', ['year'], columns=['reading_minutes_per_day'],
+                                  method='spearman')['reading_minutes_per_day']
+
+    ranked = df[['hours_per_year', 'reading_minutes_per_day', 'year']].dropna().rank()
+    expected, n = _residual_regression(ranked, 'hours_per_year', 'reading_minutes_per_day', ['year'])
+    assert result['partial_correlation'] == pytest.approx(expected, abs=1e-10)
+    assert result['n_samples'] == n == 48
+
+
+def test_degenerate_inputs_return_none():
+    df = _frame()
+    df['constant'] = 1.0
+    df['scaled_year'] = df['year'] * 2
+    results = partial_correlations(df.head(5), 'hours_per_year', ['year', 'gdp_growth_rate'])
+    # 制御変数で完全に説明される列・定数の列・自由度の足りない列
+    assert results['scaled_year'] is None
+    assert results['constant'] is None
+    assert results['reading_minutes_per_day'] is None
+
+
+def test_unknown_columns_are_rejected():
+    with pytest.raises(ValueError, match='Unknown columns'):
+        partial_correlations(_frame(), 'hours_per_year', ['year', 'nope'])
+    with pytest.raises(ValueError, match='control variable'):
+        partial_correlations(_frame(), 'hours_per_year', ['hours_per_year'])
+
+
+def test_api_and_analysis_output_use_the_same_estimator(monkeypatch, tmp_path):
+    df = _frame()
+    monkeypatch.setattr(
+        data_loader_module, 'read_table',
+        lambda table, *a, **k: df.copy() if table == 'combined_dataset' else None
+    )
+    loader = DataLoader(cache=AnalyticsCache(tmp_path / 'cache.sqlite3'))
+    results = add_partial_correlations({indicator: {'n_samples': 0} for indicator in INDICATORS}, df)
+
+    for indicator in INDICATORS:
+        saved = results[indicator]['partial_correlations']
+        assert loader.get_partial_correlation(['year'], indicator=indicator) == pytest.approx(saved['year'])
+        controls = saved['year_and_other_indicators']['controls']
+        api = loader.get_partial_correlation(controls, indicator=indicator)
+        assert {'controls': controls, **api} == pytest.approx(saved['year_and_other_indicators'])
+
+
+@pytest.mark.parametrize('controls', ['year', 'gdp_per_capita_usd', 'year,gdp_growth_rate'])
+def test_api_returns_only_indicators(controls):
+    from backend.app import app
+
+    response = app.test_client().get('/api/correlation/partial', query_string={'controls': controls})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    # year は制御変数としてのみ使い、結果には含めない
+    assert 'year' not in results
+    assert set(results) == set(INDICATORS) - set(controls.split(','))
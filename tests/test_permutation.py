@@ -0,0 +1,80 @@
+"""
+並べ替え検定のテスト（並べ替えごとに scipy で相関を求めた結果と比較）
+"""
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from scripts.analysis.permutation import permutation_indices, permutation_test
+
+
+def _series(seed, n=30, strength=1.0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    return x, strength * x + rng.normal(size=n)
+
+
+def _reference(x, y, orders):
+    """並べ替えた x と y の相関の絶対値が観測値以上になる割合（観測値自身を含める）"""
+    p_values = {}
+    for name, correlate in [('pearson', stats.pearsonr), ('spearman', stats.spearmanr)]:
+        observed = abs(correlate(x, y).statistic)
+        exceed = sum(abs(correlate(x[order], y).statistic) >= observed * (1 - 1e-12) for order in orders)
+        p_values[name] = (exceed + 1) / (len(orders) + 1)
+    return p_values
+
+
+def _random_orders(n, n_permutations, batch_size, seed):
+    """permutation_test と同じ乱数列・同じバッチ分割で並べ替えを生成"""
+    rng = np.random.default_rng(seed)
+    sizes = [batch_size] * (n_permutations // batch_size)
+    if n_permutations % batch_size:
+        sizes.append(n_permutations % batch_size)
+    return np.concatenate([permutation_indices(n, size, rng) for size in sizes])
+
+
+@pytest.mark.parametrize('strength', [0.0, 0.3, 1.0])
+def test_full_run_matches_per_permutation_reference(strength):
+    x, y = _series(0, strength=strength)
+    result = permutation_test(x, y, n_permutations=450, batch_size=100, early_stop=False, seed=5)
+
+    expected = _reference(x, y, _random_orders(len(x), 450, 100, seed=5))
+    assert result['n_permutations'] == 450 and not result['stopped_early']
+    assert result['pearson_p_value'] == pytest.approx(expected['pearson'], abs=1e-15)
+    assert result['spearman_p_value'] == pytest.approx(expected['spearman'], abs=1e-15)
+
+
+@pytest.mark.parametrize('seed,strength', [(1, 1.0), (2, 0.0), (3, 0.05)])
+def test_early_stop_agrees_with_the_full_run(seed, strength):
+    x, y = _series(seed, strength=strength)
+    full = permutation_test(x, y, n_permutations=5000, batch_size=250, early_stop=False, seed=seed)
+    early = permutation_test(x, y, n_permutations=5000, batch_size=250, early_stop=True, seed=seed)
+
+    assert early['stopped_early']
+    assert early['n_permutations'] < full['n_permutations']
+    assert early['n_permutations'] % 250 == 0
+    # 打ち切った時点までの並べ替えは完全な実行の先頭部分と同じ
+    prefix = _reference(x, y, _random_orders(len(x), 5000, 250, seed=seed)[:early['n_permutations']])
+    assert early['pearson_p_value'] == pytest.approx(prefix['pearson'], abs=1e-15)
+    assert early['spearman_p_value'] == pytest.approx(prefix['spearman'], abs=1e-15)
+    # 有意水準に対する判定は完全な実行と変わらない
+    for method in ['pearson_p_value', 'spearman_p_value']:
+        assert (early[method] < 0.05) == (full[method] < 0.05)
+
+
+def test_circular_scheme_enumerates_every_shift():
+    x, y = _series(4, n=25, strength=0.4)
+    result = permutation_test(x, y, scheme='circular')
+
+    shifts = [np.roll(np.arange(len(x)), -shift) for shift in range(1, len(x))]
+    expected = _reference(x, y, shifts)
+    assert result['n_permutations'] == len(x) - 1
+    assert result['pearson_p_value'] == pytest.approx(expected['pearson'], abs=1e-15)
+    assert result['spearman_p_value'] == pytest.approx(expected['spearman'], abs=1e-15)
+
+
+def test_invalid_inputs():
+    assert permutation_test([1.0, 2.0], [2.0, 1.0]) is None
+    with pytest.raises(ValueError, match='Unknown permutation scheme'):
+        permutation_test(*_series(0), scheme='block')
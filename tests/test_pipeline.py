@@ -0,0 +1,190 @@
+"""
+処理パイプラインのテスト（毎回全ステージを実行した結果と比較）
+"""
+
+import json
+import os
+import time
+from functools import partial
+
+import pytest
+
+from pipeline import Pipeline, Stage
+
+
+# ステージ関数（プロセスプールへ渡すためモジュールレベルで定義）
+def _copy_upper(upstream, source, target, log):
+    """入力ファイルを大文字にして書き出す"""
+    with open(log, 'a', encoding='utf-8') as f:
+        f.write(f"{target.stem}\n")
+    text = source.read_text(encoding='utf-8').upper()
+    target.write_text(text, encoding='utf-8')
+    return text
+
+
+def _join(upstream, target, log):
+    """上流の結果を連結して書き出す"""
+    with open(log, 'a', encoding='utf-8') as f:
+        f.write(f"{target.stem}\n")
+    text = '+'.join(upstream[name] for name in sorted(upstream))
+    target.write_text(text, encoding='utf-8')
+    return text
+
+
+def _build(tmp_path, params=None):
+    raw, out, log = tmp_path / 'raw', tmp_path / 'out', tmp_path / 'runs.log'
+    raw.mkdir(exist_ok=True)
+    out.mkdir(exist_ok=True)
+    loads = []
+
+    def loader(name):
+        def load():
+            loads.append(name)
+            return (out / f'{name}.txt').read_text(encoding='utf-8')
+        return load
+
+    stages = [
+        Stage(name, partial(_copy_upper, source=raw / f'{name}.txt', target=out / f'{name}.txt', log=log),
+              inputs=[raw / f'{name}.txt'], outputs=[out / f'{name}.txt'], load_cached=loader(name),
+              params=(params or {}).get(name))
+        for name in ['a', 'b']
+    ]
+    stages.append(Stage('joined', partial(_join, target=out / 'joined.txt', log=log),
+                        outputs=[out / 'joined.txt'], depends_on=['a', 'b'], load_cached=loader('joined')))
+    return Pipeline(stages, state_path=tmp_path / 'state.json'), loads
+
+
+def _ran(tmp_path):
+    log = tmp_path / 'runs.log'
+    runs = log.read_text(encoding='utf-8').split() if log.exists() else []
+    log.unlink(missing_ok=True)
+    return sorted(runs)
+
+
+def _run(tmp_path, **kwargs):
+    pipeline, loads = _build(tmp_path, params=kwargs.pop('params', None))
+    results, report = pipeline.run(**kwargs)
+    statuses = {entry['stage']: entry['status'] for entry in report}
+    return results, statuses, loads
+
+
+def _write_inputs(tmp_path, a, b):
+    (tmp_path / 'raw').mkdir(exist_ok=True)
+    (tmp_path / 'raw' / 'a.txt').write_text(a, encoding='utf-8')
+    (tmp_path / 'raw' / 'b.txt').write_text(b, encoding='utf-8')
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_incremental_runs_match_a_full_rebuild(tmp_path, jobs):
+    _write_inputs(tmp_path, 'x', 'y')
+    results, statuses, _ = _run(tmp_path, jobs=jobs)
+    assert statuses == {'a': 'ran', 'b': 'ran', 'joined': 'ran'}
+    assert results['joined'] == 'X+Y'
+    assert _ran(tmp_path) == ['a', 'b', 'joined']
+
+    # 入力が変わらなければ何も実行せず、出力も読み込まない
+    results, statuses, loads = _run(tmp_path, jobs=jobs)
+    assert set(statuses.values()) == {'skipped'}
+    assert results == {'a': None, 'b': None, 'joined': None}
+    assert loads == [] and _ran(tmp_path) == []
+
+    # 変わった入力のステージと下流のみを実行し、スキップした上流は出力から復元する
+    _write_inputs(tmp_path, 'x', 'z')
+    results, statuses, loads = _run(tmp_path, jobs=jobs)
+    assert statuses == {'a': 'skipped', 'b': 'ran', 'joined': 'ran'}
+    assert loads == ['a']
+    assert _ran(tmp_path) == ['b', 'joined']
+    incremental = (tmp_path / 'out' / 'joined.txt').read_text(encoding='utf-8')
+
+    results, statuses, _ = _run(tmp_path, force=True, jobs=jobs)
+    assert set(statuses.values()) == {'ran'}
+    assert (tmp_path / 'out' / 'joined.txt').read_text(encoding='utf-8') == incremental == 'X+Z'
+
+
+def test_unchanged_output_does_not_rerun_downstream(tmp_path):
+    _write_inputs(tmp_path, 'x', 'y')
+    _run(tmp_path)
+    _ran(tmp_path)
+
+    # 大文字にすると同じ出力になる変更（内容のハッシュで判定するため下流は実行しない）
+    _write_inputs(tmp_path, 'X', 'y')
+    _, statuses, _ = _run(tmp_path)
+    assert statuses == {'a': 'ran', 'b': 'skipped', 'joined': 'skipped'}
+
+
+def test_tampered_output_or_changed_settings_rerun_the_stage(tmp_path):
+    _write_inputs(tmp_path, 'x', 'y')
+    _run(tmp_path)
+    _ran(tmp_path)
+
+    (tmp_path / 'out' / 'joined.txt').write_text('edited', encoding='utf-8')
+    _, statuses, _ = _run(tmp_path)
+    assert statuses == {'a': 'skipped', 'b': 'skipped', 'joined': 'ran'}
+
+    (tmp_path / 'out' / 'b.txt').unlink()
+    _, statuses, _ = _run(tmp_path)
+    assert statuses['b'] == 'ran'
+
+    _, statuses, _ = _run(tmp_path, params={'a': {'countries': ['JPN']}})
+    assert statuses['a'] == 'ran'
+    state = json.loads((tmp_path / 'state.json').read_text(encoding='utf-8'))
+    assert state['a']['params'] == {'countries': ['JPN']}
+
+
+def test_cyclic_dependencies_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Cyclic'):
+        Pipeline([Stage('a', None, depends_on=['b']), Stage('b', None, depends_on=['a'])],
+                 state_path=tmp_path / 'state.json')
+
+
+def _wait_for_partner(upstream, name, partner, directory):
+    """相手のステージが始まるまで待つ（逐次実行では相手が始まらずに失敗する）"""
+    (directory / f'{name}.started').write_text(str(os.getpid()), encoding='utf-8')
+    deadline = time.monotonic() + 30
+    while not (directory / f'{partner}.started').exists():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{partner} did not start while {name} was running")
+        time.sleep(0.01)
+    return os.getpid()
+
+
+def _collect(upstream):
+    return sorted(upstream.values())
+
+
+def _fail(upstream):
+    raise RuntimeError('stage failed')
+
+
+def _parallel_pipeline(tmp_path, extra=()):
+    stages = [
+        Stage('a', partial(_wait_for_partner, name='a', partner='b', directory=tmp_path)),
+        Stage('b', partial(_wait_for_partner, name='b', partner='a', directory=tmp_path)),
+        Stage('both', _collect, depends_on=['a', 'b']),
+        *extra,
+    ]
+    return Pipeline(stages, state_path=tmp_path / 'state.json')
+
+
+def test_independent_stages_run_concurrently_in_workers(tmp_path):
+    results, report = _parallel_pipeline(tmp_path).run(jobs=2)
+
+    # a と b は同時に実行され、どちらもワーカープロセスで動く
+    assert {results['a'], results['b']}.isdisjoint({os.getpid()})
+    assert results['a'] != results['b']
+    # 下流は両方の結果が揃ってから実行される
+    assert results['both'] == sorted([results['a'], results['b']])
+    assert [entry['stage'] for entry in report][-1] == 'both'
+
+
+def test_parallel_results_match_sequential_run(tmp_path):
+    _write_inputs(tmp_path, 'p', 'q')
+    sequential, _, _ = _run(tmp_path, force=True, jobs=1)
+    parallel, _, _ = _run(tmp_path, force=True, jobs=3)
+    assert parallel == sequential == {'a': 'P', 'b': 'Q', 'joined': 'P+Q'}
+
+
+def test_worker_failure_is_raised(tmp_path):
+    pipeline = _parallel_pipeline(tmp_path, extra=[Stage('broken', _fail)])
+    with pytest.raises(RuntimeError, match='stage failed'):
+        pipeline.run(jobs=2)
@@ -0,0 +1,58 @@
+"""
+順位キャッシュのテスト（scipy.stats.spearmanr と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from backend.models.rank_cache import RankCache
+
+
+def _frame(seed, n=60, ties=False):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'year': np.arange(1960, 1960 + n)})
+    df['hours_per_year'] = rng.normal(size=n)
+    df['indicator'] = df['hours_per_year'] + rng.normal(size=n)
+    if ties:
+        df['hours_per_year'] = np.round(df['hours_per_year'])
+        df['indicator'] = np.round(df['indicator'] * 2) / 2
+    df.loc[rng.random(n) < 0.2, 'hours_per_year'] = np.nan
+    df.loc[rng.random(n) < 0.2, 'indicator'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('ties', [False, True])
+@pytest.mark.parametrize('seed', range(10))
+def test_matches_spearmanr_on_random_subranges(seed, ties):
+    df = _frame(seed, ties=ties)
+    cache = RankCache(df)
+    rng = np.random.default_rng(seed + 100)
+
+    for _ in range(20):
+        start, end = sorted(rng.integers(1955, 2025, size=2))
+        window = df[(df['year'] >= start) & (df['year'] <= end)].dropna()
+        result = cache.spearman('indicator', int(start), int(end))
+        if len(window) < 3 or window['hours_per_year'].nunique() < 2 or window['indicator'].nunique() < 2:
+            assert result is None
+            continue
+
+        expected = stats.spearmanr(window['hours_per_year'], window['indicator'])
+        assert result['spearman_correlation'] == pytest.approx(expected.statistic, abs=1e-12)
+        assert result['spearman_p_value'] == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-12)
+        assert result['n_samples'] == len(window)
+        assert (result['start_year'], result['end_year']) == (window['year'].min(), window['year'].max())
+
+
+def test_open_ended_ranges_and_unknown_columns():
+    df = _frame(0)
+    cache = RankCache(df)
+    complete = df.dropna()
+
+    full = cache.spearman('indicator')
+    assert full['spearman_correlation'] == pytest.approx(
+        stats.spearmanr(complete['hours_per_year'], complete['indicator']).statistic, abs=1e-12
+    )
+    assert cache.spearman('indicator', start_year=1990)['n_samples'] == int((complete['year'] >= 1990).sum())
+    assert cache.spearman('nope') is None
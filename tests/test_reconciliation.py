@@ -0,0 +1,106 @@
+"""
+複数ソースの統合のテスト（キーごとにループで統合した結果と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.data_processing.reconciliation import (
+    SOURCE_BITS, decode_source_mask, describe_sources, harmonize_columns, reconcile_sources
+)
+
+SOURCES = ['MHLW', 'OECD', 'Cabinet_Office']
+
+
+def _frames(seed):
+    """国×年が部分的に重なる3つのソース（欠損を含む）"""
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for source in SOURCES:
+        keys = [(c, y) for c in ['JPN', 'USA'] for y in range(2000, 2012) if rng.random() < 0.6]
+        frames[source] = pd.DataFrame({
+            'country': [c for c, _ in keys],
+            'year': [y for _, y in keys],
+            'value': np.where(rng.random(len(keys)) < 0.1, np.nan, rng.normal(size=len(keys))),
+        })
+    return frames
+
+
+def _reference(frames, rule, priority=None, real_sources=()):
+    observations = {}
+    for source, df in frames.items():
+        for row in df.dropna(subset=['value']).itertuples():
+            observations.setdefault((row.country, row.year), []).append((source, row.value))
+
+    rows = []
+    for key in sorted(observations):
+        found = observations[key]
+        if rule == 'priority':
+            order = list(priority or frames)
+            found = [min(found, key=lambda item: order.index(item[0]))]
+        elif rule == 'prefer_real' and any(source in real_sources for source, _ in found):
+            found = [item for item in found if item[0] in real_sources]
+        mask = 0
+        for source, _ in found:
+            mask |= SOURCE_BITS[source]
+        rows.append({'country': key[0], 'year': key[1],
+                     'value': float(np.mean([value for _, value in found])), 'source_mask': mask})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('rule,options', [
+    ('mean', {}),
+    ('priority', {'priority': ['OECD', 'MHLW', 'Cabinet_Office']}),
+    ('prefer_real', {'real_sources': ['MHLW']}),
+    ('prefer_real', {'real_sources': ['MHLW', 'Cabinet_Office']}),
+])
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_per_key_reconciliation(seed, rule, options):
+    frames = _frames(seed)
+    result = reconcile_sources(frames, 'value', keys=['country', 'year'], rule=rule, **options)
+
+    expected = _reference(frames, rule, **options)
+    pd.testing.assert_frame_equal(
+        result.reset_index(drop=True).astype({'year': int, 'source_mask': np.int64}),
+        expected.astype({'year': int, 'source_mask': np.int64}),
+        check_exact=False, rtol=0, atol=1e-12, check_column_type=False,
+    )
+
+
+def test_overlapping_sources_set_every_contributing_bit():
+    frames = {
+        'MHLW': pd.DataFrame({'year': [2000, 2001], 'value': [1.0, 2.0]}),
+        'OECD': pd.DataFrame({'year': [2001, 2002], 'value': [4.0, 6.0]}),
+        'Statistics_Bureau': pd.DataFrame({'year': [2001], 'value': [np.nan]}),
+    }
+    result = reconcile_sources(frames, 'value')
+
+    assert result['value'].tolist() == [1.0, 3.0, 6.0]
+    assert [decode_source_mask(mask) for mask in result['source_mask']] == [['MHLW'], ['MHLW', 'OECD'], ['OECD']]
+    # 欠損値のソースはビットを立てない
+    assert describe_sources(result['source_mask']) == 'MHLW, OECD'
+
+
+def test_unknown_source_and_rule_are_rejected():
+    frame = pd.DataFrame({'year': [2000], 'value': [1.0]})
+    with pytest.raises(ValueError, match='Unknown data source'):
+        reconcile_sources({'Nope': frame}, 'value')
+    with pytest.raises(ValueError, match='Unknown reconciliation rule'):
+        reconcile_sources({'MHLW': frame}, 'value', rule='median')
+
+
+def test_harmonize_converts_units_and_keeps_existing_values():
+    df = pd.DataFrame({'hours': [10.0, np.nan], 'minutes': [60.0, 120.0]})
+    result = harmonize_columns(df, conversions={'minutes': ('hours', 1 / 60)})
+    assert result['hours'].tolist() == [10.0, 2.0]
+    assert list(result.columns) == ['hours']
+
+
+def test_duplicate_rows_within_a_source_count_once():
+    frames = {
+        'MHLW': pd.DataFrame({'year': [2000], 'value': [10.0]}),
+        'OECD': pd.DataFrame({'year': [2000, 2000], 'value': [1.0, 3.0]}),
+    }
+    # OECD の2行は先に平均（2.0）してから MHLW と平均する
+    assert reconcile_sources(frames, 'value')['value'].tolist() == [6.0]
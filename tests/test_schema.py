@@ -0,0 +1,70 @@
+"""
+処理済みテーブルの書き出し・読み込みのテスト
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import scripts.data_processing.schema as schema
+from scripts.data_processing.schema import COLUMNAR_SUFFIX, TableChunkWriter, read_table, write_table
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def processed_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(schema, 'DATA_PROCESSED_DIR', tmp_path)
+    return tmp_path
+
+
+def _combined(seed=0, years=range(1900, 2024)):
+    rng = np.random.default_rng(seed)
+    years = np.asarray(list(years))
+    df = pd.DataFrame({
+        'country': np.repeat(['DEU', 'JPN'], len(years)),
+        'year': np.tile(years, 2),
+        'hours_per_year': 1500 + rng.random(2 * len(years)) * 700,
+        # 既定のCSVパーサで末尾の桁がずれやすい、桁数の多い値
+        'gdp_growth_rate': rng.normal(size=2 * len(years)) * np.pi * 1e-3,
+        'gdp_per_capita_usd': rng.lognormal(mean=9, sigma=1, size=2 * len(years)),
+    })
+    df.loc[rng.random(len(df)) < 0.2, 'gdp_growth_rate'] = np.nan
+    return df
+
+
+def test_csv_and_parquet_reads_are_bit_identical(processed_dir):
+    write_table(_combined(), 'combined_dataset')
+
+    from_csv = read_table('combined_dataset', path=processed_dir / 'combined_dataset.csv')
+    from_parquet = read_table('combined_dataset', path=processed_dir / f'combined_dataset{COLUMNAR_SUFFIX}')
+
+    pd.testing.assert_frame_equal(from_csv, from_parquet, check_exact=True)
+    for column in ['hours_per_year', 'gdp_growth_rate', 'gdp_per_capita_usd']:
+        np.testing.assert_array_equal(
+            from_csv[column].to_numpy().view(np.uint64), from_parquet[column].to_numpy().view(np.uint64)
+        )
+
+
+def test_chunked_write_matches_single_write(processed_dir):
+    df = _combined(1)
+    write_table(df, 'combined_dataset')
+    expected = read_table('combined_dataset')
+
+    with TableChunkWriter('combined_dataset') as writer:
+        for start in range(0, len(df), 37):
+            writer.write(df.iloc[start:start + 37])
+    for suffix in ['.csv', COLUMNAR_SUFFIX]:
+        actual = read_table('combined_dataset', path=processed_dir / f'combined_dataset{suffix}')
+        pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+def test_chunked_write_rejects_duplicate_keys_across_chunks(processed_dir):
+    df = _combined(2)
+    with pytest.raises(schema.SchemaError, match='duplicate'):
+        with TableChunkWriter('combined_dataset') as writer:
+            writer.write(df.iloc[:10])
+            writer.write(df.iloc[5:15])
+    # 途中までの出力は残さない
+    assert not (processed_dir / 'combined_dataset.csv').exists()
+    assert not (processed_dir / f'combined_dataset{COLUMNAR_SUFFIX}').exists()
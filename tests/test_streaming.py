@@ -0,0 +1,133 @@
+"""
+ストリーミング読み込みのテスト（ファイル全体を読み込んだ結果と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import process_labor_hours
+import process_reading_time
+import schema
+from streaming import read_raw_csv
+
+
+@pytest.fixture
+def dirs(monkeypatch, tmp_path):
+    raw, processed = tmp_path / 'raw', tmp_path / 'processed'
+    raw.mkdir()
+    processed.mkdir()
+    for module in (process_labor_hours, process_reading_time):
+        monkeypatch.setattr(module, 'DATA_RAW_DIR', raw)
+        monkeypatch.setattr(module, 'DATA_PROCESSED_DIR', processed)
+    monkeypatch.setattr(schema, 'DATA_PROCESSED_DIR', processed)
+    return raw, processed
+
+
+def _panel_csv(path, seed=0, countries=('DEU', 'JPN', 'USA')):
+    """国×年の重複行・欠損・順不同を含む生データ"""
+    rng = np.random.default_rng(seed)
+    rows = [
+        {'year': year, 'country': country, 'average_hours_worked': rng.normal(1800, 100),
+         'note': 'x'}
+        for country in countries for year in range(1970, 2000) for _ in range(int(rng.integers(1, 3)))
+    ]
+    df = pd.DataFrame(rows).sample(frac=1, random_state=seed)
+    df.loc[df.sample(frac=0.1, random_state=seed).index, 'average_hours_worked'] = np.nan
+    df.to_csv(path, index=False)
+    return df
+
+
+def _reference(df, countries=None, year_range=None):
+    df = df.rename(columns={'average_hours_worked': 'hours_per_year'})
+    if countries is not None:
+        df = df[df['country'].isin(countries)]
+    if year_range is not None:
+        df = df[(df['year'] >= year_range[0]) & (df['year'] <= year_range[1])]
+    return df.groupby(['country', 'year'], as_index=False, sort=True)['hours_per_year'].mean()
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 100_000])
+@pytest.mark.parametrize('filters', [{}, {'countries': ['JPN', 'USA']}, {'year_range': (1980, 1989)},
+                                     {'countries': ['DEU'], 'year_range': (1975, 2030)}])
+def test_streamed_aggregation_matches_full_read(tmp_path, chunksize, filters):
+    path = tmp_path / 'oecd.csv'
+    df = _panel_csv(path)
+
+    streamed = read_raw_csv(path, stream=True, value_columns=['hours_per_year'],
+                            rename={'average_hours_worked': 'hours_per_year'},
+                            chunksize=chunksize, **filters)
+
+    expected = _reference(df, **filters)
+    pd.testing.assert_frame_equal(
+        streamed[['country', 'year', 'hours_per_year']].reset_index(drop=True), expected,
+        check_exact=False, rtol=1e-12, check_dtype=False, check_column_type=False,
+    )
+
+
+def test_labor_hours_stream_matches_full_read(dirs):
+    raw, _ = dirs
+    _panel_csv(raw / 'oecd_labor_hours_sample.csv', seed=1)
+    years = np.arange(1948, 2000)
+    pd.DataFrame({'year': years, 'average_hours_per_year': 2400 - 5 * (years - 1948.0),
+                  'source': 'MHLW_sample'}).to_csv(raw / 'mhlw_labor_hours_sample.csv', index=False)
+
+    full = process_labor_hours.process_labor_hours()
+    streamed = process_labor_hours.process_labor_hours(stream=True, chunksize=5)
+    pd.testing.assert_frame_equal(streamed, full, check_exact=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_reading_time_stream_matches_full_read(dirs, shuffle):
+    raw, processed = dirs
+    years = np.arange(1976, 2024)
+    df = pd.DataFrame({'year': years, 'reading_minutes_per_day': 15 - 0.1 * (years - 1976),
+                       'source': 'Statistics_Bureau_sample'})
+    df.loc[5, 'reading_minutes_per_day'] = np.nan
+    if shuffle:
+        df = df.sample(frac=1, random_state=0)
+    df.to_csv(raw / 'reading_time_sample.csv', index=False)
+
+    process_reading_time.process_reading_time()
+    full = schema.read_table('reading_time_processed', path=processed / 'reading_time_processed.csv')
+    process_reading_time.process_reading_time(stream=True, chunksize=4)
+    streamed = schema.read_table('reading_time_processed', path=processed / 'reading_time_processed.csv')
+
+    pd.testing.assert_frame_equal(streamed, full[streamed.columns.tolist()], check_exact=True)
+    assert streamed['year'].is_monotonic_increasing
+
+
+@pytest.mark.parametrize('countries', [['DEU', 'USA'], ['JPN'], ['JPN', 'USA']])
+def test_country_filter_applies_to_files_without_a_country_column(dirs, countries):
+    raw, _ = dirs
+    _panel_csv(raw / 'oecd_labor_hours_sample.csv', seed=2)
+    years = np.arange(1948, 2000)
+    # 国の列がない MHLW のファイルは国内（JPN）のデータ
+    pd.DataFrame({'year': years, 'average_hours_per_year': 2400 - 5 * (years - 1948.0),
+                  'source': 'MHLW_sample'}).to_csv(raw / 'mhlw_labor_hours_sample.csv', index=False)
+
+    full = process_labor_hours.process_labor_hours()
+    streamed = process_labor_hours.process_labor_hours(stream=True, chunksize=5, countries=countries)
+
+    expected = full[full['country'].isin(countries)].reset_index(drop=True)
+    assert sorted(streamed['country'].astype(str).unique()) == sorted(countries)
+    pd.testing.assert_frame_equal(streamed.reset_index(drop=True), expected, check_exact=False, rtol=1e-12,
+                                  check_categorical=False)
+
+
+def test_missing_year_column_names_the_file(tmp_path):
+    path = tmp_path / 'no_year.csv'
+    pd.DataFrame({'country': ['JPN'], 'average_hours_worked': [1800.0]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match=r'no_year\.csv: missing required columns: year'):
+        read_raw_csv(path, stream=True, value_columns=['hours_per_year'],
+                     rename={'average_hours_worked': 'hours_per_year'})
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_reading_time_without_source_names_the_file(dirs, stream):
+    raw, _ = dirs
+    pd.DataFrame({'year': [2001, 2006], 'reading_minutes_per_day': [15.0, 14.0]}).to_csv(
+        raw / 'reading_time_sample.csv', index=False
+    )
+    with pytest.raises(ValueError, match=r'reading_time_sample\.csv: missing required columns: source'):
+        process_reading_time.process_reading_time(stream=stream)
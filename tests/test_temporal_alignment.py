@@ -0,0 +1,91 @@
+"""
+時系列の頻度合わせのテスト（国ごとに pandas で揃えた結果と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.data_processing.temporal_alignment import align_series, fill_panel_gaps
+
+
+def _sparse_panel(seed):
+    """国ごとに観測期間と欠損の異なる年次パネル（末尾の欠損を含む）"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for country in ['AUS', 'DEU', 'JPN', 'USA']:
+        start, end = 1950 + int(rng.integers(0, 10)), 2010 - int(rng.integers(0, 10))
+        for year in range(start, end + 1):
+            if rng.random() < 0.6:
+                rows.append({'country': country, 'year': year, 'value': rng.normal()})
+    return pd.DataFrame(rows)
+
+
+def _calendar(countries=('AUS', 'DEU', 'JPN', 'USA', 'NZL'), years=range(1945, 2016)):
+    return pd.DataFrame([{'country': c, 'year': y} for c in countries for y in years])
+
+
+def _reference(df, calendar, method, max_gap):
+    """国ごとに1系列ずつ揃える"""
+    result = []
+    for country, frame in calendar.groupby('country', sort=False):
+        series = df[df['country'] == country].set_index('year')['value']
+        years = frame['year'].to_numpy()
+        aligned = series.reindex(years)
+        observed = aligned.notna().to_numpy()
+        values = aligned.to_numpy(dtype=float).copy()
+        if method == 'ffill' and observed.any():
+            last = None
+            for i in range(len(years)):
+                if observed[i]:
+                    last = i
+                    continue
+                if last is None:
+                    continue
+                following = np.flatnonzero(observed[i:])
+                # 欠損区間全体（次の観測がなければ観測からの距離）が max_gap 以下の場合のみ埋める
+                gap = following[0] + i - last - 1 if len(following) else i - last
+                if max_gap is None or gap <= max_gap:
+                    values[i] = values[last]
+        elif method == 'linear':
+            filled = aligned.interpolate(method='index', limit_area='inside').to_numpy()
+            runs = pd.Series(observed).cumsum().to_numpy()
+            for i in np.flatnonzero(~observed & ~np.isnan(filled)):
+                gap = np.sum((runs == runs[i]) & ~observed)
+                if max_gap is None or gap <= max_gap:
+                    values[i] = filled[i]
+        result.append(values)
+    return np.concatenate(result)
+
+
+@pytest.mark.parametrize('method', ['ffill', 'linear'])
+@pytest.mark.parametrize('max_gap', [None, 0, 2])
+@pytest.mark.parametrize('seed', range(5))
+def test_multi_country_alignment_matches_per_country(method, max_gap, seed):
+    df = _sparse_panel(seed)
+    calendar = _calendar()
+    result = align_series(df, 'value', calendar, method=method, max_gap=max_gap)
+    np.testing.assert_allclose(result, _reference(df, calendar, method, max_gap), rtol=0, atol=1e-12)
+
+
+def test_ffill_carries_past_each_countrys_last_observation():
+    df = pd.DataFrame({'country': ['A', 'A', 'B', 'B'], 'year': [2000, 2002, 2000, 2002],
+                       'value': [1.0, 2.0, 10.0, 20.0]})
+    calendar = _calendar(countries=('A', 'B'), years=range(2000, 2004))
+
+    result = align_series(df, 'value', calendar, method='ffill')
+    np.testing.assert_array_equal(result, [1, 1, 2, 2, 10, 10, 20, 20])
+    # 次の国の観測は前の国の欠損を埋めない
+    result = align_series(df[df['country'] == 'B'], 'value', calendar, method='ffill')
+    np.testing.assert_array_equal(result, [np.nan] * 4 + [10, 10, 20, 20])
+
+
+def test_fill_panel_gaps_interpolates_within_each_country():
+    df = pd.DataFrame({'country': ['A', 'A', 'B', 'B'], 'year': [2000, 2003, 2001, 2002],
+                       'value': [0.0, 3.0, 5.0, 7.0]})
+    panel = fill_panel_gaps(df, ['value'])
+
+    assert list(zip(panel['country'], panel['year'])) == [
+        ('A', 2000), ('A', 2001), ('A', 2002), ('A', 2003), ('B', 2001), ('B', 2002)
+    ]
+    np.testing.assert_array_equal(panel['value'], [0, 1, 2, 3, 5, 7])
@@ -0,0 +1,76 @@
+"""
+トレンドの一括計算のテスト（列・期間ごとに np.polyfit で当てはめた結果と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.analysis.time_series_analysis import DEFAULT_PERIODS, calculate_trends, parse_periods
+
+
+def _combined(seed, years=range(1950, 2024)):
+    """列ごとに観測年の異なる統合データ（year列は日付）"""
+    rng = np.random.default_rng(seed)
+    years = np.asarray(list(years))
+    df = pd.DataFrame({'year': pd.to_datetime(years.astype(str))})
+    df['hours_per_year'] = 2400 - 6 * (years - 1950) + rng.normal(scale=20, size=len(years))
+    df['gdp_growth_rate'] = rng.normal(3, 2, size=len(years))
+    df['reading_minutes_per_day'] = 20 - 0.1 * (years - 1950) + rng.normal(size=len(years))
+    for column in df.columns[1:]:
+        df.loc[rng.random(len(df)) < 0.2, column] = np.nan
+    df.loc[df['year'].dt.year < 1976, 'reading_minutes_per_day'] = np.nan
+    # 行の順序に依存しないこと
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def _reference(df, column, start, end):
+    """期間内の観測値だけを取り出し、最初の観測年からの経過年で polyfit"""
+    observed = df[['year', column]].dropna().sort_values('year')
+    if start:
+        observed = observed[observed['year'] >= pd.to_datetime(str(start))]
+    if end:
+        observed = observed[observed['year'] <= pd.to_datetime(str(end))]
+    if len(observed) < 2:
+        return None
+    elapsed = (observed['year'] - observed['year'].min()).dt.days.to_numpy() / 365.25
+    values = observed[column].to_numpy()
+    slope, intercept = np.polyfit(elapsed, values, 1)
+    residuals = values - (slope * elapsed + intercept)
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'r_squared': 1 - np.sum(residuals ** 2) / np.sum((values - values.mean()) ** 2),
+        'period_start': str(observed['year'].dt.year.iloc[0]),
+        'period_end': str(observed['year'].dt.year.iloc[-1]),
+    }
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_batched_trends_match_per_column_polyfit(seed):
+    df = _combined(seed)
+    periods = {**DEFAULT_PERIODS, 'overall': (None, None), 'empty': (1900, 1920), 'late': (1970, 1980)}
+    result = calculate_trends(df, periods=periods)
+
+    columns = ['hours_per_year', 'gdp_growth_rate', 'reading_minutes_per_day']
+    assert sorted(result) == sorted(columns)
+    for column in columns:
+        for name, (start, end) in periods.items():
+            expected = _reference(df, column, start, end)
+            actual = result[column][name]
+            if expected is None:
+                assert actual is None
+                continue
+            for key in ['slope', 'intercept', 'r_squared']:
+                assert actual[key] == pytest.approx(expected[key], rel=1e-9, abs=1e-9), (column, name, key)
+            assert (actual['period_start'], actual['period_end']) == (
+                expected['period_start'], expected['period_end']
+            )
+
+
+def test_parse_periods():
+    assert parse_periods('postwar=1950-1979, recent=2000-') == {
+        'postwar': (1950, 1979), 'recent': (2000, None)
+    }
+    with pytest.raises(ValueError, match='Invalid period'):
+        parse_periods('1950-1979')
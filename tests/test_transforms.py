@@ -0,0 +1,86 @@
+"""
+トレンド除去・差分変換のテスト（列ごとに閉じた形の解や np.polyfit で求めた結果と比較）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.analysis.transforms import HP_LAMBDA_ANNUAL, TRANSFORMS, transform_grid, year_grid
+
+
+def _grid(seed, years=range(1960, 2024)):
+    """列ごとに欠損年の異なる年次グリッド（0以下の値を含む列もある）"""
+    rng = np.random.default_rng(seed)
+    years = np.asarray(list(years))
+    grid = pd.DataFrame({
+        'hours_per_year': 2200 - 6 * (years - years.min()) + rng.normal(scale=20, size=len(years)),
+        'gdp_growth_rate': rng.normal(1, 2, size=len(years)),
+        'reading_minutes_per_day': np.exp(rng.normal(3, 0.1, size=len(years))),
+    }, index=years)
+    for column in grid.columns:
+        grid.loc[rng.random(len(grid)) < 0.15, column] = np.nan
+    grid.loc[:1975, 'reading_minutes_per_day'] = np.nan
+    return grid
+
+
+def _hp_reference(years, values, lamb):
+    """観測年のみの重み付き最小二乗 (W + λD'D)⁻¹ W y を列ごとに解く"""
+    n = len(years)
+    second = np.diff(np.eye(n), n=2, axis=0)
+    weights = (~np.isnan(values)).astype(float)
+    trend = np.linalg.solve(np.diag(weights) + lamb * second.T @ second, np.nan_to_num(values) * weights)
+    return values - trend
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_transforms_match_per_column_reference(seed):
+    grid = _grid(seed)
+    result = transform_grid(grid)
+    assert list(result) == list(TRANSFORMS)
+
+    years = grid.index.to_numpy(dtype=float)
+    for column in grid.columns:
+        values = grid[column].to_numpy()
+        observed = ~np.isnan(values)
+
+        # 差分は前年が欠けている年をまたがない
+        previous = np.r_[np.nan, values[:-1]]
+        np.testing.assert_allclose(result['diff'][column], values - previous, rtol=0, atol=0)
+        if np.nanmin(values) > 0:
+            expected = np.log(values) - np.log(previous)
+        else:
+            expected = np.full(len(values), np.nan)
+        np.testing.assert_allclose(result['log_diff'][column], expected, rtol=1e-12)
+
+        slope, intercept = np.polyfit(years[observed], values[observed], 1)
+        expected = np.where(observed, values - (slope * years + intercept), np.nan)
+        np.testing.assert_allclose(result['linear_detrend'][column], expected, rtol=1e-9, atol=1e-9)
+
+        expected = np.where(observed, _hp_reference(years, values, HP_LAMBDA_ANNUAL), np.nan)
+        np.testing.assert_allclose(result['hp_detrend'][column], expected, rtol=1e-9, atol=1e-9)
+
+
+def test_hp_filter_closed_form_without_gaps():
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(size=40)) + 0.5 * np.arange(40)
+    grid = pd.DataFrame({'x': values, 'line': 3.0 - 0.2 * np.arange(40)}, index=range(1980, 2020))
+    cycle = transform_grid(grid, transforms=['hp_detrend'], hp_lambda=100)['hp_detrend']
+
+    second = np.diff(np.eye(40), n=2, axis=0)
+    trend = np.linalg.inv(np.eye(40) + 100 * second.T @ second) @ values
+    np.testing.assert_allclose(cycle['x'], values - trend, atol=1e-10)
+    # 直線は二階差分が0なので、トレンドがそのまま直線になる
+    np.testing.assert_allclose(cycle['line'], 0.0, atol=1e-10)
+
+
+def test_year_grid_fills_missing_years():
+    df = pd.DataFrame({'year': [2003, 2000, 2001, 2001], 'x': [3.0, 0.0, 1.0, 9.0]})
+    grid = year_grid(df, ['x'])
+    assert grid.index.tolist() == [2000, 2001, 2002, 2003]
+    assert grid['x'].tolist()[:2] == [0.0, 1.0] and np.isnan(grid['x'].iloc[2])
+
+
+def test_unknown_transform_is_rejected():
+    with pytest.raises(ValueError, match='Unknown transforms'):
+        transform_grid(_grid(0), transforms=['diff', 'box_cox'])